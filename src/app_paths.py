@@ -0,0 +1,35 @@
+"""
+程序所在目录、缓存与日志目录（只依赖标准库，GUI 启动时最先加载）
+"""
+import os
+import sys
+from pathlib import Path
+
+APP_NAME = "WarThunderAudioTool"
+
+
+def get_base_dir() -> str:
+    """程序所在目录（打包后为可执行文件所在目录），外部工具放在此目录"""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def get_cache_dir() -> Path:
+    """用户级缓存目录（Windows 下为 %LOCALAPPDATA%），不存在时自动创建"""
+    override = os.environ.get("WT_AUDIO_TOOL_CACHE")
+    if override:
+        path = Path(override)
+    elif sys.platform == "win32":
+        path = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local")) / APP_NAME
+    else:
+        path = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / APP_NAME
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_log_dir() -> Path:
+    """日志与指标文件目录"""
+    path = get_cache_dir() / "logs"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,269 @@
+"""
+两个游戏版本之间的样本级 bank 对比
+直接从 bank 的样本表读取每个样本的编码数据区间并哈希（mmap，不解包、不解码），
+报告每个 .assets.bank 中新增、删除、变化的样本，并可只解出新增与变化的样本，按参考结构写入补丁目录
+
+用法（在 src 目录下）：
+    python -m bank_diff snapshot GAME_DIR -o old.json
+    python -m bank_diff diff OLD NEW [--reference DIR --output DIR] [--bank PATTERN] [--report diff.json]
+
+OLD / NEW 可以是游戏目录，也可以是 snapshot 保存的快照文件；提取补丁时 NEW 中的 bank 文件必须仍然存在。
+补丁按 bank 写入 OUTPUT/<bank 名>/，目录结构与参考目录一致。
+无法原生解析的 bank 按整个文件的哈希比较，变化时整体提取。
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bank_reader import BankFormatError, BankReader
+from bank_scan import BANK_SUFFIX
+from manifest import hash_file
+from pipeline import BankPipeline, find_bank_files
+from sample_store import source_key
+from scheduler import default_concurrency
+
+SNAPSHOT_VERSION = 1
+
+
+def hash_bank(bank_file) -> Dict[str, str]:
+    """样本名 → 编码数据与格式参数的哈希；同名样本按出现顺序加 #序号 区分"""
+    digests = {}
+    with BankReader(bank_file) as reader:
+        mapping = reader.mapping
+        for sample in reader.iter_samples():
+            name = sample.name
+            index = 1
+            while name in digests:
+                index += 1
+                name = f"{sample.name}#{index}"
+            digests[name] = source_key(sample, mapping)
+    return digests
+
+
+def _bank_entry(bank_file: Path) -> dict:
+    st = bank_file.stat()
+    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    try:
+        samples = hash_bank(bank_file)
+    except (OSError, ValueError, BankFormatError, struct.error):
+        samples = {}
+    if samples:
+        entry["samples"] = samples
+    else:
+        # 未找到 FSB5 样本表，无法按样本比较，退回整个文件的哈希
+        entry["digest"] = hash_file(bank_file)
+    return entry
+
+
+def build_snapshot(game_dir, previous: Optional[dict] = None, workers: int = 0,
+                   progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """对游戏目录中所有 bank 做样本级哈希；previous 中大小与 mtime 未变的 bank 直接沿用"""
+    sound_dir = Path(game_dir) / "sound"
+    bank_files = sorted(find_bank_files(game_dir))
+    game_dir = str(Path(game_dir).resolve())
+    old_banks = previous.get("banks", {}) if previous and previous.get("game_dir") == game_dir else {}
+    banks = {}
+    stale = []
+    for bank_file in bank_files:
+        rel = bank_file.relative_to(sound_dir).as_posix()
+        old = old_banks.get(rel)
+        st = bank_file.stat()
+        if old is not None and (old["size"], old["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            banks[rel] = old
+        else:
+            stale.append((rel, bank_file))
+
+    # 哈希计算在 hashlib 内释放 GIL，线程即可并行
+    with ThreadPoolExecutor(max_workers=workers or default_concurrency()) as pool:
+        for done, (rel, entry) in enumerate(
+                zip([rel for rel, _ in stale], pool.map(_bank_entry, [path for _, path in stale])), 1):
+            banks[rel] = entry
+            if progress is not None:
+                progress(done, len(stale))
+    return {"version": SNAPSHOT_VERSION, "game_dir": game_dir, "banks": dict(sorted(banks.items()))}
+
+
+def load_snapshot(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"快照版本不受支持: {path}")
+    return snapshot
+
+
+def save_snapshot(snapshot: dict, path):
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# ===========================
+# 对比
+# ===========================
+@dataclass
+class BankDiff:
+    bank: str                 # 相对 sound 目录的路径
+    status: str               # added / removed / changed
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    # 无法按样本比较（整个文件的哈希不同）
+    whole_file: bool = False
+
+    @property
+    def patch_samples(self) -> List[str]:
+        """需要写入补丁的样本名（不含 # 序号）"""
+        return sorted({name.split("#", 1)[0] for name in self.added + self.changed})
+
+
+def diff_snapshots(old: dict, new: dict) -> List[BankDiff]:
+    """逐个 bank 比较两个快照，只返回有差异的 bank"""
+    old_banks, new_banks = old["banks"], new["banks"]
+    diffs = []
+    for rel in sorted(set(old_banks) | set(new_banks)):
+        before, after = old_banks.get(rel), new_banks.get(rel)
+        if before is None:
+            diffs.append(BankDiff(rel, "added", added=sorted(after.get("samples", ())),
+                                  whole_file="samples" not in after))
+            continue
+        if after is None:
+            diffs.append(BankDiff(rel, "removed", removed=sorted(before.get("samples", ())),
+                                  whole_file="samples" not in before))
+            continue
+        if "samples" not in before or "samples" not in after:
+            if before.get("digest") is None or before.get("digest") != after.get("digest"):
+                diffs.append(BankDiff(rel, "changed", added=sorted(after.get("samples", ())), whole_file=True))
+            continue
+        old_samples, new_samples = before["samples"], after["samples"]
+        diff = BankDiff(
+            rel, "changed",
+            added=sorted(set(new_samples) - set(old_samples)),
+            removed=sorted(set(old_samples) - set(new_samples)),
+            changed=sorted(name for name in set(old_samples) & set(new_samples)
+                           if old_samples[name] != new_samples[name]),
+        )
+        if diff.added or diff.removed or diff.changed:
+            diffs.append(diff)
+    return diffs
+
+
+def format_report(diffs: List[BankDiff]) -> List[str]:
+    if not diffs:
+        return ["两个版本的 bank 没有差异"]
+    lines = []
+    for diff in diffs:
+        if diff.whole_file:
+            lines.append(f"{diff.bank}: {diff.status}（无法按样本比较，整个文件已变化）")
+            continue
+        lines.append(f"{diff.bank}: {diff.status}，新增 {len(diff.added)}，删除 {len(diff.removed)}，"
+                     f"变化 {len(diff.changed)}")
+        if diff.status != "changed":
+            # 整个 bank 新增或删除时不逐个列出样本
+            continue
+        for label, names in (("+", diff.added), ("-", diff.removed), ("~", diff.changed)):
+            lines.extend(f"  {label} {name}" for name in names)
+    lines.append(f"共 {len(diffs)} 个 bank 有差异，新增 {sum(len(d.added) for d in diffs)} 个样本，"
+                 f"删除 {sum(len(d.removed) for d in diffs)} 个，变化 {sum(len(d.changed) for d in diffs)} 个")
+    return lines
+
+
+# ===========================
+# 补丁提取
+# ===========================
+def extract_patch(diffs: List[BankDiff], game_dir, reference_dir, output_dir,
+                  log: Optional[Callable[[str, int], None]] = None) -> int:
+    """只解出新增与变化的样本，按参考结构写入 output_dir/<bank 名>/；返回失败的 bank 数"""
+    sound_dir = Path(game_dir) / "sound"
+    failed = 0
+    for diff in diffs:
+        if diff.status == "removed" or not (diff.whole_file or diff.patch_samples):
+            continue
+        bank_file = sound_dir / diff.bank
+        bank_name = bank_file.name[:-len(BANK_SUFFIX)] if bank_file.name.endswith(BANK_SUFFIX) else bank_file.stem
+        pipeline = BankPipeline(
+            bank_file, reference_dir, Path(output_dir) / bank_name, True,
+            fsb_workers=default_concurrency(), incremental=False,
+            sample_filter=None if diff.whole_file else diff.patch_samples,
+            log=None if log is None else lambda msg, level, b=bank_name: log(f"[{b}] {msg}", level))
+        if not pipeline.run():
+            failed += 1
+    return failed
+
+
+def _resolve(path, previous: Optional[dict] = None) -> dict:
+    """游戏目录 → 新建快照；快照文件 → 直接读取"""
+    if Path(path).is_file():
+        return load_snapshot(path)
+    return build_snapshot(path, previous,
+                          progress=lambda done, total: print(f"[信息] 哈希 {done}/{total}", file=sys.stderr))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="War Thunder Audio Tool 样本级 bank 对比")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="保存游戏目录的样本哈希快照")
+    snap.add_argument("game_dir", help="游戏目录")
+    snap.add_argument("-o", "--output", required=True, help="快照文件；已存在时未变化的 bank 沿用其中的哈希")
+
+    diff = sub.add_parser("diff", help="对比两个游戏目录或快照")
+    diff.add_argument("old", help="旧版本游戏目录或快照文件")
+    diff.add_argument("new", help="新版本游戏目录或快照文件")
+    diff.add_argument("--bank", action="append", help="只对比匹配的 bank（相对 sound 目录的通配符，可重复）")
+    diff.add_argument("--report", help="把对比结果写入 JSON 文件")
+    diff.add_argument("--reference", help="参考目录；与 --output 同时指定时提取补丁")
+    diff.add_argument("--output", help="补丁输出目录")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "snapshot":
+        previous = None
+        if Path(args.output).is_file():
+            try:
+                previous = load_snapshot(args.output)
+            except ValueError:
+                previous = None
+        save_snapshot(_resolve(args.game_dir, previous), args.output)
+        print(f"[信息] 快照已保存: {args.output}")
+        return 0
+
+    if bool(args.reference) != bool(args.output):
+        print("[错误] --reference 与 --output 需要同时指定", file=sys.stderr)
+        return 2
+    try:
+        old, new = _resolve(args.old), _resolve(args.new)
+    except (OSError, ValueError) as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return 2
+    diffs = diff_snapshots(old, new)
+    if args.bank:
+        diffs = [d for d in diffs if any(fnmatch.fnmatch(d.bank, pattern) for pattern in args.bank)]
+    for line in format_report(diffs):
+        print(line)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump([asdict(d) for d in diffs], f, ensure_ascii=False, indent=2)
+
+    if args.output:
+        def log(msg, level):
+            if level >= logging.INFO:
+                print(msg)
+        failed = extract_patch(diffs, new["game_dir"], args.reference, args.output, log=log)
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
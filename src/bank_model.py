@@ -0,0 +1,165 @@
+"""
+bank 列表的数据模型
+QAbstractTableModel 保存全部行，视图只绘制可见行；搜索与排序由 QSortFilterProxyModel 完成
+勾选数量在 setData 中增量维护，全选 / 取消全选按连续行区间批量通知视图
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, pyqtSignal
+
+from bank_scan import BankEntry, STATUS_NEW, STATUS_CHANGED, STATUS_UNCHANGED
+
+COLUMNS = ["选择", "Bank文件", "输出目录", "参考结构目录", "大小", "状态"]
+COL_CHECK, COL_BANK, COL_OUTPUT, COL_REF, COL_SIZE, COL_STATUS = range(len(COLUMNS))
+
+STATUS_LABELS = {STATUS_NEW: "未处理", STATUS_CHANGED: "已变化", STATUS_UNCHANGED: "未变化"}
+# 排序角色：大小按字节数排序，其余列按显示文本
+SORT_ROLE = Qt.UserRole
+
+
+@dataclass
+class BankRow:
+    path: str
+    size: int = 0
+    status: str = STATUS_NEW
+    output: str = ""
+    reference: str = ""
+    checked: bool = False
+
+
+class BankTableModel(QAbstractTableModel):
+    checked_count_changed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: List[BankRow] = []
+        self._row_of: Dict[str, int] = {}
+        self.checked_count = 0
+
+    # ---------- Qt 接口 ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == COL_CHECK:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if column == COL_CHECK:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if row.checked else Qt.Unchecked
+            if role == SORT_ROLE:
+                return int(row.checked)
+            return None
+        if role == SORT_ROLE and column == COL_SIZE:
+            return row.size
+        if role in (Qt.DisplayRole, Qt.ToolTipRole, SORT_ROLE):
+            if column == COL_BANK:
+                return row.path
+            if column == COL_OUTPUT:
+                return row.output
+            if column == COL_REF:
+                return row.reference
+            if column == COL_SIZE:
+                return f"{row.size / 1024 ** 2:.1f} MB"
+            if column == COL_STATUS:
+                return STATUS_LABELS.get(row.status, row.status)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        if index.column() == COL_CHECK and role == Qt.CheckStateRole:
+            self.set_checked([index.row()], value == Qt.Checked)
+            return True
+        return False
+
+    # ---------- 批量操作 ----------
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self._row_of = {}
+        self.endResetModel()
+        self._set_checked_count(0)
+
+    def append_entries(self, entries: Iterable[BankEntry], reference: str = ""):
+        new_rows = [BankRow(entry.path, entry.size, entry.status, reference=reference) for entry in entries]
+        if not new_rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_rows) - 1)
+        for i, row in enumerate(new_rows, first):
+            self._row_of[row.path] = i
+            self.rows.append(row)
+        self.endInsertRows()
+
+    def set_checked(self, row_numbers: Iterable[int], checked: bool):
+        """设置若干行的勾选状态，只对实际变化的行计数，并按行号范围一次性通知视图"""
+        changed = [r for r in row_numbers if self.rows[r].checked != checked]
+        if not changed:
+            return
+        for r in changed:
+            self.rows[r].checked = checked
+        self.dataChanged.emit(self.index(min(changed), COL_CHECK), self.index(max(changed), COL_CHECK),
+                              [Qt.CheckStateRole])
+        self._set_checked_count(self.checked_count + (len(changed) if checked else -len(changed)))
+
+    def _set_checked_count(self, count: int):
+        self.checked_count = count
+        self.checked_count_changed.emit(count)
+
+    def checked_rows(self) -> List[BankRow]:
+        return [row for row in self.rows if row.checked]
+
+    def row_by_path(self, path: str) -> Optional[int]:
+        return self._row_of.get(path)
+
+    def update_row(self, row_number: int, **fields):
+        row = self.rows[row_number]
+        for name, value in fields.items():
+            setattr(row, name, value)
+        self.dataChanged.emit(self.index(row_number, 0), self.index(row_number, len(COLUMNS) - 1))
+
+
+class BankFilterProxy(QSortFilterProxyModel):
+    """按 bank 路径关键词或样本搜索结果过滤，按 SORT_ROLE 排序"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(False)
+        self._keyword = ""
+        self._extra_paths: Set[str] = set()
+
+    def set_search(self, keyword: str, extra_paths: Iterable[str] = ()):
+        """keyword 对 bank 路径做不区分大小写的子串匹配；extra_paths 为样本名命中的 bank"""
+        self._keyword = keyword.lower()
+        self._extra_paths = set(extra_paths)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self._keyword:
+            return True
+        path = self.sourceModel().rows[source_row].path
+        return self._keyword in path.lower() or path in self._extra_paths
+
+    def source_rows(self) -> List[int]:
+        """当前可见行对应的源模型行号"""
+        return [self.mapToSource(self.index(i, 0)).row() for i in range(self.rowCount())]
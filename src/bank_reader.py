@@ -0,0 +1,466 @@
+"""
+.assets.bank / FSB5 容器原生解析
+纯 Python 实现，不依赖 quickbms.exe，可在 Linux 构建机上运行
+只读取头部信息，不把 FSB 数据块整体读入内存，也不写出中间 .fsb 文件
+"""
+import mmap
+import os
+import struct
+import threading
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+FSB5_MAGIC = b"FSB5"
+RIFF_MAGIC = b"RIFF"
+SND_CHUNK_ID = b"SND "
+# 含有子块的 RIFF 容器块
+CONTAINER_CHUNK_IDS = (b"RIFF", b"LIST")
+
+# FSB5 mode 字段 → 编码名称
+CODEC_NAMES = {
+    0: "NONE",
+    1: "PCM8",
+    2: "PCM16",
+    3: "PCM24",
+    4: "PCM32",
+    5: "PCMFLOAT",
+    6: "GCADPCM",
+    7: "IMAADPCM",
+    8: "VAG",
+    9: "HEVAG",
+    10: "XMA",
+    11: "MPEG",
+    12: "CELT",
+    13: "AT9",
+    14: "XWMA",
+    15: "VORBIS",
+    16: "FADPCM",
+    17: "OPUS",
+}
+
+# 样本头中 4 位采样率索引 → 采样率
+FREQUENCY_TABLE = {
+    0: 4000,
+    1: 8000,
+    2: 11000,
+    3: 11025,
+    4: 16000,
+    5: 22050,
+    6: 24000,
+    7: 32000,
+    8: 44100,
+    9: 48000,
+    10: 96000,
+}
+
+# 样本头扩展块类型
+CHUNK_CHANNELS = 1
+CHUNK_FREQUENCY = 2
+CHUNK_LOOP = 3
+CHUNK_VORBISDATA = 11
+
+# 签名扫描时每次读取的块大小
+SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+# 上一个 FSB5 结束后，在此范围内查找下一个签名（跨过对齐填充），找不到时才退回分块扫描
+PADDING_PROBE_SIZE = 256
+# 无法走内核零拷贝时，每次从映射中写出的切片大小
+COPY_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class BankFormatError(Exception):
+    """bank / FSB5 结构无法识别"""
+
+
+@dataclass(frozen=True)
+class FSB5Header:
+    offset: int               # FSB5 在 bank 内的绝对偏移
+    version: int
+    num_samples: int
+    sample_headers_size: int
+    name_table_size: int
+    data_size: int
+    codec_id: int
+    header_size: int
+
+    @property
+    def codec(self) -> str:
+        return CODEC_NAMES.get(self.codec_id, f"UNKNOWN_{self.codec_id}")
+
+    @property
+    def data_offset(self) -> int:
+        """样本数据区在 bank 内的绝对偏移"""
+        return self.offset + self.header_size + self.sample_headers_size + self.name_table_size
+
+    @property
+    def size(self) -> int:
+        """整个 FSB5 块的字节数"""
+        return self.header_size + self.sample_headers_size + self.name_table_size + self.data_size
+
+
+@dataclass(frozen=True)
+class SampleHeader:
+    name: str
+    codec: str
+    offset: int               # 样本数据在 bank 内的绝对偏移
+    length: int               # 样本数据字节数
+    channels: int
+    frequency: int
+    samples: int              # 每声道采样点数
+    fsb_index: int            # 所属 FSB5 在 bank 中的序号
+    index: int                # 在所属 FSB5 中的序号
+    loop: Optional[Tuple[int, int]] = None
+    vorbis_crc: Optional[int] = None
+    extra_chunks: Dict[int, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+
+def _read_exact(f: BinaryIO, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    data = f.read(size)
+    if len(data) != size:
+        raise BankFormatError(f"偏移 0x{offset:X} 处数据不足 {size} 字节")
+    return data
+
+
+def _bits(value: int, start: int, length: int) -> int:
+    return (value >> start) & ((1 << length) - 1)
+
+
+# ===========================
+# RIFF 块遍历
+# ===========================
+def iter_riff_chunks(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """递归遍历 RIFF 块，产出 (块ID, 数据偏移, 数据大小)"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        chunk_id, size = head[:4], struct.unpack("<I", head[4:])[0]
+        data_offset = pos + 8
+        if data_offset + size > end:
+            # 截断的块：按剩余长度处理
+            size = end - data_offset
+        yield chunk_id, data_offset, size
+        if chunk_id in CONTAINER_CHUNK_IDS and size >= 4:
+            # 容器块前 4 字节为表单类型
+            yield from iter_riff_chunks(f, data_offset + 4, data_offset + size)
+        # RIFF 块按 2 字节对齐
+        pos = data_offset + size + (size & 1)
+
+
+def _find_magic(f: BinaryIO, start: int, end: int) -> Iterator[int]:
+    """在 [start, end) 中分块搜索 FSB5 签名"""
+    overlap = len(FSB5_MAGIC) - 1
+    pos = start
+    while pos < end:
+        f.seek(pos)
+        block = f.read(min(SCAN_BLOCK_SIZE, end - pos))
+        if not block:
+            return
+        idx = block.find(FSB5_MAGIC)
+        while idx != -1:
+            yield pos + idx
+            idx = block.find(FSB5_MAGIC, idx + 1)
+        if len(block) <= overlap:
+            return
+        pos += len(block) - overlap
+
+
+def find_fsb5_offsets(f: BinaryIO, file_size: Optional[int] = None) -> List[int]:
+    """定位 bank 中所有 FSB5 块的偏移：优先走 RIFF 的 SND 块，失败时退回全文件签名扫描"""
+    if file_size is None:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+
+    offsets = []
+    f.seek(0)
+    if f.read(4) == RIFF_MAGIC:
+        for chunk_id, data_offset, size in iter_riff_chunks(f, 0, file_size):
+            if chunk_id != SND_CHUNK_ID:
+                continue
+            # SND 块内 FSB5 前可能有对齐填充，也可能连续存放多个 FSB5
+            offsets.extend(_scan_fsb5(f, data_offset, data_offset + size, file_size))
+
+    if not offsets:
+        offsets = _scan_fsb5(f, 0, file_size, file_size)
+    return offsets
+
+
+def _scan_fsb5(f: BinaryIO, start: int, end: int, file_size: int) -> List[int]:
+    """依次定位 [start, end) 中的 FSB5：每解析出一个块就按其大小跳到块尾，只读头部，不扫描样本数据"""
+    offsets = []
+    pos = start
+    while pos < end:
+        header = _probe_after_padding(f, pos, end, file_size)
+        if header is None:
+            # 块之间不是紧邻的对齐填充：从当前位置分块扫描，找到第一个有效的块即停止
+            header = next(filter(None, (_probe_fsb5(f, candidate, file_size)
+                                        for candidate in _find_magic(f, pos, end))), None)
+            if header is None:
+                break
+        offsets.append(header.offset)
+        # 跳过当前 FSB5 内部，避免把样本数据里的巧合签名当成新块
+        pos = header.offset + header.size
+    return offsets
+
+
+def _probe_after_padding(f: BinaryIO, pos: int, end: int, file_size: int) -> Optional[FSB5Header]:
+    """在 pos 之后的对齐填充范围内查找并校验 FSB5 头"""
+    f.seek(pos)
+    window = f.read(min(PADDING_PROBE_SIZE, end - pos))
+    idx = window.find(FSB5_MAGIC)
+    if idx == -1:
+        return None
+    return _probe_fsb5(f, pos + idx, file_size)
+
+
+def _probe_fsb5(f: BinaryIO, offset: int, file_size: int) -> Optional[FSB5Header]:
+    """offset 处是有效的 FSB5 头时返回头部，否则返回 None"""
+    try:
+        header = read_fsb5_header(f, offset)
+    except BankFormatError:
+        return None
+    if header.version in (0, 1) and header.num_samples > 0 and offset + header.size <= file_size:
+        return header
+    return None
+
+
+# ===========================
+# FSB5 头与样本表
+# ===========================
+def read_fsb5_header(f: BinaryIO, offset: int) -> FSB5Header:
+    raw = _read_exact(f, offset, 0x40)
+    if raw[:4] != FSB5_MAGIC:
+        raise BankFormatError(f"偏移 0x{offset:X} 处不是 FSB5 头")
+    version, num_samples, shdr_size, name_size, data_size, mode = struct.unpack_from("<6I", raw, 4)
+    # 版本 0 比版本 1 多一个 4 字节字段
+    header_size = 0x40 if version == 0 else 0x3C
+    return FSB5Header(
+        offset=offset,
+        version=version,
+        num_samples=num_samples,
+        sample_headers_size=shdr_size,
+        name_table_size=name_size,
+        data_size=data_size,
+        codec_id=mode,
+        header_size=header_size,
+    )
+
+
+def _read_name_table(f: BinaryIO, header: FSB5Header) -> List[str]:
+    if not header.name_table_size:
+        return []
+    table_offset = header.offset + header.header_size + header.sample_headers_size
+    table = _read_exact(f, table_offset, header.name_table_size)
+    names = []
+    for i in range(header.num_samples):
+        (name_offset,) = struct.unpack_from("<I", table, i * 4)
+        end = table.find(b"\x00", name_offset)
+        if end == -1:
+            end = len(table)
+        names.append(table[name_offset:end].decode("utf-8", errors="replace"))
+    return names
+
+
+def _fallback_name(fsb_index: int, index: int) -> str:
+    """没有名称表时的样本名"""
+    return f"{fsb_index:03d}_{index:05d}"
+
+
+def read_sample_names(f: BinaryIO, file_size: Optional[int] = None) -> List[str]:
+    """只读 FSB5 头与名称表，返回 bank 中所有样本名（不读样本头表与样本数据）"""
+    names = []
+    for fsb_index, offset in enumerate(find_fsb5_offsets(f, file_size)):
+        header = read_fsb5_header(f, offset)
+        table = _read_name_table(f, header)
+        names.extend(table[i] if i < len(table) else _fallback_name(fsb_index, i)
+                     for i in range(header.num_samples))
+    return names
+
+
+def parse_fsb5(f: BinaryIO, offset: int, fsb_index: int = 0) -> Tuple[FSB5Header, List[SampleHeader]]:
+    """解析单个 FSB5 块，返回头部与样本列表（偏移均为 bank 内绝对偏移）"""
+    header = read_fsb5_header(f, offset)
+    shdr = _read_exact(f, offset + header.header_size, header.sample_headers_size)
+    names = _read_name_table(f, header)
+
+    entries = []
+    pos = 0
+    for i in range(header.num_samples):
+        (raw,) = struct.unpack_from("<Q", shdr, pos)
+        pos += 8
+        next_chunk = _bits(raw, 0, 1)
+        frequency = FREQUENCY_TABLE.get(_bits(raw, 1, 4), 44100)
+        channels = _bits(raw, 5, 1) + 1
+        data_offset = _bits(raw, 6, 28) * 16
+        samples = _bits(raw, 34, 30)
+
+        loop = None
+        vorbis_crc = None
+        extra = {}
+        while next_chunk:
+            (chunk_raw,) = struct.unpack_from("<I", shdr, pos)
+            pos += 4
+            next_chunk = _bits(chunk_raw, 0, 1)
+            chunk_size = _bits(chunk_raw, 1, 24)
+            chunk_type = _bits(chunk_raw, 25, 7)
+            chunk = shdr[pos:pos + chunk_size]
+            pos += chunk_size
+            if chunk_type == CHUNK_CHANNELS:
+                channels = chunk[0]
+            elif chunk_type == CHUNK_FREQUENCY:
+                (frequency,) = struct.unpack_from("<I", chunk)
+            elif chunk_type == CHUNK_LOOP:
+                loop = struct.unpack_from("<2I", chunk)
+            elif chunk_type == CHUNK_VORBISDATA:
+                (vorbis_crc,) = struct.unpack_from("<I", chunk)
+                extra[chunk_type] = chunk
+            else:
+                extra[chunk_type] = chunk
+        entries.append((data_offset, channels, frequency, samples, loop, vorbis_crc, extra))
+
+    samples_out = []
+    for i, (data_offset, channels, frequency, samples, loop, vorbis_crc, extra) in enumerate(entries):
+        next_offset = entries[i + 1][0] if i + 1 < len(entries) else header.data_size
+        samples_out.append(SampleHeader(
+            name=names[i] if i < len(names) else _fallback_name(fsb_index, i),
+            codec=header.codec,
+            offset=header.data_offset + data_offset,
+            length=max(next_offset - data_offset, 0),
+            channels=channels,
+            frequency=frequency,
+            samples=samples,
+            fsb_index=fsb_index,
+            index=i,
+            loop=loop,
+            vorbis_crc=vorbis_crc,
+            extra_chunks=extra,
+        ))
+    return header, samples_out
+
+
+# ===========================
+# 对外接口
+# ===========================
+class BankReader:
+    """bank 文件读取器，头部按需 seek 读取，样本数据通过 mmap 零拷贝导出（copy_to 可多线程并发调用）"""
+
+    def __init__(self, bank_path):
+        self.bank_path = str(bank_path)
+        self._file: Optional[BinaryIO] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._mmap_lock = threading.Lock()
+        self._fsbs: Optional[List[Tuple[FSB5Header, List[SampleHeader]]]] = None
+
+    def open(self):
+        if self._file is None:
+            self._file = open(self.bank_path, "rb")
+        return self
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _parse(self):
+        if self._fsbs is None:
+            if self._file is None:
+                raise BankFormatError("BankReader 未打开")
+            size = os.fstat(self._file.fileno()).st_size
+            self._fsbs = [parse_fsb5(self._file, offset, i)
+                          for i, offset in enumerate(find_fsb5_offsets(self._file, size))]
+        return self._fsbs
+
+    def fsb_headers(self) -> List[FSB5Header]:
+        return [header for header, _ in self._parse()]
+
+    def fsbs(self) -> List[Tuple[FSB5Header, List[SampleHeader]]]:
+        """每个 FSB5 块的头部及其样本列表"""
+        return list(self._parse())
+
+    def iter_samples(self) -> Iterator[SampleHeader]:
+        for _, samples in self._parse():
+            yield from samples
+
+    def sample_names(self) -> List[str]:
+        """所有样本名；未解析过样本表时只读头部与名称表"""
+        if self._fsbs is not None:
+            return [sample.name for sample in self.iter_samples()]
+        if self._file is None:
+            raise BankFormatError("BankReader 未打开")
+        return read_sample_names(self._file, os.fstat(self._file.fileno()).st_size)
+
+    @property
+    def mapping(self) -> mmap.mmap:
+        """整个 bank 的只读映射，首次访问时创建"""
+        with self._mmap_lock:
+            if self._mmap is None:
+                if self._file is None:
+                    raise BankFormatError("BankReader 未打开")
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def copy_to(self, offset: int, length: int, dst) -> int:
+        """把 bank 中 [offset, offset+length) 写入目标文件（路径或已打开的二进制文件）"""
+        if isinstance(dst, (str, os.PathLike)):
+            with open(dst, "wb") as out:
+                return self.copy_to(offset, length, out)
+        dst.flush()
+        written = _kernel_copy(self._file.fileno(), dst.fileno(), offset, length)
+        if written < length:
+            # 内核拷贝不可用或中途失败：从映射切片写出，不产生 bytes 副本
+            dst.seek(0, os.SEEK_END)
+            with memoryview(self.mapping) as view:
+                pos = offset + written
+                end = offset + length
+                while pos < end:
+                    step = min(COPY_BLOCK_SIZE, end - pos)
+                    dst.write(view[pos:pos + step])
+                    pos += step
+            written = length
+        return written
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, offset: int, length: int) -> int:
+    """尝试 copy_file_range / sendfile，返回已写入字节数（不支持时为 0）"""
+    written = 0
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            while written < length:
+                n = copy_file_range(src_fd, dst_fd, length - written, offset + written)
+                if n == 0:
+                    break
+                written += n
+            return written
+        except OSError:
+            # 跨文件系统等情况：已写入部分保留，剩余部分交给后续方式
+            pass
+    sendfile = getattr(os, "sendfile", None)
+    if sendfile is not None:
+        try:
+            while written < length:
+                n = sendfile(dst_fd, src_fd, offset + written, length - written)
+                if n == 0:
+                    break
+                written += n
+        except OSError:
+            pass
+    return written
+
+
+def iter_samples(bank_path) -> Iterator[SampleHeader]:
+    """逐个产出 bank 中的样本头"""
+    with BankReader(bank_path) as reader:
+        yield from reader.iter_samples()
@@ -0,0 +1,141 @@
+"""
+游戏目录 bank 扫描缓存
+按游戏目录记录 sound 下每个目录的 mtime 及其中 .assets.bank 的大小与 mtime
+再次扫描时只列出 mtime 变化的目录，并记录每个 bank 上次处理时的状态以标记"自上次处理后已变化"
+原地覆盖写入（不改变目录 mtime）的 bank 不会在列表中体现，处理时仍由增量清单按大小 / mtime / 哈希判断
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app_paths import get_cache_dir
+
+CACHE_NAME = "bank_scan.json"
+CACHE_VERSION = 1
+BANK_SUFFIX = ".assets.bank"
+ROOT_REL = "."
+
+# 相对上次处理的状态
+STATUS_NEW = "new"
+STATUS_CHANGED = "changed"
+STATUS_UNCHANGED = "unchanged"
+
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class BankEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    status: str = STATUS_NEW
+
+
+def _dir_key(path) -> str:
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def _load_all(cache_path: Path) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("games", {}) if data.get("version") == CACHE_VERSION else {}
+
+
+def _save_all(cache_path: Path, games: dict):
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "games": games}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+class BankScanCache:
+    """单个游戏目录的扫描缓存"""
+
+    def __init__(self, game_dir, cache_path: Optional[Path] = None):
+        self.game_dir = Path(game_dir)
+        self.sound_dir = self.game_dir / "sound"
+        self.key = _dir_key(game_dir)
+        self.cache_path = cache_path or get_cache_dir() / CACHE_NAME
+        with _cache_lock:
+            entry = _load_all(self.cache_path).get(self.key, {})
+        # 相对目录 → {"mtime_ns", "subdirs", "banks": {文件名: [size, mtime_ns]}}
+        self.dirs: Dict[str, dict] = entry.get("dirs", {})
+        # bank 路径 → 上次处理时的 [size, mtime_ns]
+        self.processed: Dict[str, list] = entry.get("processed", {})
+
+    def save(self):
+        with _cache_lock:
+            games = _load_all(self.cache_path)
+            games[self.key] = {"dirs": self.dirs, "processed": self.processed}
+            _save_all(self.cache_path, games)
+
+    def _status(self, path: str, size: int, mtime_ns: int) -> str:
+        last = self.processed.get(_dir_key(path))
+        if last is None:
+            return STATUS_NEW
+        return STATUS_UNCHANGED if last == [size, mtime_ns] else STATUS_CHANGED
+
+    def _list_dir(self, path: Path, mtime_ns: int) -> dict:
+        subdirs = []
+        banks = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith(BANK_SUFFIX) and entry.is_file():
+                    st = entry.stat()
+                    banks[entry.name] = [st.st_size, st.st_mtime_ns]
+        return {"mtime_ns": mtime_ns, "subdirs": sorted(subdirs), "banks": banks}
+
+    def scan(self) -> Iterator[List[BankEntry]]:
+        """逐目录产出 bank 列表；目录 mtime 未变化时直接使用缓存。sound 目录不存在时抛出 ValueError"""
+        if not self.game_dir.is_dir():
+            raise ValueError("请正确选择游戏目录")
+        if not self.sound_dir.is_dir():
+            raise ValueError("未找到 sound 文件夹")
+
+        seen = {}
+        stack = [ROOT_REL]
+        while stack:
+            rel_dir = stack.pop()
+            path = self.sound_dir if rel_dir == ROOT_REL else self.sound_dir / rel_dir
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self.dirs.get(rel_dir)
+            if cached is None or cached["mtime_ns"] != mtime_ns:
+                try:
+                    cached = self._list_dir(path, mtime_ns)
+                except OSError:
+                    continue
+            seen[rel_dir] = cached
+            for name in reversed(cached["subdirs"]):
+                stack.append(name if rel_dir == ROOT_REL else f"{rel_dir}/{name}")
+
+            batch = []
+            for name, (size, bank_mtime) in sorted(cached["banks"].items()):
+                bank_path = str(path / name)
+                batch.append(BankEntry(bank_path, size, bank_mtime, self._status(bank_path, size, bank_mtime)))
+            if batch:
+                yield batch
+
+        # 已删除的目录不再保留
+        self.dirs = seen
+        self.save()
+
+    def mark_processed(self, bank_files):
+        """记录 bank 处理完成时的大小与 mtime"""
+        for bank_file in bank_files:
+            try:
+                st = os.stat(bank_file)
+            except OSError:
+                continue
+            self.processed[_dir_key(bank_file)] = [st.st_size, st.st_mtime_ns]
+        self.save()
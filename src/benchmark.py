@@ -0,0 +1,232 @@
+"""
+性能基准：生成合成 .assets.bank 与 FMOD 风格参考结构，用 BankPipeline 完整处理并输出各阶段指标（JSON）
+
+用法（在 src 目录下）：
+    python benchmark.py --samples 5000 --fsbs 8 --depth 4 --fanout 2 --output bench.json
+    python benchmark.py --store --journal --output-format flac
+
+每次重复运行两遍流水线，阶段与 GUI / 命令行记录的指标相同（parse / decode / ref_index / match / copy / transcode 等）：
+    cold        参考结构索引、样本库均为空
+    warm        参考结构索引已在内存中；启用样本库时样本直接从库中取用
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bank_reader import BankReader
+from journal import BatchJournal
+from metrics import aggregate
+from pipeline import BankPipeline
+from sample_store import SampleStore
+from transcode import OUTPUT_FORMATS, Transcoder
+
+LANG_PREFIXES = ("ru_", "en_", "zh_", "de_", "fr_")
+
+
+# ===========================
+# 合成数据
+# ===========================
+def build_fsb5(samples, frequency_index=8):
+    """samples: [(name, pcm16_bytes, channels)]，生成 PCM16 FSB5 块"""
+    sample_headers = bytearray()
+    data = bytearray()
+    for name, pcm, channels in samples:
+        # 样本数据按 32 字节对齐
+        data.extend(b"\0" * (-len(data) % 32))
+        offset = len(data)
+        data.extend(pcm)
+        frames = len(pcm) // (2 * channels)
+        raw = (frequency_index << 1) | ((channels - 1) << 5) | ((offset // 16) << 6) | (frames << 34)
+        sample_headers.extend(struct.pack("<Q", raw))
+
+    offsets = bytearray()
+    names = bytearray()
+    for name, _, _ in samples:
+        offsets.extend(struct.pack("<I", 4 * len(samples) + len(names)))
+        names.extend(name.encode("utf-8") + b"\0")
+    name_table = offsets + names
+    name_table.extend(b"\0" * (-len(name_table) % 16))
+
+    header = b"FSB5" + struct.pack("<6I", 1, len(samples), len(sample_headers), len(name_table), len(data), 2)
+    header += b"\0" * 32
+    return bytes(header + sample_headers + name_table + data)
+
+
+def build_bank(fsb_blocks):
+    """把若干 FSB5 块包装成 FMOD Studio 风格的 RIFF bank"""
+    snd = bytearray()
+    for block in fsb_blocks:
+        snd.extend(b"\0" * (-len(snd) % 32))
+        snd.extend(block)
+    snd_chunk = b"SND " + struct.pack("<I", len(snd)) + bytes(snd)
+    fmt_chunk = b"FMT " + struct.pack("<I", 8) + b"\0" * 8
+    list_chunk = b"LIST" + struct.pack("<I", 4 + len(snd_chunk)) + b"PROJ" + snd_chunk
+    body = b"FEV " + fmt_chunk + list_chunk
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def generate_fixtures(root: Path, args, rng: random.Random):
+    """生成 bank 文件与参考结构目录，返回 (bank_path, ref_dir, 核心名列表)"""
+    cores = [f"voice_line_{i:06d}" for i in range(args.samples)]
+
+    pcm_cache = {}
+    fsb_blocks = []
+    per_fsb = max(1, -(-args.samples // args.fsbs))
+    for start in range(0, args.samples, per_fsb):
+        samples = []
+        for core in cores[start:start + per_fsb]:
+            length = rng.randint(args.min_kb, args.max_kb) * 1024
+            if length not in pcm_cache:
+                pcm_cache[length] = rng.randbytes(length)
+            samples.append((f"{args.bank_lang}_{core}", pcm_cache[length], 1))
+        fsb_blocks.append(build_fsb5(samples))
+    bank_path = root / "synthetic.assets.bank"
+    bank_path.write_bytes(build_bank(fsb_blocks))
+
+    ref_dir = root / "reference"
+    dirs = [ref_dir]
+    for _ in range(args.depth):
+        dirs = [d / f"group_{j}" for d in dirs for j in range(args.branching)]
+    for d in dirs:
+        d.mkdir(parents=True, exist_ok=True)
+    for core in cores:
+        if rng.random() < args.unmatched:
+            continue
+        # 多对多：同一核心名出现在多个目录，并带不同语言前缀
+        for d in rng.sample(dirs, min(args.fanout, len(dirs))):
+            (d / f"{rng.choice(LANG_PREFIXES)}{core}.wav").touch()
+    return bank_path, ref_dir, cores
+
+
+# ===========================
+# 流水线计时
+# ===========================
+def run_pipeline(args, bank_path: Path, ref_dir: Path, target_dir: Path, store, transcoder, journal_dir: Path) -> dict:
+    """处理一遍合成 bank，返回各阶段汇总（与 metrics 汇总格式相同）与墙钟耗时"""
+    errors = []
+    journal = None
+    if args.journal:
+        journal = BatchJournal([(str(bank_path), str(ref_dir), str(target_dir))], journal_dir)
+        journal.load()
+    pipeline = BankPipeline(
+        bank_path, ref_dir, target_dir, True,
+        fsb_workers=args.fsb_workers, incremental=False, copy_mode=args.copy_mode,
+        quarantine=args.quarantine, selective=not args.no_selective,
+        journal=journal, store=store, transcoder=transcoder,
+        log=lambda msg, level: errors.append(msg) if level >= logging.ERROR else None)
+    start = time.perf_counter()
+    ok = pipeline.run()
+    wall = time.perf_counter() - start
+    if journal is not None:
+        journal.finish()
+    if not ok:
+        raise RuntimeError("流水线处理失败: " + "; ".join(errors))
+    return {
+        "wall_seconds": round(wall, 6),
+        "stages": {stage: total.to_dict() for stage, total in aggregate(pipeline.metrics.spans).items()},
+        # 不含增量清单等隐藏文件
+        "outputs": sum(1 for path in target_dir.rglob("*") if path.is_file() and not path.name.startswith(".")),
+    }
+
+
+def run_once(args, rng_seed: int) -> dict:
+    rng = random.Random(rng_seed)
+    with tempfile.TemporaryDirectory(prefix="WT_AudioBench_") as tmp:
+        root = Path(tmp)
+        bank_path, ref_dir, _ = generate_fixtures(root, args, rng)
+        with BankReader(bank_path) as reader:
+            sample_count = sum(1 for _ in reader.iter_samples())
+
+        # 参考索引与断点日志写入临时缓存目录，不影响用户缓存
+        previous_cache = os.environ.get("WT_AUDIO_TOOL_CACHE")
+        os.environ["WT_AUDIO_TOOL_CACHE"] = str(root / "cache")
+        store = SampleStore(root / "store") if args.store else None
+        transcoder = Transcoder(args.output_format) if args.output_format != "wav" else None
+        try:
+            passes = {name: run_pipeline(args, bank_path, ref_dir, root / f"target_{name}", store, transcoder,
+                                         root / f"journal_{name}")
+                      for name in ("cold", "warm")}
+        finally:
+            if transcoder is not None:
+                transcoder.shutdown()
+            if previous_cache is None:
+                os.environ.pop("WT_AUDIO_TOOL_CACHE", None)
+            else:
+                os.environ["WT_AUDIO_TOOL_CACHE"] = previous_cache
+
+        counts = {
+            "bank_bytes": bank_path.stat().st_size,
+            "samples": sample_count,
+            "reference_files": sum(1 for path in ref_dir.rglob("*") if path.is_file()),
+        }
+    return {"passes": passes, "counts": counts}
+
+
+def summarize(runs):
+    """每一遍的墙钟耗时与各阶段耗时取多次运行的最小值与中位数"""
+    summary = {}
+    for name in runs[0]["passes"]:
+        values = {"wall": [run["passes"][name]["wall_seconds"] for run in runs]}
+        for run in runs:
+            for stage, total in run["passes"][name]["stages"].items():
+                values.setdefault(stage, []).append(total["seconds"])
+        summary[name] = {}
+        for stage, seconds in values.items():
+            seconds.sort()
+            summary[name][stage] = {"min": seconds[0], "median": seconds[len(seconds) // 2]}
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="War Thunder Audio Tool 性能基准")
+    parser.add_argument("--samples", type=int, default=2000, help="样本数量")
+    parser.add_argument("--fsbs", type=int, default=8, help="bank 中的 FSB5 块数量")
+    parser.add_argument("--min-kb", type=int, default=4, help="单个样本最小大小（KB）")
+    parser.add_argument("--max-kb", type=int, default=64, help="单个样本最大大小（KB）")
+    parser.add_argument("--depth", type=int, default=3, help="参考结构目录深度")
+    parser.add_argument("--branching", type=int, default=4, help="每层子目录数")
+    parser.add_argument("--fanout", type=int, default=2, help="每个核心名在参考结构中出现的目录数")
+    parser.add_argument("--unmatched", type=float, default=0.05, help="参考结构中缺失的样本比例")
+    parser.add_argument("--bank-lang", default="zh", help="bank 样本名的语言前缀")
+    parser.add_argument("--copy-mode", default="copy", choices=("copy", "hardlink", "reflink"))
+    parser.add_argument("--fsb-workers", type=int, default=os.cpu_count() or 1, help="并行解码的 FSB 数")
+    parser.add_argument("--store", action="store_true", help="启用内容寻址样本库")
+    parser.add_argument("--journal", action="store_true", help="记录断点日志")
+    parser.add_argument("--output-format", default="wav", choices=("wav", *OUTPUT_FORMATS), help="输出格式")
+    parser.add_argument("--quarantine", action="store_true", help="保留未匹配样本")
+    parser.add_argument("--no-selective", action="store_true", help="关闭选择性解码")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="结果 JSON 文件（默认输出到标准输出）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    runs = [run_once(args, args.seed + i) for i in range(args.repeat)]
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "summary": summarize(runs),
+        "runs": runs,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
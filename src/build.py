@@ -2,12 +2,22 @@
 """
 War Thunder Audio Tool 打包脚本
 使用PyInstaller将程序打包为单文件可执行程序
+
+用法（在 src 目录下）：
+    python build.py              # 单文件：便于分发，但每次启动都要先解压到临时目录
+    python build.py --onedir     # 目录：启动时无需解压，适合频繁开关的日常使用
+    python build.py --clean      # 清除 PyInstaller 的分析缓存后重新打包（默认复用 build/ 下的缓存）
 """
+import argparse
 import os
 import sys
 import subprocess
 from pathlib import Path
 
+APP_NAME = "WarThunderAudioTool"
+# GUI 不使用的大型标准库模块，排除后可减小体积、缩短单文件模式的解压时间
+EXCLUDED_MODULES = ("tkinter", "unittest", "pydoc", "doctest")
+
 def get_project_root():
     """
     获取项目根目录路径
@@ -15,10 +25,22 @@ def get_project_root():
     # 当前脚本位于src目录下，向上一级即为项目根目录
     return Path(__file__).parent.parent
 
-def main():
+def build_parser():
+    """
+    命令行参数
+    """
+    parser = argparse.ArgumentParser(description="War Thunder Audio Tool 打包脚本")
+    parser.add_argument("--onedir", action="store_true",
+                        help="打包为目录（启动更快，外部工具放在 dist/WarThunderAudioTool/ 下）")
+    parser.add_argument("--clean", action="store_true", help="清除 PyInstaller 缓存后重新打包")
+    return parser
+
+
+def main(argv=None):
     """
     主函数，执行打包操作
     """
+    args = build_parser().parse_args(argv)
     project_root = get_project_root()
     src_dir = project_root / "src"
     ui_dir = project_root / "ui"
@@ -30,12 +52,20 @@ def main():
     cmd = [
         sys.executable,  # 使用当前Python解释器
         "-m", "PyInstaller",
-        "--onefile",  # 单文件模式
+        "--onedir" if args.onedir else "--onefile",  # 目录模式 / 单文件模式
         "--windowed",  # 无控制台窗口
+        "--noconfirm",  # 覆盖上次的输出目录
         f"--icon={ui_dir}/favicon.ico",  # 设置图标
-        "--name", "WarThunderAudioTool",  # 指定输出文件名
-        "main.py"  # 主程序文件
+        "--name", APP_NAME,  # 指定输出文件名
     ]
+    if args.onedir:
+        # UPX 压缩的 DLL 每次启动都要解压，目录模式以启动速度为先
+        cmd.append("--noupx")
+    if args.clean:
+        cmd.append("--clean")
+    for module in EXCLUDED_MODULES:
+        cmd += ["--exclude-module", module]
+    cmd.append("main.py")  # 主程序文件
     
     print(f"执行打包命令: {' '.join(cmd)}")
     
@@ -51,7 +81,11 @@ def main():
         print(result.stderr)
     
     if result.returncode == 0:
-        print(f"\n✅ 打包成功！可执行文件位于: {src_dir}/dist/WarThunderAudioTool.exe")
+        if args.onedir:
+            print(f"\n✅ 打包成功！程序目录位于: {src_dir}/dist/{APP_NAME}/（外部工具请放在该目录下）")
+        else:
+            print(f"\n✅ 打包成功！可执行文件位于: {src_dir}/dist/{APP_NAME}.exe")
+        print(f"   {APP_NAME}.exe --startup-time 启动后立即退出，启动耗时写入日志文件")
     else:
         print(f"\n❌ 打包失败，返回码: {result.returncode}")
         sys.exit(result.returncode)
@@ -0,0 +1,322 @@
+"""
+命令行批处理入口（不加载 Qt）
+
+用法（在 src 目录下）：
+    python -m cli --config batch.json [--game-dir DIR] [--jobs N] [--format json|text]
+
+配置文件示例：
+    {
+        "game_dir": "D:/Games/War Thunder",
+        "reference_dir": "D:/fmod_studio_warthunder_for_modders/Assets/dialogs_wt_tanks_2023/russian_new",
+        "unpack": true,
+        "incremental": true,
+        "copy_mode": "copy",
+        "match_rules": ["lang_prefix", "lang_suffix"],
+        "direct": false,
+        "quarantine": false,
+        "native_decode": true,
+        "selective": true,
+        "store": false,
+        "output_format": "wav",
+        "jobs": 4,
+        "banks": [
+            {"bank": "_crew_dialogs_ground_zh", "output": "D:/out/chinese"},
+            {"bank": "*_crew_dialogs_ground_de*", "output": "D:/out/german", "reference": "D:/ref/german"}
+        ]
+    }
+
+bank 可以是 bank 文件名（可省略 .assets.bank 后缀）、通配符或绝对路径。
+direct 为 true 时解包结果直接写入输出目录（不占用系统临时目录）；quarantine 为 true 时未匹配样本移入输出目录的 _unmatched 子目录。
+native_decode 为 false 时所有 FSB 都交给 fsb_aud_extr.exe 解包（默认 PCM / FADPCM / Vorbis 在进程内解码）。
+selective 为 true 时只解码参考结构中存在的样本（quarantine 开启时不生效）。
+store 为 true 时匹配的样本按内容存入缓存目录的样本库（相同样本只存一份，再次解包时免解码），也可以指定样本库目录；
+样本库与输出目录在同一磁盘时配合 copy_mode 为 hardlink 不占额外空间。
+match_rules 可选 lang_prefix / lang_suffix / version / variant，默认只去掉语言前缀。
+output_format 可选 wav / flac / ogg / opus，非 wav 时匹配的样本在进程池中编码后写出（需要 soundfile），目录结构不变。
+tool_stall_timeout 为外部工具无任何输出、输出目录也无变化多少秒后终止（默认 600，0 表示不终止）。
+--format json 时每行输出一个 JSON 事件：log / progress / span / done / summary / finished；
+progress 事件的 eta 为按总体进度估算的剩余秒数（进度过少时为 null）。
+Ctrl-C（或 SIGTERM）时不再启动新的 bank，运行中的 bank 在下一个文件处停止，退出码为 130。
+已完成的 bank 与已写出的文件记录在断点日志中，再次执行同一配置时从中断处继续；--restart 忽略断点从头开始。
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from copy_engine import COPY_MODES
+from journal import BatchJournal
+from sample_store import SampleStore
+from matcher import parse_rules
+from metrics import MetricsWriter, aggregate, format_summary
+from pipeline import BankPipeline, find_bank_files
+from scheduler import BankScheduler, format_duration
+from tool_output import STALL_TIMEOUT_SECONDS
+from transcode import OUTPUT_FORMATS, Transcoder, check_format
+
+BANK_SUFFIX = ".assets.bank"
+# 等待任务完成时检查取消请求的间隔（秒）；不带超时的等待在 Windows 上无法被 Ctrl-C 打断
+WAIT_POLL_SECONDS = 0.5
+# 被取消时的退出码（与 shell 中 SIGINT 的约定一致）
+EXIT_CANCELLED = 130
+
+
+class EventWriter:
+    """线程安全的进度输出"""
+
+    def __init__(self, fmt: str, stream=sys.stdout, log_level: int = logging.INFO):
+        self.fmt = fmt
+        self.stream = stream
+        self.log_level = log_level
+        self._lock = threading.Lock()
+
+    def log(self, bank: str, message: str, level: int = logging.INFO):
+        if level >= self.log_level:
+            self.emit("log", bank=bank, message=message, level=logging.getLevelName(level))
+
+    def emit(self, event: str, **fields):
+        with self._lock:
+            if self.fmt == "json":
+                self.stream.write(json.dumps({"event": event, **fields}, ensure_ascii=False) + "\n")
+            else:
+                bank = fields.get("bank")
+                prefix = f"[{Path(bank).stem}] " if bank else ""
+                if event == "log":
+                    self.stream.write(f"{prefix}{fields['message']}\n")
+                elif event == "progress":
+                    eta = fields.get("eta")
+                    remaining = f"，剩余约 {format_duration(eta)}" if eta is not None else ""
+                    self.stream.write(f"{prefix}进度 {fields['value']}%（总体 {fields['overall']}%{remaining}）\n")
+                elif event == "summary":
+                    for line in fields["lines"]:
+                        self.stream.write(f"[统计] {line}\n")
+                elif event == "done":
+                    self.stream.write(f"{prefix}处理{'完成' if fields['ok'] else '失败'}\n")
+                elif event == "finished":
+                    if fields.get("cancelled"):
+                        self.stream.write(f"已取消：成功 {fields['ok']}，失败 {fields['failed']}，"
+                                          f"未完成 {fields['cancelled']}（再次执行同一配置可继续）\n")
+                    else:
+                        self.stream.write(f"全部处理完毕：成功 {fields['ok']}，失败 {fields['failed']}\n")
+                elif event == "error":
+                    self.stream.write(f"[错误] {fields['message']}\n")
+            self.stream.flush()
+
+
+def load_config(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _match_banks(pattern: str, bank_files: List[Path]) -> List[Path]:
+    if os.path.isabs(pattern) and os.path.isfile(pattern):
+        return [Path(pattern)]
+    if not any(ch in pattern for ch in "*?["):
+        name = pattern if pattern.endswith(BANK_SUFFIX) else pattern + BANK_SUFFIX
+        return [p for p in bank_files if p.name.lower() == name.lower()]
+    return [p for p in bank_files if fnmatch.fnmatch(p.name.lower(), pattern.lower())]
+
+
+def resolve_tasks(config: dict, game_dir) -> List[Tuple[str, str, str]]:
+    """把配置中的 bank → 输出 → 参考结构映射展开为 (bank_file, source_dir, target_dir) 任务"""
+    bank_files = find_bank_files(game_dir) if game_dir else []
+    default_ref = config.get("reference_dir", "")
+    tasks = []
+    seen = set()
+    for entry in config.get("banks", []):
+        output = entry.get("output", "").strip()
+        reference = (entry.get("reference") or default_ref).strip()
+        if not output or not reference:
+            raise ValueError(f"{entry.get('bank')} 未设置输出目录或参考结构目录")
+        matches = _match_banks(entry["bank"], bank_files)
+        if not matches:
+            raise ValueError(f"未找到 bank: {entry['bank']}")
+        for bank_file in matches:
+            if str(bank_file) in seen:
+                continue
+            seen.add(str(bank_file))
+            tasks.append((str(bank_file), reference, output))
+    return tasks
+
+
+def run_batch(tasks, config: dict, jobs: int, writer: EventWriter,
+              metrics_writer: Optional[MetricsWriter] = None, journal: Optional[BatchJournal] = None,
+              cancel_event: Optional[threading.Event] = None) -> int:
+    """按调度器限制并发执行所有任务，返回失败数（被取消的 bank 不计入失败）"""
+    cancel_event = cancel_event or threading.Event()
+    direct = config.get("direct", False)
+    temp_budget = config.get("temp_budget", 0 if direct else None)
+    scheduler = BankScheduler(tasks, max_workers=jobs, temp_budget=temp_budget)
+    fsb_workers = max(1, (os.cpu_count() or 1) // scheduler.max_workers)
+    store_dir = config.get("store", False)
+    store = SampleStore(store_dir if isinstance(store_dir, str) else None) if store_dir else None
+    output_format = config.get("output_format", "wav")
+    transcoder = Transcoder(output_format) if output_format != "wav" else None
+    options = dict(
+        fsb_workers=fsb_workers,
+        incremental=config.get("incremental", True),
+        copy_mode=config.get("copy_mode", "copy"),
+        match_rules=config.get("match_rules"),
+        direct=direct,
+        quarantine=config.get("quarantine", False),
+        native_decode=config.get("native_decode", True),
+        selective=config.get("selective", True),
+        cancel_event=cancel_event,
+        journal=journal,
+        store=store,
+        tool_stall_timeout=config.get("tool_stall_timeout", STALL_TIMEOUT_SECONDS),
+        transcoder=transcoder,
+    )
+    do_unpack = config.get("unpack", True)
+    failed = 0
+    cancelled = 0
+    all_spans = []
+
+    def progress(bank_file, value):
+        overall = scheduler.update(bank_file, value)
+        eta = scheduler.eta()
+        writer.emit("progress", bank=bank_file, value=value, overall=overall,
+                    eta=round(eta, 1) if eta is not None else None)
+
+    with ThreadPoolExecutor(max_workers=scheduler.max_workers) as pool:
+        running = {}
+        while not scheduler.finished:
+            if cancel_event.is_set() and scheduler.pending:
+                dropped = scheduler.cancel()
+                cancelled += dropped
+                writer.log("", f"[取消] 正在停止：{dropped} 个 bank 未启动，等待 {len(running)} 个运行中的 bank 结束",
+                           logging.WARNING)
+            for bank_file, source_dir, target_dir in scheduler.next_ready():
+                pipeline = BankPipeline(
+                    bank_file, source_dir, target_dir, do_unpack,
+                    log=lambda msg, level, b=bank_file: writer.log(b, msg, level),
+                    progress=lambda value, b=bank_file: progress(b, value),
+                    **options)
+                running[pool.submit(pipeline.run)] = (bank_file, pipeline)
+            if not running:
+                continue
+            try:
+                done, _ = wait(running, timeout=WAIT_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            except KeyboardInterrupt:
+                cancel_event.set()
+                continue
+            for future in done:
+                bank_file, pipeline = running.pop(future)
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    writer.log(bank_file, f"[错误] {e}", logging.ERROR)
+                    ok = False
+                if pipeline.cancelled:
+                    cancelled += 1
+                elif not ok:
+                    failed += 1
+                scheduler.task_done(bank_file)
+                spans = pipeline.metrics.spans
+                all_spans.extend(spans)
+                if metrics_writer is not None:
+                    metrics_writer.write(spans)
+                if writer.fmt == "json":
+                    for span in spans:
+                        writer.emit("span", **span.to_dict())
+                writer.emit("done", bank=bank_file, ok=ok, overall=scheduler.overall())
+
+    if transcoder is not None:
+        transcoder.shutdown()
+    summary = dict(lines=format_summary(all_spans),
+                   stages={stage: total.to_dict() for stage, total in aggregate(all_spans).items()})
+    if store is not None:
+        # 转码输出不引用样本库对象，只报告本次存取统计
+        summary["lines"] += store.summary_lines(with_refs=transcoder is None)
+        summary["store"] = {**(store.totals() if transcoder is None else {}), **asdict(store.stats)}
+    if transcoder is not None:
+        summary["lines"].append(transcoder.stats.summary(output_format))
+        summary["transcode"] = {"format": output_format, **asdict(transcoder.stats)}
+    writer.emit("summary", **summary)
+    writer.emit("finished", ok=len(tasks) - failed - cancelled, failed=failed, cancelled=cancelled)
+    return failed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description="War Thunder Audio Tool 命令行批处理")
+    parser.add_argument("--config", required=True, help="批处理配置文件（JSON）")
+    parser.add_argument("--game-dir", help="游戏目录，覆盖配置文件中的 game_dir")
+    parser.add_argument("--jobs", type=int, help="同时处理的 bank 数量，覆盖配置文件中的 jobs")
+    parser.add_argument("--copy-mode", choices=COPY_MODES, help="输出方式，覆盖配置文件中的 copy_mode")
+    parser.add_argument("--direct", action="store_true", help="解包结果直接写入输出目录，不经过系统临时目录")
+    parser.add_argument("--store", nargs="?", const=True, metavar="DIR",
+                        help="启用内容寻址样本库，可指定目录（默认位于缓存目录），覆盖配置文件中的 store")
+    parser.add_argument("--output-format", choices=("wav", *OUTPUT_FORMATS),
+                        help="输出格式，覆盖配置文件中的 output_format（非 wav 需要 soundfile）")
+    parser.add_argument("--no-incremental", action="store_true", help="忽略增量清单，全部重新处理")
+    parser.add_argument("--format", choices=("json", "text"), default="json", help="进度输出格式")
+    parser.add_argument("--log-level", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="INFO",
+                        help="日志级别，DEBUG 时输出逐文件复制与外部工具输出")
+    parser.add_argument("--restart", action="store_true", help="忽略上次中断留下的断点日志，从头开始")
+    parser.add_argument("--metrics", help="把各阶段耗时以 JSON Lines 追加写入该文件")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    writer = EventWriter(args.format, log_level=getattr(logging, args.log_level))
+    try:
+        config = load_config(args.config)
+        if args.copy_mode:
+            config["copy_mode"] = args.copy_mode
+        if args.direct:
+            config["direct"] = True
+        if args.no_incremental:
+            config["incremental"] = False
+        if args.store:
+            config["store"] = args.store
+        if args.output_format:
+            config["output_format"] = args.output_format
+        check_format(config.get("output_format", "wav"))
+        parse_rules(config.get("match_rules"))
+        tasks = resolve_tasks(config, args.game_dir or config.get("game_dir"))
+    except (OSError, ValueError, KeyError) as e:
+        writer.emit("error", message=str(e))
+        return 2
+
+    if not tasks:
+        writer.emit("error", message="配置中没有需要处理的 bank")
+        return 2
+    journal = BatchJournal(tasks)
+    if args.restart:
+        journal.reset()
+    elif journal.load():
+        skipped = len(tasks) - len(journal.pending_tasks())
+        tasks = journal.pending_tasks()
+        writer.log("", f"[信息] 从断点继续：跳过 {skipped} 个已完成的 bank，剩余 {len(tasks)} 个")
+
+    cancel_event = threading.Event()
+    # Ctrl-C 在等待循环中转为取消请求；SIGTERM 直接设置取消标志
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancel_event.set())
+    metrics_writer = MetricsWriter(args.metrics) if args.metrics else None
+    failed = run_batch(tasks, config, args.jobs or config.get("jobs", 0), writer, metrics_writer,
+                       journal=journal, cancel_event=cancel_event)
+    if cancel_event.is_set():
+        journal.close()
+        return EXIT_CANCELLED
+    if failed:
+        # 保留断点日志，再次执行时只重试失败的 bank
+        journal.close()
+        return 1
+    journal.finish()
+    return 0
+
+
+if __name__ == "__main__":
+    # 转码进程池在打包后的程序中需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
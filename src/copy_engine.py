@@ -0,0 +1,191 @@
+"""
+输出复制引擎
+- 目标文件大小与内容哈希均一致时跳过
+- 同一源文件对应多个目标目录时，只物理写入一次，其余通过硬链接或 reflink（FICLONE）生成
+- 直写模式下源文件已位于输出磁盘，首个目标通过重命名获得
+- 统计实际写入与节省的字节数
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List
+
+from manifest import hash_file
+
+COPY_MODES = ("copy", "hardlink", "reflink")
+# Linux ioctl FICLONE
+FICLONE = 0x40049409
+
+
+@dataclass
+class CopyStats:
+    files_copied: int = 0
+    files_moved: int = 0
+    files_linked: int = 0
+    files_skipped: int = 0
+    bytes_written: int = 0
+    bytes_avoided: int = 0
+
+    def merge(self, other: "CopyStats"):
+        self.files_copied += other.files_copied
+        self.files_moved += other.files_moved
+        self.files_linked += other.files_linked
+        self.files_skipped += other.files_skipped
+        self.bytes_written += other.bytes_written
+        self.bytes_avoided += other.bytes_avoided
+
+    def summary(self) -> str:
+        return (f"复制 {self.files_copied} 个，移动 {self.files_moved} 个，链接 {self.files_linked} 个，跳过 {self.files_skipped} 个；"
+                f"写入 {self.bytes_written / 1024 ** 2:.1f} MB，节省 {self.bytes_avoided / 1024 ** 2:.1f} MB")
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+    except OSError:
+        try:
+            dst.unlink()
+        except OSError:
+            pass
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def move_file(src: Path, dst: Path):
+    """同一文件系统时直接重命名（覆盖已有目标），否则复制后删除源文件"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.move(str(src), str(dst))
+
+
+def _is_same_content(src: Path, dst: Path, src_size: int, src_hash_cache: list) -> bool:
+    try:
+        st = dst.stat()
+    except OSError:
+        return False
+    if st.st_size != src_size:
+        return False
+    try:
+        if os.path.samefile(src, dst):
+            return True
+    except OSError:
+        return False
+    if not src_hash_cache:
+        src_hash_cache.append(hash_file(src))
+    return hash_file(dst) == src_hash_cache[0]
+
+
+class CopyEngine:
+    """线程安全：统计信息在锁内累加"""
+
+    def __init__(self, mode: str = "copy"):
+        if mode not in COPY_MODES:
+            raise ValueError(f"未知的复制模式: {mode}")
+        self.mode = mode
+        self.stats = CopyStats()
+        self._lock = threading.Lock()
+
+    def _link(self, src: Path, dst: Path) -> bool:
+        """在临时名上创建链接后替换目标，失败时返回 False；临时名按进程与线程区分，并行链接同一目标时互不干扰"""
+        tmp = dst.with_name(f"{dst.name}.{os.getpid()}.{threading.get_ident()}.wtlink")
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        if self.mode == "hardlink":
+            try:
+                os.link(src, tmp)
+            except OSError:
+                return False
+        elif not _reflink(src, tmp):
+            return False
+        os.replace(tmp, dst)
+        return True
+
+    def copy(self, src, dests: Iterable) -> List[Path]:
+        """把 src 写入所有目标路径，返回实际发生写入或链接的目标"""
+        src = Path(src)
+        src_size = src.stat().st_size
+        src_hash_cache: list = []
+        stats = CopyStats()
+        written: List[Path] = []
+        first = None
+
+        for dst in dests:
+            dst = Path(dst)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            if _is_same_content(src, dst, src_size, src_hash_cache):
+                stats.files_skipped += 1
+                stats.bytes_avoided += src_size
+                if first is None:
+                    first = dst
+                continue
+
+            if self.mode != "copy":
+                # 首个目标尝试直接链接源文件（同一文件系统时），其余目标链接到首个目标
+                if self._link(first or src, dst):
+                    stats.files_linked += 1
+                    stats.bytes_avoided += src_size
+                    written.append(dst)
+                    if first is None:
+                        first = dst
+                    continue
+
+            # 先写临时名再替换：已有目标可能是指向样本库对象或其他输出的硬链接，不能原地覆盖；
+            # 临时名唯一，多个 bank 并行写入同一目标时互不干扰
+            fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=dst.name, suffix=".wtcopy")
+            os.close(fd)
+            try:
+                shutil.copy2(src, tmp)
+                os.replace(tmp, dst)
+            finally:
+                try:
+                    os.unlink(tmp)
+                except FileNotFoundError:
+                    pass
+            stats.files_copied += 1
+            stats.bytes_written += src_size
+            written.append(dst)
+            if first is None:
+                first = dst
+
+        with self._lock:
+            self.stats.merge(stats)
+        return written
+
+    def move(self, src, dests: Iterable) -> List[Path]:
+        """把 src 移动到首个需要写入的目标，其余目标由该文件复制或链接；src 在返回后不再存在"""
+        src = Path(src)
+        src_size = src.stat().st_size
+        src_hash_cache: list = []
+        stats = CopyStats()
+        pending: List[Path] = []
+        for dst in dests:
+            dst = Path(dst)
+            if _is_same_content(src, dst, src_size, src_hash_cache):
+                stats.files_skipped += 1
+                stats.bytes_avoided += src_size
+            else:
+                pending.append(dst)
+
+        if not pending:
+            src.unlink(missing_ok=True)
+        else:
+            move_file(src, pending[0])
+            stats.files_moved += 1
+        with self._lock:
+            self.stats.merge(stats)
+        if not pending:
+            return []
+        return [pending[0]] + self.copy(pending[0], pending[1:])
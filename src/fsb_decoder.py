@@ -0,0 +1,229 @@
+"""
+FSB5 样本原生解码（不启动 fsb_aud_extr.exe）
+- PCM16/24/32/FLOAT：写出 wav 头后由内核直接从 bank 拷贝数据；PCM8 符号转换由 NumPy 整块完成
+- FADPCM：NumPy 按帧向量化解码（每帧自带历史值，所有帧可同时递推）
+- VORBIS：需要可选的 python-fsb5（重建 Ogg）与 soundfile（解码为 PCM16）
+按样本调用，可在多个线程中并发；不支持的样本由调用方退回外部工具
+"""
+import io
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 缺少 NumPy 时只支持直写 PCM
+    np = None
+
+from bank_reader import BankReader, SampleHeader
+
+# 直接写出的 PCM 编码 → (每采样字节数, WAV 格式码)
+PCM_FORMATS = {
+    "PCM8": (1, 1),
+    "PCM16": (2, 1),
+    "PCM24": (3, 1),
+    "PCM32": (4, 1),
+    "PCMFLOAT": (4, 3),
+}
+
+# FADPCM：每帧 0x0C 字节头（系数索引 u32、位移 u32、hist1 s16、hist2 s16）+ 0x80 字节 4 位数据
+FADPCM_FRAME_SIZE = 0x8C
+FADPCM_HEADER_SIZE = 0x0C
+FADPCM_FRAME_SAMPLES = 256
+FADPCM_COEFS = (
+    (0, 0), (60, 0), (122, 60), (115, 52), (98, 55), (0, 0), (0, 0), (0, 0),
+)
+
+
+class DecodeError(Exception):
+    """样本数据无法解码"""
+
+
+class UnsupportedCodecError(DecodeError):
+    """当前环境不支持该编码（缺少可选依赖或未实现）"""
+
+
+def wav_header(channels: int, frequency: int, sample_width: int, data_size: int, format_tag: int = 1) -> bytes:
+    block_align = channels * sample_width
+    return (b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, format_tag, channels, frequency,
+                                    frequency * block_align, block_align, sample_width * 8)
+            + b"data" + struct.pack("<I", data_size))
+
+
+def _vorbis_available() -> bool:
+    try:
+        import fsb5  # noqa: F401
+        import soundfile  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def supported_codecs() -> Tuple[str, ...]:
+    codecs = ["PCM16", "PCM24", "PCM32", "PCMFLOAT"]
+    if np is not None:
+        codecs += ["PCM8", "FADPCM"]
+        if _vorbis_available():
+            codecs.append("VORBIS")
+    return tuple(codecs)
+
+
+# ===========================
+# 各编码解码
+# ===========================
+def decode_fadpcm(data, channels: int, samples: int):
+    """FADPCM → int16 数组 (samples, channels)；多声道按帧交错存放"""
+    frame_count = len(data) // FADPCM_FRAME_SIZE
+    frame_count -= frame_count % channels
+    if frame_count == 0:
+        return np.zeros((0, channels), dtype=np.int16)
+    frames = np.frombuffer(data, dtype=np.uint8, count=frame_count * FADPCM_FRAME_SIZE)
+    frames = frames.reshape(frame_count, FADPCM_FRAME_SIZE)
+
+    header = np.ascontiguousarray(frames[:, :FADPCM_HEADER_SIZE])
+    coefs = header[:, 0:4].copy().view("<u4")[:, 0].astype(np.int64)
+    shifts = header[:, 4:8].copy().view("<u4")[:, 0].astype(np.int64)
+    hist = header[:, 8:12].copy().view("<i2").astype(np.int32)
+    hist1, hist2 = hist[:, 0], hist[:, 1]
+
+    # 每帧 8 组，每组 32 个采样共用一组系数与位移
+    groups = np.arange(8) * 4
+    index = ((coefs[:, None] >> groups) & 0xF) % 7
+    shift = ((shifts[:, None] >> groups) & 0xF).astype(np.int32)
+    table = np.array(FADPCM_COEFS, dtype=np.int32)
+    coef1, coef2 = table[index, 0], table[index, 1]
+
+    # 低半字节在前；(nibble << 28) >> (22 - shift) 等价于有符号半字节左移 (6 + shift)
+    payload = frames[:, FADPCM_HEADER_SIZE:]
+    nibbles = np.empty((frame_count, FADPCM_FRAME_SAMPLES), dtype=np.int32)
+    nibbles[:, 0::2] = payload & 0x0F
+    nibbles[:, 1::2] = payload >> 4
+    nibbles -= (nibbles >= 8) * 16
+    scaled = nibbles << (6 + np.repeat(shift, 32, axis=1))
+
+    out = np.empty((frame_count, FADPCM_FRAME_SAMPLES), dtype=np.int16)
+    for t in range(FADPCM_FRAME_SAMPLES):
+        g = t >> 5
+        value = (scaled[:, t] - hist2 * coef2[:, g] + hist1 * coef1[:, g]) >> 6
+        np.clip(value, -32768, 32767, out=value)
+        out[:, t] = value
+        hist2, hist1 = hist1, value
+
+    # (帧, 声道, 采样) → (采样, 声道)
+    out = out.reshape(frame_count // channels, channels, FADPCM_FRAME_SAMPLES).transpose(0, 2, 1)
+    return out.reshape(-1, channels)[:samples]
+
+
+def parse_fsb(fsb_block: bytes):
+    """用 python-fsb5 解析整个 FSB 块（样本头与名称表），供同一块内的 Vorbis 样本共用"""
+    try:
+        import fsb5
+    except ImportError as e:
+        raise UnsupportedCodecError(f"解码 Vorbis 需要 python-fsb5 与 soundfile: {e}")
+    try:
+        return fsb5.FSB5(fsb_block)
+    except Exception as e:
+        raise DecodeError(f"FSB 解析失败: {e}")
+
+
+def decode_vorbis(fsb, index: int):
+    """Vorbis → int16 数组 (samples, channels)；fsb 为 parse_fsb 的结果，FSB5 去掉了 Ogg 头，由 python-fsb5 按 CRC 重建"""
+    try:
+        import soundfile
+    except (ImportError, OSError) as e:
+        raise UnsupportedCodecError(f"解码 Vorbis 需要 python-fsb5 与 soundfile: {e}")
+    try:
+        ogg = fsb.rebuild_sample(fsb.samples[index])
+        pcm, _ = soundfile.read(io.BytesIO(ogg), dtype="int16", always_2d=True)
+    except Exception as e:
+        raise DecodeError(f"Vorbis 解码失败: {e}")
+    return pcm
+
+
+class SampleDecoder:
+    """按样本把 bank 中的音频解码为 wav"""
+
+    def __init__(self, reader: BankReader):
+        self.reader = reader
+        self.codecs = supported_codecs()
+        # fsb_index → 解析后的 FSB5；每个 FSB 块只从映射复制并解析一次，该块解码完成后由 release 释放
+        self._fsb_cache: Dict[int, object] = {}
+        self._fsb_lock = threading.Lock()
+
+    def supports(self, sample: SampleHeader) -> bool:
+        return sample.codec in self.codecs
+
+    def supports_all(self, samples: Iterable[SampleHeader]) -> bool:
+        return all(sample.codec in self.codecs for sample in samples)
+
+    def _parsed_fsb(self, sample: SampleHeader):
+        """样本所在 FSB 块的解析结果；在锁内解析，多个线程不会重复复制同一块"""
+        with self._fsb_lock:
+            fsb = self._fsb_cache.get(sample.fsb_index)
+            if fsb is None:
+                header = self.reader.fsb_headers()[sample.fsb_index]
+                fsb = parse_fsb(self.reader.mapping[header.offset:header.offset + header.size])
+                self._fsb_cache[sample.fsb_index] = fsb
+        return fsb
+
+    def release(self, fsb_index: int):
+        """释放该 FSB 块的解析结果（其中含整个块的副本）；之后再解码该块的样本会重新解析"""
+        with self._fsb_lock:
+            self._fsb_cache.pop(fsb_index, None)
+
+    def _pcm_layout(self, sample: SampleHeader) -> Tuple[bytes, int]:
+        """PCM 样本的 wav 头与数据字节数（去掉块尾对齐填充）"""
+        width, format_tag = PCM_FORMATS[sample.codec]
+        size = min(sample.samples * sample.channels * width, sample.length) if sample.samples else sample.length
+        size -= size % (sample.channels * width)
+        return wav_header(sample.channels, sample.frequency, width, size, format_tag), size
+
+    def decode(self, sample: SampleHeader) -> Tuple[bytes, object]:
+        """返回 (wav 头, 采样数据)；采样数据为 bytes 或 NumPy 数组，不引用 bank 映射"""
+        if not self.supports(sample):
+            raise UnsupportedCodecError(f"不支持的编码: {sample.codec} ({sample.name})")
+        if sample.codec == "VORBIS":
+            pcm = decode_vorbis(self._parsed_fsb(sample), sample.index)
+            return wav_header(pcm.shape[1], sample.frequency, 2, pcm.nbytes), pcm
+
+        with memoryview(self.reader.mapping) as mapping:
+            view = mapping[sample.offset:sample.offset + sample.length]
+            if sample.codec in PCM_FORMATS:
+                header, size = self._pcm_layout(sample)
+                if sample.codec == "PCM8":
+                    # FSB 中为有符号 8 位，WAV 为无符号 8 位
+                    data = np.frombuffer(view, dtype=np.uint8, count=size) ^ 0x80
+                else:
+                    data = bytes(view[:size])
+            else:
+                pcm = decode_fadpcm(view, sample.channels, sample.samples)
+                header, data = wav_header(sample.channels, sample.frequency, 2, pcm.nbytes), pcm
+            view.release()
+        return header, data
+
+    def write_wav(self, sample: SampleHeader, path) -> int:
+        """解码并写出 wav，返回写入字节数"""
+        if sample.codec in PCM_FORMATS and sample.codec != "PCM8":
+            # 无需转换：wav 头之后的数据走 BankReader 的零拷贝路径
+            header, size = self._pcm_layout(sample)
+            with open(path, "wb") as f:
+                f.write(header)
+                self.reader.copy_to(sample.offset, size, f)
+            return len(header) + size
+        header, data = self.decode(sample)
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(data)
+        return len(header) + (data.nbytes if hasattr(data, "nbytes") else len(data))
+
+    def extract_fsb(self, samples: Iterable[SampleHeader], out_dir: Path) -> int:
+        """把一组样本写入 out_dir/<样本名>.wav，返回写入字节数"""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        samples = list(samples)
+        try:
+            return sum(self.write_wav(sample, out_dir / f"{sample.name}.wav") for sample in samples)
+        finally:
+            for fsb_index in {sample.fsb_index for sample in samples}:
+                self.release(fsb_index)
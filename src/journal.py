@@ -0,0 +1,110 @@
+"""
+批处理断点日志
+一次批处理（同一组 bank → 输出目录任务）对应一个 JSON Lines 文件，逐行追加已完成的 bank 与已写出的文件
+中断（取消、崩溃、断电）后再次启动同一批任务时，跳过已完成的 bank，未完成 bank 中已写出的文件不再解码和复制
+全部成功后删除日志文件
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app_paths import get_cache_dir
+
+JOURNAL_DIR_NAME = "journals"
+
+
+def _bank_key(bank_file) -> str:
+    return os.path.normcase(os.path.abspath(str(bank_file)))
+
+
+def batch_id(tasks: Iterable[Tuple[str, str, str]]) -> str:
+    """任务集合的标识，与任务顺序无关"""
+    keys = sorted(json.dumps([_bank_key(bank), _bank_key(source), _bank_key(target)])
+                  for bank, source, target in tasks)
+    return hashlib.blake2b("\n".join(keys).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class BatchJournal:
+    """单次批处理的断点日志；记录方法可在多个工作线程中调用"""
+
+    def __init__(self, tasks: Iterable[Tuple[str, str, str]], journal_dir: Optional[Path] = None):
+        self.tasks = list(tasks)
+        journal_dir = journal_dir or get_cache_dir() / JOURNAL_DIR_NAME
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        self.path = journal_dir / f"batch_{batch_id(self.tasks)}.jsonl"
+        # bank 键 → 已完成；bank 键 → 已写出的相对路径
+        self.completed: Set[str] = set()
+        self.outputs: Dict[str, Set[str]] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """读取上次未完成的记录，存在记录时返回 True；末行可能因崩溃而不完整，直接忽略"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return False
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            key = record.get("bank")
+            if record.get("type") == "bank_done":
+                self.completed.add(key)
+            elif record.get("type") == "file":
+                self.outputs.setdefault(key, set()).add(record["output"])
+        return bool(self.completed or self.outputs)
+
+    def reset(self):
+        """丢弃上次的记录，从头开始"""
+        self.close()
+        self.completed.clear()
+        self.outputs.clear()
+        self.path.unlink(missing_ok=True)
+
+    def pending_tasks(self) -> List[Tuple[str, str, str]]:
+        return [task for task in self.tasks if _bank_key(task[0]) not in self.completed]
+
+    def is_completed(self, bank_file) -> bool:
+        return _bank_key(bank_file) in self.completed
+
+    def done_outputs(self, bank_file) -> Set[str]:
+        """该 bank 在上次中断前已写出的相对路径"""
+        with self._lock:
+            return set(self.outputs.get(_bank_key(bank_file), ()))
+
+    def _write(self, record: dict):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # 只刷新到操作系统，不逐行 fsync：进程崩溃不丢记录，断电时最多丢失末尾几行
+            self._file.flush()
+
+    def record_outputs(self, bank_file, outputs: Iterable[str]):
+        key = _bank_key(bank_file)
+        for rel in outputs:
+            self._write({"type": "file", "bank": key, "output": rel})
+
+    def bank_done(self, bank_file):
+        key = _bank_key(bank_file)
+        self._write({"type": "bank_done", "bank": key})
+        with self._lock:
+            self.completed.add(key)
+            self.outputs.pop(key, None)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish(self):
+        """批处理全部成功：删除日志文件"""
+        self.close()
+        self.path.unlink(missing_ok=True)
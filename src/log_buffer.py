@@ -0,0 +1,55 @@
+"""
+日志缓冲
+工作线程只把日志追加到缓冲区，GUI 定时批量取出后一次性写入界面与日志文件
+日志级别沿用 logging 模块的常量
+"""
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+# 界面中可选的日志级别
+LOG_LEVELS = (
+    ("详细", logging.DEBUG),
+    ("标准", logging.INFO),
+    ("仅警告和错误", logging.WARNING),
+)
+
+LogEntry = Tuple[str, int, str]
+
+
+class LogBuffer:
+    """线程安全的日志缓冲区"""
+
+    def __init__(self):
+        self._entries = deque()
+        self._lock = threading.Lock()
+
+    def append(self, text: str, level: int = logging.INFO):
+        entry = (time.strftime("%H:%M:%S"), level, text)
+        with self._lock:
+            self._entries.append(entry)
+
+    def drain(self) -> List[LogEntry]:
+        with self._lock:
+            entries = list(self._entries)
+            self._entries.clear()
+        return entries
+
+
+class LogFile:
+    """完整日志文件（不受界面日志级别与滚动行数限制）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write_lines(self, lines: Iterable[str]):
+        self._file.write("".join(f"{line}\n" for line in lines))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
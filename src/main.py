@@ -1,196 +1,305 @@
-import os
-import re
-import sys
-import shutil
-import subprocess
-import tempfile
-from datetime import datetime
-from pathlib import Path
+import time
 
-# PyQt5 imports
-from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
-    QPushButton, QLineEdit, QTreeWidget, QTreeWidgetItem, QLabel, 
-    QFileDialog, QTextEdit, QProgressBar, QMessageBox, QSplitter,
-    QCheckBox, QHeaderView, QMenu, QFrame, QAbstractItemView
-)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QFont, QIcon
+# 启动计时：从导入本模块开始
+STARTUP_T0 = time.perf_counter()
 
 import os
 import sys
-import time
-import shutil
-import subprocess
+import logging
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
 
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLabel, QLineEdit, QTreeWidget, QTreeWidgetItem, QProgressBar,
+    QLabel, QLineEdit, QTreeView, QProgressBar, QHeaderView,
     QTextEdit, QFileDialog, QMessageBox, QCheckBox, QSplitter,
-    QAbstractItemView, QMenu
+    QAbstractItemView, QMenu, QSpinBox, QComboBox
 )
 
+# 启动时只加载界面所需的轻量模块；流水线（NumPy 解码等）、搜索索引、样本库在首次使用时导入
+from app_paths import get_base_dir, get_log_dir
+from bank_scan import BankScanCache, STATUS_UNCHANGED
+from bank_model import BankFilterProxy, BankTableModel, COL_OUTPUT, COL_REF
+from scheduler import BankScheduler, default_concurrency, format_duration
+from log_buffer import LOG_LEVELS, LogBuffer, LogFile
+
+STARTUP_IMPORTED = time.perf_counter()
+
+# 日志刷新间隔、单次刷新写入界面的最大行数、界面保留的最大行数
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_MAX_LINES_PER_FLUSH = 500
+LOG_MAX_BLOCKS = 5000
+# 样本搜索结果在日志中列出的 bank 数与每个 bank 的样本数
+SEARCH_LOG_BANKS = 20
+SEARCH_LOG_SAMPLES = 5
+# 启动检查的外部工具
+REQUIRED_TOOLS = ("quickbms.exe", "Script.bms", "fsb_aud_extr.exe", "fmodex.dll", "fmodL.dll", "fmod_extr.exe")
+
+# 整体样式（Windows 11 风格）：在创建子控件之前一次性设置，避免逐个控件设置样式后整棵控件树重新计算
+STYLESHEET = """
+    QWidget {
+        background-color: #f5f5f5;
+        font-family: "Segoe UI", sans-serif;
+    }
+    QPushButton {
+        background-color: #0078d4;
+        color: white;
+        border: none;
+        border-radius: 6px;
+        padding: 8px 16px;
+        font-weight: bold;
+    }
+    QPushButton:hover { background-color: #106ebe; }
+    QPushButton:pressed { background-color: #005a9e; }
+    QPushButton:disabled { background-color: #a0c4ff; color: #ccc; }
+    /* “开始执行”按钮背景为浅蓝（符合原始设计） */
+    QPushButton#btnRun { background-color: #a0c4ff; }
+    QPushButton#btnRun:hover { background-color: #106ebe; }
+    QPushButton#btnRun:pressed { background-color: #6058ff; }
+    QPushButton#btnRun:disabled { background-color: #c8dcff; color: #aaa; }
+    QPushButton#btnStop { background-color: #ffadad; }
+    QPushButton#btnStop:hover { background-color: #e5383b; }
+    QPushButton#btnStop:disabled { background-color: #ffd6d6; color: #aaa; }
+    QMenu {
+        background-color: white;
+        color: black;
+        border: 1px solid #e0e0e0;
+        border-radius: 6px;
+        padding: 4px;
+    }
+    QMenu::item {
+        background-color: transparent;
+        color: black;
+        padding: 8px 16px;
+        border-radius: 4px;
+    }
+    QMenu::item:hover {
+        background-color: #0078d4;
+        color: white;
+    }
+    QMenu::item:selected {
+        background-color: #0078d4;
+        color: white;
+    }
+    QMenu::item:pressed {
+        background-color: #005a9e;
+        color: white;
+    }
+    QLineEdit {
+        border: 2px solid #e0e0e0;
+        border-radius: 6px;
+        padding: 8px;
+        background: white;
+        font-size: 13px;
+    }
+    QLineEdit:focus { border-color: #0078d4; }
+    QTreeView {
+        background-color: white;
+        border: 2px solid #e0e0e0;
+        border-radius: 6px;
+        alternate-background-color: #f8f9fa;
+        font-size: 13px;
+    }
+    QTreeView::header {
+        background-color: #f0f0f0;
+        border: none;
+        font-weight: bold;
+        font-size: 12px; /* 适当减小字体大小确保标题完整显示 */
+        padding: 6px 0;
+        min-height: 35px; /* 增加表头高度 */
+    }
+    QTreeView::header::section {
+        background-color: #f0f0f0;
+        border: none;
+        padding: 12px 10px; /* 增加左右内边距 */
+        border-right: 1px solid #d0d0d0;
+        text-align: left;
+        min-width: 100px; /* 增加最小宽度 */
+        spacing: 10px; /* 增加列间距 */
+    }
+    QTreeView::header::section:last {
+        border-right: none;
+    }
+    QTreeView::item {
+        padding: 4px;
+        border: none;
+    }
+    /* bank 列表行高与编辑框高度一致 */
+    QTreeView#bankTree::item {
+        height: 30px;
+    }
+    QTreeView::item:hover {
+        background-color: #e0e9f5;
+    }
+    QTreeView::item:selected {
+        background-color: #d0e3ff;
+        color: #000;
+    }
+    /* 滚动条样式 */
+    QScrollBar:vertical {
+        background-color: #f5f5f5;
+        width: 12px;
+        border-radius: 6px;
+        margin: 2px 0;
+    }
+    QScrollBar::handle:vertical {
+        background-color: #c1c1c1;
+        border-radius: 6px;
+        min-height: 20px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background-color: #a8a8a8;
+    }
+    QScrollBar::handle:vertical:pressed {
+        background-color: #888888;
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        border: none;
+        background: none;
+        height: 0;
+    }
+    QScrollBar:horizontal {
+        background-color: #f5f5f5;
+        height: 12px;
+        border-radius: 6px;
+        margin: 0 2px;
+    }
+    QScrollBar::handle:horizontal {
+        background-color: #c1c1c1;
+        border-radius: 6px;
+        min-width: 20px;
+    }
+    QScrollBar::handle:horizontal:hover {
+        background-color: #a8a8a8;
+    }
+    QScrollBar::handle:horizontal:pressed {
+        background-color: #888888;
+    }
+    QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
+        border: none;
+        background: none;
+        width: 0;
+    }
+    QLabel {
+        font-weight: bold;
+        color: #333;
+        font-size: 14px;
+    }
+    QLabel#tipLabel {
+        margin-bottom: 5px;
+    }
+    QCheckBox {
+        font-weight: normal;
+        color: #333;
+        font-size: 13px;
+    }
+    #logContainer, #logContainer * {
+        background-color: white;
+        border-radius: 8px;
+        padding: 5px;
+    }
+    /* 日志区域保持黑底白字 */
+    QTextEdit#logView {
+        background-color: #1e1e1e;
+        color: #dcdcdc;
+        border: 1px solid #444;
+        border-radius: 6px;
+        font-family: Consolas, monospace;
+        font-size: 12px;
+    }
+    QProgressBar {
+        border: 1px solid #ccc;
+        border-radius: 8px;
+        text-align: center;
+        background-color: #e0e0e0;
+    }
+    QProgressBar::chunk {
+        background-color: #0078d4;
+        border-radius: 6px;
+    }
+"""
+
 # ===========================
-# 获取程序所在目录（支持 EXE）
+# 后台任务线程：在 QThread 中运行 BankPipeline
 # ===========================
-def get_base_dir():
-    if getattr(sys, "frozen", False):
-        return os.path.dirname(sys.executable)
-    return os.path.dirname(os.path.abspath(__file__))
+class Worker(QThread):
+    progress_signal = pyqtSignal(int)
+    done_signal = pyqtSignal(str)
+
+    def __init__(self, bank_file, source_dir, target_dir, do_unpack, log=None, **options):
+        """log 为 (消息, 级别) 回调，在工作线程中调用，应只做缓冲"""
+        super().__init__()
+        from pipeline import BankPipeline
+        self.bank_file = bank_file
+        self.pipeline = BankPipeline(
+            bank_file, source_dir, target_dir, do_unpack,
+            log=log, progress=self.progress_signal.emit, **options)
 
+        self.ok = False
 
-BASE_DIR = get_base_dir()
-QUICKBMS_PATH = os.path.join(BASE_DIR, "quickbms.exe")
-SCRIPT_PATH = os.path.join(BASE_DIR, "Script.bms")
-FSB_EXTRACTOR_PATH = os.path.join(BASE_DIR, "fsb_aud_extr.exe")
+    def run(self):
+        try:
+            self.ok = self.pipeline.run()
+        finally:
+            self.done_signal.emit(self.bank_file)
 
 
 # ===========================
-# 后台任务线程（与 v9 完全相同，仅微调日志前缀）
+# 后台扫描线程：逐目录把 bank 列表发送给界面
 # ===========================
-class Worker(QThread):
-    log_signal = pyqtSignal(str)
-    progress_signal = pyqtSignal(int)
-    done_signal = pyqtSignal(str)
+class ScanWorker(QThread):
+    batch_signal = pyqtSignal(list)
+    done_signal = pyqtSignal(int, str)
 
-    def __init__(self, bank_file, source_dir, target_dir, do_unpack):
+    def __init__(self, scan_cache: BankScanCache):
         super().__init__()
-        self.bank_file = bank_file
-        self.source_dir = Path(source_dir)
-        self.target_dir = Path(target_dir)
-        self.do_unpack = do_unpack
-
-    def _log(self, msg: str):
-        self.log_signal.emit(msg)
-
-    def _run_with_log(self, cmd, cwd=None, prefix="[log]"):
-        cmd_str = '" "'.join(cmd)
-        self._log(f"{prefix} 执行命令: {cmd_str}")
-        process = subprocess.Popen(
-            cmd,
-            cwd=cwd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
-            errors="ignore"
-        )
-        for line in process.stdout:
-            line = line.rstrip()
-            if line:
-                self._log(f"{prefix} {line}")
-        process.wait()
-        return process.returncode
-
-    def find_audio_roots(self, root_dir):
-        audio_dirs = []
-        for root, dirs, files in os.walk(root_dir):
-            for f in files:
-                if f.lower().endswith(".wav"):
-                    audio_dirs.append(root)
-                    break
-        return audio_dirs
-
-    @staticmethod
-    def get_core_filename(file_name):
-        stem = Path(file_name).stem.lower()
-        match = re.match(r'^([a-z]{2,3}_)(.*)$', stem)
-        return match.group(2) if match else stem
+        self.scan_cache = scan_cache
 
     def run(self):
-        bank_name = Path(self.bank_file).stem
-
-        with tempfile.TemporaryDirectory(prefix="WT_AudioTool_") as temp_root:
-            try:
-                self.progress_signal.emit(0)
-                bank_output_dir = Path(temp_root) / bank_name
-                bank_output_dir.mkdir(parents=True, exist_ok=True)
-
-                if self.do_unpack:
-                    self._unpack_banks_and_fsb(bank_output_dir)
-
-                audio_roots = self.find_audio_roots(bank_output_dir)
-                if not audio_roots:
-                    self._log(f"[{bank_name}] [错误] 未找到任何 wav 文件")
-                    self.done_signal.emit(self.bank_file)
-                    return
-
-                self._log(f"[{bank_name}] [信息] 找到 {len(audio_roots)} 个音频目录")
-                self._copy_audio_by_structure(audio_roots, bank_output_dir)
-
-                self.progress_signal.emit(100)
-            except Exception as e:
-                self._log(f"[{bank_name}] [错误] {e}")
-            finally:
-                self.done_signal.emit(self.bank_file)
-
-    def _unpack_banks_and_fsb(self, out_dir: Path):
-        missing = []
-        for tool, path in [("quickbms.exe", QUICKBMS_PATH), ("Script.bms", SCRIPT_PATH), ("fsb_aud_extr.exe", FSB_EXTRACTOR_PATH)]:
-            if not os.path.exists(path):
-                missing.append(tool)
-        if missing:
-            self._log(f"[错误] 缺少工具: {', '.join(missing)}")
-            return
+        count = 0
+        error = ""
+        try:
+            for batch in self.scan_cache.scan():
+                count += len(batch)
+                self.batch_signal.emit(batch)
+        except (OSError, ValueError) as e:
+            error = str(e)
+        self.done_signal.emit(count, error)
 
-        self._log(">>> 开始解包 BANK 文件")
-        ret = self._run_with_log([QUICKBMS_PATH, SCRIPT_PATH, self.bank_file, str(out_dir)], prefix="[quickbms]")
-        if ret != 0:
-            self._log(f"[错误] QuickBMS 返回码: {ret}")
-
-        fsb_files = list(out_dir.glob("*.fsb"))
-        total = len(fsb_files) or 1
-        for i, fsb_path in enumerate(fsb_files):
-            fsb_out = out_dir / f"fsb_{fsb_path.stem}"
-            fsb_out.mkdir(exist_ok=True)
-            self._log(f">>> 解包 FSB: {fsb_path.name}")
-            ret = self._run_with_log([FSB_EXTRACTOR_PATH, str(fsb_path)], cwd=str(fsb_out), prefix="[fsb]")
-            if ret != 0:
-                self._log(f"[错误] fsb_aud_extr 返回码: {ret}")
-            self.progress_signal.emit(int((i + 1) / total * 40))
-
-        if not fsb_files:
-            self._log("[提示] 未发现 .fsb 文件")
-
-    def _copy_audio_by_structure(self, audio_roots, temp_root):
-        self._log("[信息] 正在构建参考结构文件名映射...")
-        ref_map = {}
-        for ref_path in self.source_dir.rglob("*.*"):
-            if ref_path.is_file():
-                core = self.get_core_filename(ref_path.name)
-                rel_dir = ref_path.parent.relative_to(self.source_dir)
-                ref_map.setdefault(core, []).append(rel_dir)
-
-        self._log(f"[信息] 参考结构中共有 {len(ref_map)} 个唯一核心文件名")
-
-        audio_files = []
-        for root in audio_roots:
-            audio_files.extend(Path(root).rglob("*.wav"))
-
-        total_audio = len(audio_files)
-        self._log(f"[信息] 共发现 {total_audio} 个 WAV 文件")
-
-        for idx, audio_path in enumerate(audio_files, 1):
-            file_name = audio_path.name
-            core = self.get_core_filename(file_name)
-
-            matches = ref_map.get(core, [])
-            if not matches:
-                self._log(f"[缺失匹配] 未找到: {file_name} (核心: {core})")
-            else:
-                for rel_dir in matches:
-                    dest_dir = self.target_dir / rel_dir
-                    dest_path = dest_dir / file_name
-                    dest_dir.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(audio_path, dest_path)
-                    self._log(f"[复制] {file_name} → {rel_dir / file_name}")
 
-            progress = 40 + int(idx / total_audio * 60)
-            self.progress_signal.emit(min(progress, 99))
+# ===========================
+# 后台索引线程：读取各 bank 的样本表写入搜索索引
+# ===========================
+class IndexWorker(QThread):
+    """结果在 finished 之后读取：此时 isRunning() 已为 False，可以立即启动下一次更新"""
+
+    def __init__(self, search_index, bank_files):
+        super().__init__()
+        self.search_index = search_index
+        self.bank_files = list(bank_files)
+        self.updated = 0
+
+    def run(self):
+        self.updated = self.search_index.update(self.bank_files)
+
+
+# ===========================
+# 后台搜索线程：SQLite 查询与模糊匹配不在界面线程中执行
+# ===========================
+class SearchWorker(QThread):
+    """结果在 finished 之后读取"""
+
+    def __init__(self, search_index, keyword):
+        super().__init__()
+        self.search_index = search_index
+        self.keyword = keyword
+        self.hits = {}
+
+    def run(self):
+        self.hits = self.search_index.search(self.keyword)
 
 
 # ===========================
@@ -203,31 +312,62 @@ class WTTool(QWidget):
         self.resize(1100, 800)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)
         
-        # 设置窗口图标
-        base_dir = get_base_dir()
-        # 当程序被打包后，需要从可执行文件所在目录向上找到项目根目录
-        # 可执行文件位于 dist/WarThunderAudioTool.exe
-        # 项目根目录是 dist/../.. = 项目根目录
-        if getattr(sys, "frozen", False):
-            # 打包后的情况：dist/WarThunderAudioTool.exe
-            project_root = os.path.dirname(os.path.dirname(base_dir))  # 向上两级到项目根目录
-        else:
-            # 未打包的情况：src/main.py
-            project_root = os.path.dirname(base_dir)  # 向上一级到项目根目录
-        icon_path = os.path.join(project_root, "ui", "favicon.ico")
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
+        # 设置窗口图标：从程序所在目录向上查找项目根目录下的 ui/favicon.ico
+        # 未打包：src/main.py；单文件打包：src/dist/WarThunderAudioTool.exe；目录打包：src/dist/WarThunderAudioTool/
+        icon_path = None
+        for root in list(Path(get_base_dir()).parents)[:3]:
+            candidate = root / "ui" / "favicon.ico"
+            if candidate.is_file():
+                icon_path = candidate
+                break
+        if icon_path is not None:
+            self.setWindowIcon(QIcon(str(icon_path)))
         else:
-            print(f"警告：未找到图标文件 {icon_path}")
+            print("警告：未找到图标文件 ui/favicon.ico")
 
         self.current_file_index = 0
         self.total_files = 0
         self.workers = []
+        self.scheduler = None
+        self.metrics_writer = None
+        self.batch_spans = []
+        self.batch_started = 0.0
+        self.cancel_event = None
+        self.journal = None
+        self.sample_store = None
+        self.transcoder = None
+        self.failed_count = 0
+        self.cancelled_count = 0
+        self.log_buffer = LogBuffer()
+        self.log_file = None
+        self.scan_cache = None
+        self.scan_worker = None
+        # 搜索索引在首次扫描或搜索时创建
+        self._search_index = None
+        self.index_worker = None
+        self.index_pending = False
+        self.search_worker = None
+        # 搜索进行中又输入了新关键词：结束后只按最新的关键词再搜索一次
+        self.search_pending = None
 
         self.init_ui()
-        self._check_tool_existence()
+
+        # 工作线程的日志先进入缓冲区，由定时器批量刷新到界面
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log_buffer)
+        self.log_timer.start(LOG_FLUSH_INTERVAL_MS)
+        # 工具检查涉及多次磁盘访问，推迟到窗口显示之后
+        QTimer.singleShot(0, self._check_tool_existence)
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            from search_index import SearchIndex
+            self._search_index = SearchIndex()
+        return self._search_index
 
     def init_ui(self):
+        self.setStyleSheet(STYLESHEET)
         main_layout = QVBoxLayout(self)
         main_layout.setSpacing(12)
         main_layout.setContentsMargins(15, 15, 15, 15)
@@ -261,7 +401,7 @@ class WTTool(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setMinimumWidth(300)
         #self.search_input.setFixedHeight(30)  # 与表格行高度一致
-        self.search_input.setPlaceholderText("输入关键词搜索银行文件...")
+        self.search_input.setPlaceholderText("输入 bank 名或样本名搜索...")
         self.search_input.returnPressed.connect(self.search_assets)
         top_layout.addWidget(self.search_input)
         btn_search = QPushButton("搜索")
@@ -291,7 +431,7 @@ class WTTool(QWidget):
 
         # === 3. 文件列表提示 ===
         tip_label = QLabel("找到的 .assets.bank 文件（双击""输出目录""或""参考结构目录""列设置路径）：")
-        tip_label.setStyleSheet("font-weight: bold; color: #333; margin-bottom: 5px;")
+        tip_label.setObjectName("tipLabel")
         main_layout.addWidget(tip_label)
 
         # === 4. Splitter：文件列表 + 日志 ===
@@ -302,8 +442,15 @@ class WTTool(QWidget):
         tree_vlayout = QVBoxLayout(tree_container)
         tree_vlayout.setContentsMargins(0, 0, 0, 0)
         # 在 init_ui() 中，创建 self.bank_tree 后替换原有设置
-        self.bank_tree = QTreeWidget()
-        self.bank_tree.setHeaderLabels(["选择", "Bank文件", "输出目录", "参考结构目录"])
+        self.bank_model = BankTableModel(self)
+        self.bank_proxy = BankFilterProxy(self)
+        self.bank_proxy.setSourceModel(self.bank_model)
+        self.bank_tree = QTreeView()
+        self.bank_tree.setObjectName("bankTree")
+        self.bank_tree.setModel(self.bank_proxy)
+        self.bank_tree.setRootIsDecorated(False)
+        # 所有行等高，视图只需计算可见区域
+        self.bank_tree.setUniformRowHeights(True)
         # 禁止直接编辑，只能通过双击触发对话框设置
         self.bank_tree.setEditTriggers(QAbstractItemView.NoEditTriggers)
         # 设置只能选择整行
@@ -318,6 +465,8 @@ class WTTool(QWidget):
         header.setSectionResizeMode(1, QHeaderView.Interactive)     # Bank文件列可手动拖拽
         header.setSectionResizeMode(2, QHeaderView.Interactive)     # 输出目录可手动拖拽
         header.setSectionResizeMode(3, QHeaderView.Interactive)     # 参考结构目录可手动拖拽
+        header.setSectionResizeMode(4, QHeaderView.Interactive)     # 大小
+        header.setSectionResizeMode(5, QHeaderView.Interactive)     # 状态
 
         # 设置足够初始宽度 + 最小宽度，防止任何截断
         header.setMinimumSectionSize(80)  # 最小80px，文字永不截断
@@ -325,17 +474,14 @@ class WTTool(QWidget):
         self.bank_tree.setColumnWidth(1, 200)  # Bank文件列初始200px
         self.bank_tree.setColumnWidth(2, 200)  # 输出目录初始200px
         self.bank_tree.setColumnWidth(3, 200)  # 参考结构目录初始200px
+        self.bank_tree.setColumnWidth(4, 90)
+        self.bank_tree.setColumnWidth(5, 80)
 
         self.bank_tree.setSortingEnabled(True)
         self.bank_tree.setAlternatingRowColors(True)  # 交替行颜色，更易读
 
         # 设置行高，与编辑框大小一致
         self.bank_tree.setIndentation(20)
-        self.bank_tree.setStyleSheet("""
-            QTreeWidget::item {
-                height: 30px;  /* 与编辑框高度一致 */
-            }
-        """)
 
         # 设置表头对齐方式
         header.setDefaultAlignment(Qt.AlignLeft)
@@ -345,24 +491,26 @@ class WTTool(QWidget):
 
         # 日志
         log_container = QWidget()
-        log_container.setStyleSheet("background-color: white; border-radius: 8px; padding: 5px;")
+        log_container.setObjectName("logContainer")
         log_vlayout = QVBoxLayout(log_container)
         log_vlayout.setContentsMargins(0, 0, 0, 0)
-        log_vlayout.addWidget(QLabel("日志："))
+        log_header = QHBoxLayout()
+        log_header.addWidget(QLabel("日志："))
+        log_header.addStretch()
+        log_header.addWidget(QLabel("日志级别："))
+        self.combo_log_level = QComboBox()
+        for name, level in LOG_LEVELS:
+            self.combo_log_level.addItem(name, level)
+        self.combo_log_level.setCurrentIndex(1)
+        self.combo_log_level.setToolTip("“标准”不显示逐文件复制与外部工具输出；完整日志始终写入日志文件")
+        log_header.addWidget(self.combo_log_level)
+        log_vlayout.addLayout(log_header)
         self.log = QTextEdit()
         self.log.setReadOnly(True)
+        # 限制界面保留的行数，避免长时间运行后追加变慢
+        self.log.document().setMaximumBlockCount(LOG_MAX_BLOCKS)
         self.log.setFont(QFont("Consolas", 12))
-        # 确保日志区域保持黑底白字
-        self.log.setStyleSheet("""
-            QTextEdit {
-                background-color: #1e1e1e;
-                color: #dcdcdc;
-                border: 1px solid #444;
-                border-radius: 6px;
-                font-family: Consolas, monospace;
-                font-size: 12px;
-            }
-        """)
+        self.log.setObjectName("logView")
         log_vlayout.addWidget(self.log)
 
         splitter.addWidget(tree_container)
@@ -400,30 +548,75 @@ class WTTool(QWidget):
         self.chk_unpack.setToolTip("勾选此项将先解包BANK文件和FSB文件，再进行音频文件复制")
         right_group.addWidget(self.chk_unpack)
 
+        right_group.addWidget(QLabel("输出方式："))
+        self.combo_copy_mode = QComboBox()
+        self.combo_copy_mode.addItem("复制", "copy")
+        self.combo_copy_mode.addItem("硬链接", "hardlink")
+        self.combo_copy_mode.addItem("reflink", "reflink")
+        self.combo_copy_mode.setToolTip("同一文件对应多个目录时，除首个外通过硬链接或 reflink 生成；内容相同的目标文件始终跳过")
+        right_group.addWidget(self.combo_copy_mode)
+
+        right_group.addWidget(QLabel("输出格式："))
+        self.combo_format = QComboBox()
+        self.combo_format.addItem("WAV", "wav")
+        self.combo_format.addItem("FLAC", "flac")
+        self.combo_format.addItem("OGG", "ogg")
+        self.combo_format.addItem("Opus", "opus")
+        self.combo_format.setToolTip("匹配的样本在后台进程中编码为所选格式后写出，目录结构不变（需要安装 soundfile）")
+        right_group.addWidget(self.combo_format)
+
+        self.chk_incremental = QCheckBox("增量模式")
+        self.chk_incremental.setChecked(True)
+        self.chk_incremental.setToolTip("跳过自上次处理后未发生变化的 bank（按大小、修改时间与内容哈希判断）")
+        right_group.addWidget(self.chk_incremental)
+
+        self.chk_direct = QCheckBox("直接写入输出目录")
+        self.chk_direct.setChecked(False)
+        self.chk_direct.setToolTip("解包结果暂存在输出目录内并直接移动到最终位置，不占用系统临时目录，写盘量减半")
+        right_group.addWidget(self.chk_direct)
+
+        self.chk_quarantine = QCheckBox("保留未匹配样本")
+        self.chk_quarantine.setChecked(False)
+        self.chk_quarantine.setToolTip("未在参考结构中找到的样本移入输出目录下的 _unmatched 文件夹，否则直接丢弃")
+        right_group.addWidget(self.chk_quarantine)
+
+        self.chk_store = QCheckBox("样本库去重")
+        self.chk_store.setChecked(False)
+        self.chk_store.setToolTip("匹配的样本按内容存入缓存目录的样本库，相同样本只存一份，再次解包时直接取用；"
+                                  "样本库与输出目录在同一磁盘时配合“硬链接”模式不占额外空间")
+        right_group.addWidget(self.chk_store)
+
+        right_group.addWidget(QLabel("并发数："))
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, 64)
+        self.spin_workers.setValue(default_concurrency())
+        self.spin_workers.setToolTip("同时处理的 bank 数量")
+        right_group.addWidget(self.spin_workers)
+
+        right_group.addWidget(QLabel("临时空间上限(GB)："))
+        self.spin_temp_gb = QSpinBox()
+        self.spin_temp_gb.setRange(0, 4096)
+        self.spin_temp_gb.setValue(0)
+        self.spin_temp_gb.setSpecialValueText("自动")
+        self.spin_temp_gb.setToolTip("所有并发任务的临时目录总占用上限，0 表示按剩余空间自动计算")
+        right_group.addWidget(self.spin_temp_gb)
+
         self.btn_run = QPushButton("开始执行")
         self.btn_run.setFixedHeight(36)
         self.btn_run.setMinimumWidth(160)
         self.btn_run.setEnabled(False)
         self.btn_run.setToolTip("开始处理选中的文件")
-        # 让“开始执行”按钮背景为浅蓝（符合原始设计）
-        self.btn_run.setStyleSheet("""
-            QPushButton {
-                background-color: #a0c4ff;
-                color: white;
-                border: none;
-                border-radius: 6px;
-                padding: 8px 16px;
-                font-weight: bold;
-            }
-            QPushButton:hover { background-color: #106ebe; }            QPushButton:pressed { background-color: #005a9e; }
-            QPushButton:pressed { background-color: #6058ff; }
-            QPushButton:disabled {
-                background-color: #c8dcff;
-                color: #aaa;
-            }
-        """)
+        self.btn_run.setObjectName("btnRun")
         right_group.addWidget(self.btn_run)
 
+        self.btn_stop = QPushButton("停止")
+        self.btn_stop.setFixedHeight(36)
+        self.btn_stop.setMinimumWidth(80)
+        self.btn_stop.setEnabled(False)
+        self.btn_stop.setToolTip("不再启动新的 bank，运行中的 bank 在下一个文件处停止；再次执行同一批任务时从断点继续")
+        self.btn_stop.setObjectName("btnStop")
+        right_group.addWidget(self.btn_stop)
+
         bottom_layout.addLayout(right_group)
         main_layout.addLayout(bottom_layout)
 
@@ -432,195 +625,51 @@ class WTTool(QWidget):
         self.progress.setFixedHeight(28)
         self.progress.setTextVisible(True)
         self.progress.setFormat("%p%")
-        # 优化进度条样式
-        self.progress.setStyleSheet("""
-            QProgressBar {
-                border: 1px solid #ccc;
-                border-radius: 8px;
-                text-align: center;
-                background-color: #e0e0e0;
-            }
-            QProgressBar::chunk {
-                background-color: #0078d4;
-                border-radius: 6px;
-            }
-        """)
         main_layout.addWidget(self.progress)
 
-        # === 整体样式（Windows 11 风格）===
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: "Segoe UI", sans-serif;
-            }
-            QPushButton {
-                background-color: #0078d4;
-                color: white;
-                border: none;
-                border-radius: 6px;
-                padding: 8px 16px;
-                font-weight: bold;
-            }
-            QPushButton:hover { background-color: #106ebe; }
-            QPushButton:pressed { background-color: #005a9e; }
-            QPushButton:disabled { background-color: #a0c4ff; color: #ccc; }
-            QMenu {
-                background-color: white;
-                color: black;
-                border: 1px solid #e0e0e0;
-                border-radius: 6px;
-                padding: 4px;
-            }
-            QMenu::item {
-                background-color: transparent;
-                color: black;
-                padding: 8px 16px;
-                border-radius: 4px;
-            }
-            QMenu::item:hover {
-                background-color: #0078d4;
-                color: white;
-            }
-            QMenu::item:selected {
-                background-color: #0078d4;
-                color: white;
-            }
-            QMenu::item:pressed {
-                background-color: #005a9e;
-                color: white;
-            }
-            QLineEdit {
-                border: 2px solid #e0e0e0;
-                border-radius: 6px;
-                padding: 8px;
-                background: white;
-                font-size: 13px;
-            }
-            QLineEdit:focus { border-color: #0078d4; }
-            QTreeWidget {
-                background-color: white;
-                border: 2px solid #e0e0e0;
-                border-radius: 6px;
-                alternate-background-color: #f8f9fa;
-                font-size: 13px;
-            }
-            QTreeWidget::header {
-                background-color: #f0f0f0;
-                border: none;
-                font-weight: bold;
-                font-size: 12px; /* 适当减小字体大小确保标题完整显示 */
-                padding: 6px 0;
-                min-height: 35px; /* 增加表头高度 */
-            }
-            QTreeWidget::header::section {
-                background-color: #f0f0f0;
-                border: none;
-                padding: 12px 10px; /* 增加左右内边距 */
-                border-right: 1px solid #d0d0d0;
-                text-align: left;
-                min-width: 100px; /* 增加最小宽度 */
-                spacing: 10px; /* 增加列间距 */
-            }
-            QTreeWidget::header::section:last {
-                border-right: none;
-            }
-            QTreeWidget::item {
-                padding: 4px;
-                border: none;
-            }
-            QTreeWidget::item:hover {
-                background-color: #e0e9f5;
-            }
-            QTreeWidget::item:selected {
-                background-color: #d0e3ff;
-                color: #000;
-            }
-            /* 滚动条样式 */
-            QScrollBar:vertical {
-                background-color: #f5f5f5;
-                width: 12px;
-                border-radius: 6px;
-                margin: 2px 0;
-            }
-            QScrollBar::handle:vertical {
-                background-color: #c1c1c1;
-                border-radius: 6px;
-                min-height: 20px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background-color: #a8a8a8;
-            }
-            QScrollBar::handle:vertical:pressed {
-                background-color: #888888;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                border: none;
-                background: none;
-                height: 0;
-            }
-            QScrollBar:horizontal {
-                background-color: #f5f5f5;
-                height: 12px;
-                border-radius: 6px;
-                margin: 0 2px;
-            }
-            QScrollBar::handle:horizontal {
-                background-color: #c1c1c1;
-                border-radius: 6px;
-                min-width: 20px;
-            }
-            QScrollBar::handle:horizontal:hover {
-                background-color: #a8a8a8;
-            }
-            QScrollBar::handle:horizontal:pressed {
-                background-color: #888888;
-            }
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-                border: none;
-                background: none;
-                width: 0;
-            }
-            QLabel { 
-                font-weight: bold; 
-                color: #333;
-                font-size: 14px;
-            }
-            QCheckBox { 
-                font-weight: normal; 
-                color: #333;
-                font-size: 13px;
-            }
-        """)
-
         # 信号连接
         self.game_dir.textChanged.connect(self.normalize_path)
         self.game_dir.textChanged.connect(self.check_scan_button)
         self.source_dir.textChanged.connect(self.check_scan_button)
         self.btn_scan.clicked.connect(self.scan_game_dir)
         self.btn_run.clicked.connect(self.run_all)
-        self.bank_tree.itemChanged.connect(self.on_item_changed)
-        self.bank_tree.itemDoubleClicked.connect(self.edit_output_dir)
+        self.btn_stop.clicked.connect(self.stop_all)
+        self.bank_model.checked_count_changed.connect(self.check_run_button)
+        self.bank_tree.doubleClicked.connect(self.on_bank_double_clicked)
         self.bank_tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.bank_tree.customContextMenuRequested.connect(self.show_context_menu)
 
     # === 其余方法与 v9 完全相同（仅复制关键部分）===
-    def on_item_changed(self, item, column):
-        if column == 0:
-            self.check_run_button()
-
     def check_scan_button(self):
         self.btn_scan.setEnabled(bool(self.game_dir.text().strip()))
 
     def check_run_button(self):
         """检查开始执行按钮是否可用：必须有选中文件且防呆设计勾选"""
-        has_checked = any(self.bank_tree.topLevelItem(i).checkState(0) == Qt.Checked
-                          for i in range(self.bank_tree.topLevelItemCount()))
+        has_checked = self.bank_model.checked_count > 0
         # 按钮可用条件：有选中文件 且 防呆设计勾选
         self.btn_run.setEnabled(has_checked and self.chk_unpack.isChecked())
 
-    def log_print(self, text: str):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log.append(f"[{timestamp}] {text}")
+    def log_print(self, text: str, level: int = logging.INFO):
+        self.log_buffer.append(text, level)
+
+    def flush_log_buffer(self):
+        """把缓冲的日志一次性写入日志文件与界面"""
+        entries = self.log_buffer.drain()
+        if not entries:
+            return
+        if self.log_file is None:
+            self.log_file = LogFile(get_log_dir() / f"wt_audio_{datetime.now():%Y%m%d}.log")
+        lines = [f"[{timestamp}] {text}" for timestamp, _, text in entries]
+        self.log_file.write_lines(lines)
+
+        threshold = self.combo_log_level.currentData()
+        visible = [line for (_, level, _), line in zip(entries, lines) if level >= threshold]
+        if not visible:
+            return
+        if len(visible) > LOG_MAX_LINES_PER_FLUSH:
+            skipped = len(visible) - LOG_MAX_LINES_PER_FLUSH
+            visible = [f"... 已省略 {skipped} 行，完整日志见 {self.log_file.path}"] + visible[-LOG_MAX_LINES_PER_FLUSH:]
+        self.log.append("\n".join(visible))
         self.log.ensureCursorVisible()
     
     def normalize_path(self):
@@ -648,82 +697,121 @@ class WTTool(QWidget):
         if path:
             self.source_dir.setText(path)
 
-    def edit_output_dir(self, item, column):
-        if column == 2:
-            dir_path = QFileDialog.getExistingDirectory(self, "选择输出目录", item.text(2))
+    def on_bank_double_clicked(self, index):
+        self.edit_output_dir(self.bank_proxy.mapToSource(index).row(), index.column())
+
+    def edit_output_dir(self, row_number, column):
+        row = self.bank_model.rows[row_number]
+        if column == COL_OUTPUT:
+            dir_path = QFileDialog.getExistingDirectory(self, "选择输出目录", row.output)
             if dir_path:
-                item.setText(2, dir_path)
-        elif column == 3:
-            default = item.text(3) or self.source_dir.text().strip()
+                self.bank_model.update_row(row_number, output=dir_path)
+        elif column == COL_REF:
+            default = row.reference or self.source_dir.text().strip()
             dir_path = QFileDialog.getExistingDirectory(self, "选择参考结构目录", default)
             if dir_path:
-                item.setText(3, dir_path)
+                self.bank_model.update_row(row_number, reference=dir_path)
 
     def scan_game_dir(self):
-        game_dir = Path(self.game_dir.text().strip())
-        if not game_dir.is_dir():
-            QMessageBox.warning(self, "错误", "请正确选择游戏目录")
-            return
-
-        sound_dir = game_dir / "sound"
-        if not sound_dir.is_dir():
-            QMessageBox.warning(self, "错误", "未找到 sound 文件夹")
+        """在后台线程扫描 sound 目录，结果按目录分批加入列表"""
+        if self.scan_worker is not None and self.scan_worker.isRunning():
             return
-
-        self.bank_tree.clear()
+        game_dir = Path(self.game_dir.text().strip())
+        self.bank_model.clear()
+        self.flush_log_buffer()
         self.log.clear()
-        self.log_print(f"[信息] 扫描目录: {sound_dir}")
+        self.log_print(f"[信息] 扫描目录: {game_dir / 'sound'}")
 
-        bank_files = list(sound_dir.rglob("*.assets.bank"))
-        self.log_print(f"[信息] 找到 {len(bank_files)} 个 .assets.bank 文件")
+        self.btn_scan.setEnabled(False)
+        # 扫描期间关闭排序，避免每批插入都重新排序
+        self.bank_tree.setSortingEnabled(False)
+        self.scan_cache = BankScanCache(game_dir)
+        self.scan_worker = ScanWorker(self.scan_cache)
+        self.scan_worker.batch_signal.connect(self.on_scan_batch)
+        self.scan_worker.done_signal.connect(self.on_scan_done)
+        self.scan_worker.start()
+
+    def on_scan_batch(self, batch):
+        self.bank_model.append_entries(batch, reference=self.source_dir.text().strip())
+
+    def on_scan_done(self, count, error):
+        self.bank_tree.setSortingEnabled(True)
+        self.check_scan_button()
+        if error:
+            QMessageBox.warning(self, "错误", error)
+            return
+        self.log_print(f"[信息] 找到 {count} 个 .assets.bank 文件")
+        self.start_index_update()
 
-        global_source = self.source_dir.text().strip()
-        for bank_file in bank_files:
-            item = QTreeWidgetItem(self.bank_tree)
-            item.setFlags(item.flags() | Qt.ItemIsEditable)
-            item.setCheckState(0, Qt.Unchecked)
-            item.setText(1, str(bank_file))
-            item.setText(2, "")
-            item.setText(3, global_source)
+    def start_index_update(self):
+        """样本名索引在后台更新，只解析新增或变化的 bank；正在更新时等其结束后再执行一次"""
+        if self.index_worker is not None and self.index_worker.isRunning():
+            self.index_pending = True
+            return
+        self.index_pending = False
+        if self.index_worker is not None:
+            # 上一个线程已发出 finished，等它完全退出后再释放
+            self.index_worker.wait()
+        self.index_worker = IndexWorker(self.search_index, [row.path for row in self.bank_model.rows])
+        self.index_worker.finished.connect(self.on_index_done)
+        self.index_worker.start()
+
+    def on_index_done(self):
+        updated = self.index_worker.updated
+        if updated:
+            self.log_print(f"[信息] 样本名索引已更新 {updated} 个 bank")
+        if self.index_pending:
+            self.start_index_update()
 
     def get_checked_items(self):
-        return [self.bank_tree.topLevelItem(i) for i in range(self.bank_tree.topLevelItemCount())
-                if self.bank_tree.topLevelItem(i).checkState(0) == Qt.Checked]
+        return self.bank_model.checked_rows()
 
     def search_assets(self):
-        keyword = self.search_input.text().strip().lower()
-        count = 0
-        for i in range(self.bank_tree.topLevelItemCount()):
-            item = self.bank_tree.topLevelItem(i)
-            visible = not keyword or keyword in item.text(1).lower()
-            item.setHidden(not visible)
-            if visible:
-                count += 1
-        self.log_print(f"[信息] 搜索完成，显示 {count} 个文件")
+        """按 bank 路径与其中的样本名搜索（样本名支持前缀、子串与模糊匹配）；样本名查询在后台线程执行"""
+        keyword = self.search_input.text().strip()
+        if not keyword:
+            self.search_pending = None
+            self.show_search_results(keyword, {})
+            return
+        if self.search_worker is not None and self.search_worker.isRunning():
+            self.search_pending = keyword
+            return
+        self.search_pending = None
+        if self.search_worker is not None:
+            self.search_worker.wait()
+        self.search_worker = SearchWorker(self.search_index, keyword)
+        self.search_worker.finished.connect(self.on_search_done)
+        self.search_worker.start()
+
+    def on_search_done(self):
+        if self.search_pending is not None:
+            # 结果已过时，按最新的关键词重新搜索
+            self.search_assets()
+            return
+        self.show_search_results(self.search_worker.keyword, self.search_worker.hits)
+
+    def show_search_results(self, keyword, sample_hits):
+        self.bank_proxy.set_search(keyword, sample_hits)
+        self.log_print(f"[信息] 搜索完成，显示 {self.bank_proxy.rowCount()} 个文件")
+        if sample_hits:
+            self.log_print(f"[信息] {len(sample_hits)} 个 bank 含匹配的样本：")
+            for bank_file, names in list(sample_hits.items())[:SEARCH_LOG_BANKS]:
+                more = " …" if len(names) > SEARCH_LOG_SAMPLES else ""
+                self.log_print(f"  {Path(bank_file).name}: {', '.join(names[:SEARCH_LOG_SAMPLES])}{more}")
 
     def select_all(self):
-        count = 0
-        for i in range(self.bank_tree.topLevelItemCount()):
-            item = self.bank_tree.topLevelItem(i)
-            if not item.isHidden():
-                item.setCheckState(0, Qt.Checked)
-                count += 1
-        self.log_print(f"[信息] 已全选 {count} 个可见文件")
-        self.check_run_button()
+        rows = self.bank_proxy.source_rows()
+        self.bank_model.set_checked(rows, True)
+        self.log_print(f"[信息] 已全选 {len(rows)} 个可见文件")
 
     def deselect_all(self):
-        count = 0
-        for i in range(self.bank_tree.topLevelItemCount()):
-            item = self.bank_tree.topLevelItem(i)
-            if not item.isHidden():
-                item.setCheckState(0, Qt.Unchecked)
-                count += 1
-        self.log_print(f"[信息] 已取消全选 {count} 个可见文件")
-        self.check_run_button()
+        rows = self.bank_proxy.source_rows()
+        self.bank_model.set_checked(rows, False)
+        self.log_print(f"[信息] 已取消全选 {len(rows)} 个可见文件")
 
     def _check_tool_existence(self):
-        tools = ["quickbms.exe", "Script.bms", "fsb_aud_extr.exe", "fmodex.dll", "fmodL.dll", "fmod_extr.exe"]
-        missing = [t for t in tools if not os.path.exists(os.path.join(BASE_DIR, t))]
+        base_dir = get_base_dir()
+        missing = [t for t in REQUIRED_TOOLS if not os.path.exists(os.path.join(base_dir, t))]
         if missing:
             self.log_print(f"[警告] 缺少工具: {', '.join(missing)}")
         else:
@@ -732,13 +820,13 @@ class WTTool(QWidget):
     def run_all(self):
         global_source = self.source_dir.text().strip()
         tasks = []
-        for item in self.get_checked_items():
-            bank_file = item.text(1)
-            output_dir = item.text(2).strip()
+        for row in self.get_checked_items():
+            bank_file = row.path
+            output_dir = row.output.strip()
             if not output_dir:
                 QMessageBox.warning(self, "错误", f"{Path(bank_file).name} 未设置输出目录")
                 return
-            ref_dir = item.text(3).strip() or global_source
+            ref_dir = row.reference.strip() or global_source
             if not ref_dir:
                 QMessageBox.warning(self, "错误", f"{Path(bank_file).name} 未设置参考结构目录")
                 return
@@ -748,70 +836,216 @@ class WTTool(QWidget):
             QMessageBox.warning(self, "错误", "请至少选择一个文件")
             return
 
-        for w in [self.btn_run, self.btn_scan, self.select_all_button, self.deselect_all_button]:
+        from journal import BatchJournal
+        from metrics import MetricsWriter
+        from sample_store import SampleStore
+        from transcode import Transcoder
+
+        output_format = self.combo_format.currentData()
+        try:
+            self.transcoder = Transcoder(output_format) if output_format != "wav" else None
+        except ValueError as e:
+            QMessageBox.warning(self, "错误", str(e))
+            return
+
+        # 同一批任务上次被中断时，询问是否从断点继续
+        self.journal = BatchJournal(tasks)
+        if self.journal.load():
+            pending = self.journal.pending_tasks()
+            answer = QMessageBox.question(
+                self, "继续上次的处理",
+                f"这批任务上次未完成（已完成 {len(tasks) - len(pending)}/{len(tasks)} 个 bank）。\n"
+                f"是否从断点继续？选择“否”将从头开始。",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if answer == QMessageBox.Yes:
+                self.log_print(f"[信息] 从断点继续：跳过 {len(tasks) - len(pending)} 个已完成的 bank")
+                tasks = pending
+            else:
+                self.journal.reset()
+
+        for w in [self.btn_run, self.btn_scan, self.select_all_button, self.deselect_all_button,
+                  self.spin_workers, self.spin_temp_gb, self.chk_incremental, self.combo_copy_mode,
+                  self.combo_format, self.chk_direct, self.chk_quarantine, self.chk_store]:
             w.setEnabled(False)
 
         self.progress.setValue(0)
+        self.progress.setFormat("%p%")
         self.current_file_index = 0
         self.total_files = len(tasks)
         self.workers = []
+        self.cancel_event = threading.Event()
+        self.sample_store = SampleStore() if self.chk_store.isChecked() else None
+        self.failed_count = 0
+        self.cancelled_count = 0
+        self.batch_spans = []
+        self.batch_started = time.perf_counter()
+        self.metrics_writer = MetricsWriter(get_log_dir() / f"metrics_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+        temp_gb = self.spin_temp_gb.value()
+        if temp_gb:
+            temp_budget = temp_gb * 1024 ** 3
+        else:
+            # 直写模式不占用系统临时目录，不按其剩余空间限制并发
+            temp_budget = 0 if self.chk_direct.isChecked() else None
+        self.scheduler = BankScheduler(
+            tasks,
+            max_workers=self.spin_workers.value(),
+            temp_budget=temp_budget,
+        )
 
-        self.log_print(f"[信息] 开始处理 {self.total_files} 个文件")
+        self.log_print(f"[信息] 开始处理 {self.total_files} 个文件（并发 {self.scheduler.max_workers}）")
+        self.btn_stop.setEnabled(True)
+        if self.scheduler.finished:
+            # 断点中的 bank 已全部完成
+            self.on_all_done()
+            return
+        self._start_ready_workers()
 
-        for bank_file, source_dir, target_dir in tasks:
+    def stop_all(self):
+        """请求停止：丢弃未启动的 bank，通知运行中的 bank 尽快结束"""
+        if self.scheduler is None or self.cancel_event is None:
+            return
+        self.btn_stop.setEnabled(False)
+        self.cancel_event.set()
+        dropped = self.scheduler.cancel()
+        self.cancelled_count += dropped
+        self.log_print(f"[取消] 正在停止：{dropped} 个 bank 未启动，等待 {len(self.scheduler.running)} 个运行中的 bank 结束",
+                       logging.WARNING)
+
+    def _start_ready_workers(self):
+        # bank 级并发与 FSB 级并发的乘积约等于 CPU 核数
+        fsb_workers = max(1, (os.cpu_count() or 1) // self.scheduler.max_workers)
+        for bank_file, source_dir, target_dir in self.scheduler.next_ready():
             basename = Path(bank_file).stem
             self.log_print(f"\n[信息] ====== 开始处理: {basename} ======")
 
-            worker = Worker(bank_file, source_dir, target_dir, self.chk_unpack.isChecked())
-            worker.log_signal.connect(lambda msg, b=basename: self.log_print(f"[{b}] {msg}"))
-            worker.progress_signal.connect(self.update_progress)
+            worker = Worker(bank_file, source_dir, target_dir, self.chk_unpack.isChecked(),
+                            log=lambda msg, level, b=basename: self.log_buffer.append(f"[{b}] {msg}", level),
+                            fsb_workers=fsb_workers, incremental=self.chk_incremental.isChecked(),
+                            copy_mode=self.combo_copy_mode.currentData(),
+                            direct=self.chk_direct.isChecked(), quarantine=self.chk_quarantine.isChecked(),
+                            cancel_event=self.cancel_event, journal=self.journal, store=self.sample_store,
+                            transcoder=self.transcoder)
+            worker.progress_signal.connect(lambda value, f=bank_file: self.update_progress(f, value))
             worker.done_signal.connect(self.on_file_done)
             self.workers.append(worker)
+            worker.start()
 
-        if self.workers:
-            self.workers[0].start()
-
-    def update_progress(self, value):
-        if self.total_files == 0:
+    def update_progress(self, bank_file, value):
+        if self.scheduler is None or self.total_files == 0:
             self.progress.setValue(0)
             return
-        overall = (self.current_file_index * 100 + value) // self.total_files
-        self.progress.setValue(min(overall, 100))
+        self._show_overall(self.scheduler.update(bank_file, value))
+
+    def _show_overall(self, value):
+        """总体进度与按已用时间估算的剩余时间"""
+        self.progress.setValue(value)
+        eta = self.scheduler.eta()
+        self.progress.setFormat(f"%p%  剩余约 {format_duration(eta)}" if eta is not None else "%p%")
 
     def on_file_done(self, file_path):
         basename = Path(file_path).stem
         self.log_print(f"[信息] ====== {basename} 处理完成 ======")
-        self.current_file_index += 1
-        if self.current_file_index < len(self.workers):
-            self.workers[self.current_file_index].start()
-        else:
+        for worker in self.workers:
+            if worker.bank_file == file_path:
+                spans = worker.pipeline.metrics.spans
+                self.batch_spans.extend(spans)
+                self.metrics_writer.write(spans)
+                if worker.pipeline.cancelled:
+                    self.cancelled_count += 1
+                elif not worker.ok:
+                    self.failed_count += 1
+                if worker.ok and self.scan_cache is not None:
+                    self.scan_cache.mark_processed([file_path])
+                    row_number = self.bank_model.row_by_path(file_path)
+                    if row_number is not None:
+                        self.bank_model.update_row(row_number, status=STATUS_UNCHANGED)
+                break
+        self.scheduler.task_done(file_path)
+        self.current_file_index = self.scheduler.completed
+        self._show_overall(self.scheduler.overall())
+        if self.scheduler.finished:
             self.on_all_done()
+        else:
+            self._start_ready_workers()
 
     def on_all_done(self):
-        self.progress.setValue(100)
-        for w in [self.btn_run, self.btn_scan, self.select_all_button, self.deselect_all_button]:
+        from metrics import format_summary
+
+        self.btn_stop.setEnabled(False)
+        self.progress.setFormat("%p%")
+        for w in [self.btn_run, self.btn_scan, self.select_all_button, self.deselect_all_button,
+                  self.spin_workers, self.spin_temp_gb, self.chk_incremental, self.combo_copy_mode,
+                  self.combo_format, self.chk_direct, self.chk_quarantine, self.chk_store]:
             w.setEnabled(True)
-        self.log_print("\n[完成] 全部处理完毕！")
+        if self.cancel_event.is_set():
+            # 保留断点日志，下次执行同一批任务时询问是否继续
+            self.journal.close()
+            self.log_print(f"\n[取消] 已停止，{self.cancelled_count} 个 bank 未完成，再次执行同一批任务可从断点继续",
+                           logging.WARNING)
+        else:
+            self.progress.setValue(100)
+            if self.failed_count:
+                self.journal.close()
+            else:
+                self.journal.finish()
+            self.log_print("\n[完成] 全部处理完毕！")
+        elapsed = time.perf_counter() - self.batch_started
+        self.log_print(f"[统计] 总耗时 {elapsed:.2f}s（各阶段为所有 bank 累计耗时，并行时会大于总耗时）")
+        for line in format_summary(self.batch_spans):
+            self.log_print(f"[统计] {line}")
+        if self.sample_store is not None:
+            for line in self.sample_store.summary_lines(with_refs=self.transcoder is None):
+                self.log_print(f"[统计] {line}")
+        if self.transcoder is not None:
+            self.transcoder.shutdown()
+            self.log_print(f"[统计] {self.transcoder.stats.summary(self.transcoder.fmt)}")
+        self.log_print(f"[统计] 指标文件: {self.metrics_writer.path}")
 
     def show_context_menu(self, position):
-        item = self.bank_tree.itemAt(position)
-        if not item:
+        index = self.bank_tree.indexAt(position)
+        if not index.isValid():
             return
+        row_number = self.bank_proxy.mapToSource(index).row()
         menu = QMenu(self)
-        menu.addAction("设置输出目录", lambda: self.edit_output_dir(item, 2))
-        menu.addAction("设置参考结构目录", lambda: self.edit_output_dir(item, 3))
+        menu.addAction("设置输出目录", lambda: self.edit_output_dir(row_number, COL_OUTPUT))
+        menu.addAction("设置参考结构目录", lambda: self.edit_output_dir(row_number, COL_REF))
         menu.addSeparator()  # 添加分隔线
-        menu.addAction("清除设置", lambda: self.clear_settings(item))
+        menu.addAction("清除设置", lambda: self.clear_settings(row_number))
         menu.exec_(self.bank_tree.viewport().mapToGlobal(position))
     
-    def clear_settings(self, item):
+    def clear_settings(self, row_number):
         """清除输出目录和参考结构目录的路径"""
-        item.setText(2, "")  # 清除输出目录（第2列）
-        item.setText(3, "")  # 清除参考结构目录（第3列）
+        self.bank_model.update_row(row_number, output="", reference="")
+
+    def report_startup(self, app_created: float, window_created: float, exit_after: bool = False):
+        """首次进入事件循环时输出启动耗时（导入 / 创建 QApplication / 构建界面 / 首次显示）"""
+        shown = time.perf_counter()
+        parts = [
+            ("导入", STARTUP_IMPORTED - STARTUP_T0),
+            ("QApplication", app_created - STARTUP_IMPORTED),
+            ("构建界面", window_created - app_created),
+            ("首次显示", shown - window_created),
+        ]
+        detail = "，".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in parts)
+        message = f"[信息] 启动耗时 {(shown - STARTUP_T0) * 1000:.0f} ms（{detail}）"
+        self.log_print(message)
+        if exit_after:
+            print(message)
+            self.flush_log_buffer()
+            QApplication.quit()
 
 
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        # 打包后的程序启动转码进程池时需要；未打包时不导入，避免拖慢启动
+        import multiprocessing
+        multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    app_created = time.perf_counter()
     window = WTTool()
+    window_created = time.perf_counter()
     window.show()
+    # --startup-time：输出启动耗时后退出，用于比较不同打包方式
+    QTimer.singleShot(0, lambda: window.report_startup(app_created, window_created,
+                                                       "--startup-time" in sys.argv))
     sys.exit(app.exec_())
\ No newline at end of file
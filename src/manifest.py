@@ -0,0 +1,125 @@
+"""
+增量解包清单
+在输出目录中记录每个已处理 bank 的大小、mtime、内容哈希、处理设置（含参考结构指纹）与写出的文件列表
+再次执行时跳过未变化的 bank，只重新处理游戏更新后变化的部分
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+MANIFEST_NAME = ".wt_audio_manifest.json"
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+_manifests: Dict[str, "Manifest"] = {}
+_manifests_lock = threading.Lock()
+
+
+def _bank_key(bank_file) -> str:
+    return os.path.normcase(os.path.abspath(str(bank_file)))
+
+
+def hash_file(path) -> str:
+    """blake2b 内容哈希（128 位），分块读取"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """单个输出目录的清单，同一进程内多个 Worker 共享一个实例"""
+
+    def __init__(self, target_dir):
+        self.target_dir = Path(target_dir)
+        self.path = self.target_dir / MANIFEST_NAME
+        self.banks: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.banks = data.get("banks", {})
+
+    def _save(self):
+        self.target_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "banks": self.banks}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def check(self, bank_file, source_dir, output_format: str = "wav",
+              settings: Optional[dict] = None) -> Optional[str]:
+        """bank 未变化、输出格式与处理设置（含参考结构指纹）相同且输出齐全时返回其哈希，否则返回 None"""
+        with self._lock:
+            entry = self.banks.get(_bank_key(bank_file))
+        if not entry or entry.get("source_dir") != _bank_key(source_dir):
+            return None
+        if entry.get("output_format", "wav") != output_format or entry.get("settings") != settings:
+            return None
+        try:
+            st = os.stat(bank_file)
+        except OSError:
+            return None
+        if st.st_size != entry.get("size"):
+            return None
+        if st.st_mtime_ns != entry.get("mtime_ns"):
+            # mtime 变化但内容可能相同（例如重新安装），此时才计算哈希
+            if hash_file(bank_file) != entry.get("hash"):
+                return None
+            with self._lock:
+                entry["mtime_ns"] = st.st_mtime_ns
+                self._save()
+        if not all((self.target_dir / rel).is_file() for rel in entry.get("outputs", [])):
+            return None
+        return entry.get("hash")
+
+    def record(self, bank_file, source_dir, outputs: Iterable[str], output_format: str = "wav",
+               settings: Optional[dict] = None) -> List[str]:
+        """记录一次成功的处理，返回上次写出、本次不再产生的旧文件列表"""
+        st = os.stat(bank_file)
+        file_hash = hash_file(bank_file)
+        outputs = sorted(set(outputs))
+        with self._lock:
+            key = _bank_key(bank_file)
+            previous = self.banks.get(key, {}).get("outputs", [])
+            self.banks[key] = {
+                "source_dir": _bank_key(source_dir),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "hash": file_hash,
+                "outputs": outputs,
+                "output_format": output_format,
+                "settings": settings,
+                "processed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._save()
+            # 同一输出目录下其他 bank 仍在使用的文件不算旧文件
+            in_use = set(outputs)
+            for other_key, entry in self.banks.items():
+                if other_key != key:
+                    in_use.update(entry.get("outputs", []))
+        return [rel for rel in previous if rel not in in_use]
+
+
+def get_manifest(target_dir) -> Manifest:
+    key = os.path.normcase(os.path.abspath(str(target_dir)))
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = Manifest(target_dir)
+            manifest.load()
+            _manifests[key] = manifest
+    return manifest
@@ -0,0 +1,142 @@
+"""
+核心文件名匹配
+名称只归一化一次并驻留（intern）到键表中，参考结构与解出的样本共用同一套规则；
+批量解析时按集合求交，缺失与歧义名称汇总后一次性报告
+"""
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 常见语言代码（用于语言后缀规则，避免误删普通的短后缀）
+LANGUAGE_CODES = (
+    "ru", "en", "zh", "cn", "de", "fr", "it", "es", "pl", "cs", "cz", "ja", "jp",
+    "ko", "kr", "pt", "br", "tr", "uk", "ua", "hu", "sr", "be", "tw", "chs", "cht",
+)
+
+# 规则名 → (说明, 正则)，按以下顺序依次作用于小写的文件名主干
+RULES = {
+    "lang_prefix": ("语言前缀，如 ru_xxx", r"^[a-z]{2,3}_(?=.)"),
+    "lang_suffix": ("语言后缀，如 xxx_ru", r"_(?:%s)$" % "|".join(LANGUAGE_CODES)),
+    "version": ("版本标记，如 xxx_v2、xxx_old", r"[_-](?:v\d+|ver\d+|old|new|final)$"),
+    "variant": ("数字变体，如 xxx_01", r"[_-]\d{1,3}$"),
+}
+DEFAULT_RULES = ("lang_prefix",)
+
+
+def parse_rules(rules) -> Tuple[str, ...]:
+    """校验规则名并按固定顺序排列；None 表示默认规则"""
+    if rules is None:
+        return DEFAULT_RULES
+    if isinstance(rules, str):
+        rules = [r for r in rules.replace(",", " ").split() if r]
+    unknown = [r for r in rules if r not in RULES]
+    if unknown:
+        raise ValueError(f"未知的匹配规则: {', '.join(unknown)}（可选: {', '.join(RULES)}）")
+    return tuple(r for r in RULES if r in rules)
+
+
+class Normalizer:
+    """文件名 → 核心名；结果缓存并驻留，同名只计算一次"""
+
+    def __init__(self, rules: Optional[Sequence[str]] = None):
+        self.rules = parse_rules(rules)
+        self._patterns = [re.compile(RULES[r][1]) for r in self.rules]
+        self._cache: Dict[str, str] = {}
+
+    def __call__(self, file_name: str) -> str:
+        key = self._cache.get(file_name)
+        if key is None:
+            dot = file_name.rfind(".")
+            stem = (file_name[:dot] if dot > 0 else file_name).lower()
+            for pattern in self._patterns:
+                stem = pattern.sub("", stem, count=1)
+            # 并发写入同一个键结果相同，无需加锁
+            key = self._cache[file_name] = sys.intern(stem)
+        return key
+
+
+_normalizers: Dict[Tuple[str, ...], Normalizer] = {}
+_normalizers_lock = threading.Lock()
+
+
+def get_normalizer(rules=None) -> Normalizer:
+    """同一规则集共享一个 Normalizer（及其缓存）"""
+    key = parse_rules(rules)
+    with _normalizers_lock:
+        normalizer = _normalizers.get(key)
+        if normalizer is None:
+            normalizer = _normalizers[key] = Normalizer(key)
+    return normalizer
+
+
+@dataclass
+class MatchReport:
+    """批量匹配结果：缺失与歧义名称汇总"""
+    total: int = 0
+    matched: int = 0
+    unmatched: List[str] = field(default_factory=list)
+    # 核心名 → 归一化到该核心名的多个样本名
+    keys: Dict[str, List[str]] = field(default_factory=dict)
+
+    def add(self, name: str, key: str, dirs: Sequence[Path]):
+        self.total += 1
+        if dirs:
+            self.matched += 1
+        else:
+            self.unmatched.append(name)
+        self.keys.setdefault(key, []).append(name)
+
+    @property
+    def ambiguous(self) -> Dict[str, List[str]]:
+        return {key: names for key, names in self.keys.items() if len(names) > 1}
+
+    def summary_lines(self, limit: int = 10) -> List[str]:
+        """供日志使用的汇总行（每类最多列出 limit 个名称）"""
+        lines = []
+        if self.unmatched:
+            shown = ", ".join(sorted(self.unmatched)[:limit])
+            more = " …" if len(self.unmatched) > limit else ""
+            lines.append(f"[缺失匹配] {len(self.unmatched)} 个样本在参考结构中未找到: {shown}{more}")
+        ambiguous = self.ambiguous
+        if ambiguous:
+            shown = "; ".join(f"{key}: {', '.join(names)}" for key, names in sorted(ambiguous.items())[:limit])
+            more = " …" if len(ambiguous) > limit else ""
+            lines.append(f"[歧义匹配] {len(ambiguous)} 个核心名对应多个样本: {shown}{more}")
+        return lines
+
+
+class MatchIndex:
+    """参考结构键表：核心名 → 相对目录（去重，保持目录顺序）"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]], rules=None):
+        """entries: (相对目录, 文件名)"""
+        self.normalize = get_normalizer(rules)
+        dir_paths: Dict[str, Path] = {}
+        table: Dict[str, List[Path]] = {}
+        for rel_dir, name in entries:
+            rel_path = dir_paths.get(rel_dir)
+            if rel_path is None:
+                rel_path = dir_paths[rel_dir] = Path(rel_dir)
+            dirs = table.setdefault(self.normalize(name), [])
+            if not dirs or dirs[-1] is not rel_path:
+                dirs.append(rel_path)
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def lookup(self, file_name: str, report: Optional[MatchReport] = None) -> List[Path]:
+        key = self.normalize(file_name)
+        dirs = self.table.get(key, [])
+        if report is not None:
+            report.add(file_name, key, dirs)
+        return dirs
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, Tuple[str, List[Path]]]:
+        """一次性解析全部样本名：样本名 → (核心名, 相对目录)，未匹配时目录为空列表；按集合求交"""
+        keyed = {name: self.normalize(name) for name in names}
+        hits = set(keyed.values()) & self.table.keys()
+        return {name: (key, self.table[key] if key in hits else []) for name, key in keyed.items()}
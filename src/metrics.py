@@ -0,0 +1,120 @@
+"""
+分阶段计时与吞吐统计
+每个 bank 记录若干阶段（parse / quickbms / fsb_extract / decode / ref_index / match / copy / transcode），
+附带字节数与文件数，批次结束时汇总，并以 JSON Lines 写入指标文件
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+STAGE_NAMES = {
+    "parse": "原生解析",
+    "quickbms": "QuickBMS",
+    "fsb_extract": "FSB 解包",
+    "decode": "原生解码",
+    "ref_index": "参考索引",
+    "match": "名称匹配",
+    "copy": "复制输出",
+    "transcode": "转码",
+}
+
+
+@dataclass
+class Span:
+    bank: str
+    stage: str
+    seconds: float = 0.0
+    bytes: int = 0
+    files: int = 0
+    detail: str = ""
+
+    @property
+    def mb_per_s(self) -> Optional[float]:
+        return self.bytes / 1024 ** 2 / self.seconds if self.seconds and self.bytes else None
+
+    @property
+    def files_per_s(self) -> Optional[float]:
+        return self.files / self.seconds if self.seconds and self.files else None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["seconds"] = round(self.seconds, 6)
+        data["mb_per_s"] = round(self.mb_per_s, 3) if self.mb_per_s is not None else None
+        data["files_per_s"] = round(self.files_per_s, 3) if self.files_per_s is not None else None
+        return data
+
+
+class BankMetrics:
+    """单个 bank 的阶段记录，可在多个线程中写入"""
+
+    def __init__(self, bank: str):
+        self.bank = bank
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, detail: str = ""):
+        """计时上下文，调用方可在块内填写 bytes / files"""
+        span = Span(self.bank, stage, detail=detail)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            with self._lock:
+                self.spans.append(span)
+
+    def add(self, stage: str, seconds: float, bytes: int = 0, files: int = 0, detail: str = ""):
+        with self._lock:
+            self.spans.append(Span(self.bank, stage, seconds, bytes, files, detail))
+
+
+class MetricsWriter:
+    """把阶段记录逐行追加到 JSON Lines 文件"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, spans: Iterable[Span]):
+        lines = [json.dumps(span.to_dict(), ensure_ascii=False) for span in spans]
+        if not lines:
+            return
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def aggregate(spans: Iterable[Span]) -> Dict[str, Span]:
+    """按阶段汇总所有 bank 的记录（耗时为各 span 之和，并行阶段会大于墙钟时间）"""
+    totals: Dict[str, Span] = {}
+    for span in spans:
+        total = totals.setdefault(span.stage, Span("*", span.stage))
+        total.seconds += span.seconds
+        total.bytes += span.bytes
+        total.files += span.files
+    return totals
+
+
+def format_summary(spans: Iterable[Span]) -> List[str]:
+    totals = aggregate(spans)
+    lines = []
+    for stage in list(STAGE_NAMES) + sorted(set(totals) - set(STAGE_NAMES)):
+        total = totals.get(stage)
+        if total is None:
+            continue
+        parts = [f"{STAGE_NAMES.get(stage, stage)}: {total.seconds:.2f}s"]
+        if total.bytes:
+            parts.append(f"{total.bytes / 1024 ** 2:.1f} MB")
+        if total.mb_per_s is not None:
+            parts.append(f"{total.mb_per_s:.1f} MB/s")
+        if total.files:
+            parts.append(f"{total.files} 个文件")
+        if total.files_per_s is not None:
+            parts.append(f"{total.files_per_s:.1f} 个/s")
+        lines.append("，".join(parts))
+    return lines
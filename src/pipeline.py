@@ -0,0 +1,712 @@
+"""
+bank 处理流水线：解包 → 匹配参考结构 → 复制
+不依赖 Qt，GUI 的 Worker 线程与命令行入口共用
+"""
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from bank_reader import BankReader, BankFormatError
+from matcher import MatchReport, parse_rules
+from ref_index import get_core_filename, get_reference_index
+from manifest import get_manifest
+from copy_engine import CopyEngine, move_file
+from fsb_decoder import SampleDecoder
+from sample_store import StoreStats, StoredSample, source_key
+from metrics import BankMetrics
+from transcode import TranscodeQueue
+from tool_output import EVENT_ERROR, EVENT_FILE, STALL_TIMEOUT_SECONDS, ToolProgress, ToolRunner
+from app_paths import get_base_dir
+
+BASE_DIR = get_base_dir()
+QUICKBMS_PATH = os.path.join(BASE_DIR, "quickbms.exe")
+SCRIPT_PATH = os.path.join(BASE_DIR, "Script.bms")
+FSB_EXTRACTOR_PATH = os.path.join(BASE_DIR, "fsb_aud_extr.exe")
+
+# 直写模式的暂存目录与未匹配样本目录（均位于输出目录下）
+STAGING_DIR_NAME = ".wt_staging"
+QUARANTINE_DIR_NAME = "_unmatched"
+# 解包占总进度的百分比（其余为复制）；QuickBMS 拆出 FSB 的阶段占其中前一段
+EXTRACT_PROGRESS = 40
+QUICKBMS_PROGRESS = 10
+# 外部工具普通输出最多记录的行数，错误行另计；超出部分只在结束时报告条数
+MAX_TOOL_INFO_LINES = 200
+MAX_TOOL_ERROR_LINES = 20
+
+
+class PipelineCancelled(Exception):
+    """处理被用户取消"""
+
+
+def find_bank_files(game_dir) -> List[Path]:
+    """扫描游戏目录 sound 文件夹下的所有 .assets.bank；目录不正确时抛出 ValueError"""
+    game_dir = Path(game_dir)
+    if not game_dir.is_dir():
+        raise ValueError("请正确选择游戏目录")
+    sound_dir = game_dir / "sound"
+    if not sound_dir.is_dir():
+        raise ValueError("未找到 sound 文件夹")
+    return list(sound_dir.rglob("*.assets.bank"))
+
+
+# ===========================
+# 单个 bank 的处理流程
+# ===========================
+class BankPipeline:
+    def __init__(self, bank_file, source_dir, target_dir, do_unpack, fsb_workers=1, incremental=True,
+                 copy_mode="copy", match_rules=None, direct=False, quarantine=False, native_decode=True, selective=True,
+                 cancel_event: Optional[threading.Event] = None, journal=None, store=None,
+                 tool_stall_timeout: float = STALL_TIMEOUT_SECONDS, sample_filter: Optional[Iterable[str]] = None,
+                 transcoder=None,
+                 log: Optional[Callable[[str, int], None]] = None,
+                 progress: Optional[Callable[[int], None]] = None):
+        self.bank_file = str(bank_file)
+        self.source_dir = Path(source_dir)
+        self.target_dir = Path(target_dir)
+        self.do_unpack = do_unpack
+        self.fsb_workers = max(1, fsb_workers)
+        self.incremental = incremental
+        self.copy_engine = CopyEngine(copy_mode)
+        self.match_rules = parse_rules(match_rules)
+        # 直写：解包输出放在输出目录所在磁盘，匹配的 wav 直接重命名到最终位置
+        self.direct = direct
+        # 未匹配样本移入 target_dir/_unmatched/<bank>，否则直接丢弃
+        self.quarantine = quarantine
+        # 原生解析成功时，编码受支持的 FSB 在进程内解码，其余仍交给 fsb_aud_extr
+        self.native_decode = native_decode
+        # 先用样本表与参考索引求交，只解码能匹配的样本（保留未匹配样本时不生效）
+        self.selective = selective and not quarantine
+        # 协作式取消：在外部工具运行期间、每个 FSB 与每个文件之间检查
+        self.cancel_event = cancel_event
+        self.cancelled = False
+        # 断点日志（journal.BatchJournal）：记录已写出的文件，恢复时跳过
+        self.journal = journal
+        self._resumed = set()
+        self._resumed_samples = 0
+        # 样本表批量匹配（样本名 → (核心名, 相对目录)）及其耗时与样本数，耗时与样本数并入复制阶段的 match 记录
+        self._resolved = {}
+        self._select_seconds = 0.0
+        self._select_files = 0
+        # 内容寻址样本库（sample_store.SampleStore）：匹配的样本存入样本库后再由其生成输出
+        self.store = store
+        self.store_stats = StoreStats()
+        self._source_keys = {}
+        # 输出转码（transcode.Transcoder，多个 bank 共享进程池）：匹配的样本编码后写出，扩展名随格式改变
+        self.transcoder = transcoder
+        self.transcode_stats = None
+        # 外部工具超过该秒数无输出、输出目录也无变化时终止（0 表示不终止）
+        self.tool_stall_timeout = tool_stall_timeout
+        # 只处理这些样本（样本名不含扩展名，如 bank_diff 的变化样本），其余样本不解码也不计入未匹配
+        self.sample_filter = set(sample_filter) if sample_filter is not None else None
+        self._filtered = 0
+        self._report = MatchReport()
+        self._skipped = 0
+        self.log_callback = log
+        self.progress_callback = progress
+        self._extract_fraction = 0.0
+        self._produced = 0
+        # 解包线程与复制循环共同推进进度：已完成的 FSB 字节数与进行中 FSB 的 (字节数, 完成比例)
+        self._progress_lock = threading.Lock()
+        self._last_progress = 0
+        self._extract_total = 0
+        self._done_bytes = 0
+        self._inflight = {}
+        self._quickbms_used = False
+        self.metrics = BankMetrics(self.bank_file)
+
+    def _log(self, msg: str, level: int = logging.INFO):
+        if self.log_callback is not None:
+            self.log_callback(msg, level)
+
+    def _progress(self, value: int):
+        if self.progress_callback is not None:
+            self.progress_callback(value)
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise PipelineCancelled()
+
+    def _advance(self, value: int):
+        """进度只增不减，且只在百分比变化时通知，避免逐文件刷新界面"""
+        value = min(value, 99)
+        with self._progress_lock:
+            if value <= self._last_progress:
+                return
+            self._last_progress = value
+        self._progress(value)
+
+    def _job_progress(self, key, size: int, fraction: Optional[float] = None):
+        """更新单个 FSB 的解包进度；fraction 为 None 表示该 FSB 已完成"""
+        with self._progress_lock:
+            if fraction is None:
+                self._inflight.pop(key, None)
+                self._done_bytes += size
+            else:
+                self._inflight[key] = (size, fraction)
+            done = self._done_bytes + sum(size * f for size, f in self._inflight.values())
+            self._extract_fraction = min(done / (self._extract_total or 1), 1.0)
+            fraction = self._extract_fraction
+        self._advance(int(QUICKBMS_PROGRESS + (EXTRACT_PROGRESS - QUICKBMS_PROGRESS) * fraction)
+                      if self._quickbms_used else int(EXTRACT_PROGRESS * fraction))
+
+    def _run_with_log(self, cmd, cwd=None, prefix="[log]", expected_files=0, expected_bytes=0,
+                      on_fraction=None, watch_dir=None) -> Optional[int]:
+        """运行外部工具：输出解析为事件并折算进度，取消时终止；卡住被终止时返回 None"""
+        cmd_str = '" "'.join(cmd)
+        self._log(f"{prefix} 执行命令: {cmd_str}", logging.DEBUG)
+        progress = ToolProgress(expected_files=expected_files, expected_bytes=expected_bytes)
+        logged = {"info": 0, "error": 0}
+
+        def on_event(event):
+            # 逐文件输出只计数，结束时汇总；其余输出限量记录，避免刷屏
+            if event.kind == EVENT_FILE:
+                return
+            kind = "error" if event.kind == EVENT_ERROR else "info"
+            logged[kind] += 1
+            if kind == "error" and logged[kind] <= MAX_TOOL_ERROR_LINES:
+                self._log(f"{prefix} {event.line}", logging.WARNING)
+            elif kind == "info" and logged[kind] <= MAX_TOOL_INFO_LINES:
+                self._log(f"{prefix} {event.line}", logging.DEBUG)
+
+        def on_stall(idle):
+            self._log(f"{prefix} [提示] 已 {idle:.0f} 秒无输出，输出目录也无变化，可能仍在处理大文件", logging.WARNING)
+
+        cancelled = None
+        if self.cancel_event is not None:
+            cancelled = self.cancel_event.is_set
+        runner = ToolRunner(cmd, cwd=cwd, progress=progress, on_event=on_event, on_progress=on_fraction,
+                            on_stall=on_stall, cancelled=cancelled, watch_dir=watch_dir,
+                            stall_timeout=self.tool_stall_timeout)
+        ret = runner.run()
+        self._check_cancelled()
+        if runner.stalled:
+            self._log(f"{prefix} [错误] 超过 {self.tool_stall_timeout:.0f} 秒无任何进展，已终止", logging.ERROR)
+        self._log(f"{prefix} 写出 {progress.files} 个文件", logging.DEBUG)
+        suppressed = (max(logged["info"] - MAX_TOOL_INFO_LINES, 0)
+                      + max(logged["error"] - MAX_TOOL_ERROR_LINES, 0))
+        if suppressed:
+            self._log(f"{prefix} 另有 {suppressed} 行输出未记录", logging.DEBUG)
+        return ret
+
+    def _output_name(self, file_name: str) -> str:
+        """解出的 wav 在输出目录中的文件名"""
+        return self.transcoder.output_name(file_name) if self.transcoder is not None else file_name
+
+    @staticmethod
+    def iter_wav_files(root_dir) -> Iterator[Path]:
+        """逐个产出目录树中的 wav 文件"""
+        for root, dirs, files in os.walk(root_dir):
+            for f in files:
+                if f.lower().endswith(".wav"):
+                    yield Path(root) / f
+
+    @staticmethod
+    def get_core_filename(file_name):
+        return get_core_filename(file_name)
+
+    def run(self) -> bool:
+        """处理一个 bank，成功（含增量跳过）返回 True"""
+        bank_name = Path(self.bank_file).stem
+        manifest = get_manifest(self.target_dir)
+
+        output_format = self.transcoder.fmt if self.transcoder is not None else "wav"
+        if self.incremental and self._is_up_to_date(manifest, output_format):
+            self._log("[跳过] bank 未变化，输出目录已是最新")
+            if self.journal is not None:
+                self.journal.bank_done(self.bank_file)
+            self._progress(100)
+            return True
+
+        with self._work_dir(bank_name) as temp_root:
+            try:
+                self._last_progress = 0
+                self._progress(0)
+                bank_output_dir = temp_root / bank_name
+                bank_output_dir.mkdir(parents=True, exist_ok=True)
+
+                self._log("[信息] 正在加载参考结构文件名映射...")
+                with self.metrics.span("ref_index") as span:
+                    ref_index = get_reference_index(self.source_dir)
+                    match_index = ref_index.match_index(self.match_rules)
+                    span.files = ref_index.file_count
+                settings = self._manifest_settings(ref_index)
+                self._log(f"[信息] 参考结构中共有 {len(match_index)} 个唯一核心文件名")
+                self._load_resumed_outputs()
+
+                # 解包与复制流水线：每个 FSB 解包完成后其 wav 立即进入复制阶段
+                self._extract_fraction = 0.0 if self.do_unpack else 1.0
+                self._produced = 0
+                self._quickbms_used = False
+                self._report = MatchReport()
+                self._skipped = 0
+                self._filtered = 0
+                self._resumed_samples = 0
+                self._resolved = {}
+                self._select_seconds = 0.0
+                self._select_files = 0
+                self._check_cancelled()
+                if self.do_unpack:
+                    audio_files = self._unpack_banks_and_fsb(bank_output_dir, match_index)
+                else:
+                    audio_files = self.iter_wav_files(bank_output_dir)
+                # 复制阶段出错或取消时立即关闭生成器：等待解包线程退出后才删除工作目录
+                with closing(audio_files):
+                    outputs, total_audio = self._copy_audio_by_structure(audio_files, match_index)
+                outputs.extend(self._resumed)
+                if not total_audio and not self._skipped and not self._filtered and not self._resumed_samples:
+                    self._log("[错误] 未找到任何 wav 文件", logging.ERROR)
+                    return False
+
+                if self.transcode_stats is not None and self.transcode_stats.failed:
+                    # 不记录清单，下次增量处理时重新转码
+                    self._log(f"[错误] {self.transcode_stats.failed} 个文件转码失败", logging.ERROR)
+                    return False
+
+                stale = manifest.record(self.bank_file, self.source_dir, outputs, output_format, settings)
+                self._remove_stale_outputs(stale)
+                if self.journal is not None:
+                    self.journal.bank_done(self.bank_file)
+                self._progress(100)
+                return True
+            except PipelineCancelled:
+                self.cancelled = True
+                self._log("[取消] 已停止，已写出的文件在下次继续时跳过", logging.WARNING)
+                return False
+            except Exception as e:
+                self._log(f"[错误] {e}", logging.ERROR)
+                return False
+
+    def _manifest_settings(self, ref_index) -> dict:
+        """影响输出内容的设置与参考结构指纹，记入增量清单；任一变化时不跳过"""
+        sample_filter = None
+        if self.sample_filter is not None:
+            sample_filter = hashlib.blake2b("\n".join(sorted(self.sample_filter)).encode("utf-8", "surrogatepass"),
+                                           digest_size=16).hexdigest()
+        return {
+            "reference": ref_index.fingerprint(),
+            "match_rules": list(self.match_rules),
+            "selective": self.selective,
+            "quarantine": self.quarantine,
+            "sample_filter": sample_filter,
+        }
+
+    def _is_up_to_date(self, manifest, output_format: str) -> bool:
+        try:
+            settings = self._manifest_settings(get_reference_index(self.source_dir))
+        except Exception:
+            # 参考目录不可用：交给正常流程报告错误
+            return False
+        return manifest.check(self.bank_file, self.source_dir, output_format, settings) is not None
+
+    def _load_resumed_outputs(self):
+        """断点日志中记录、且仍存在于输出目录的文件"""
+        self._resumed = set()
+        if self.journal is None:
+            return
+        self._resumed = {rel for rel in self.journal.done_outputs(self.bank_file)
+                         if (self.target_dir / rel).is_file()}
+        if self._resumed:
+            self._log(f"[信息] 从断点继续：{len(self._resumed)} 个文件上次已写出，不再重复处理")
+
+    @contextmanager
+    def _work_dir(self, bank_name: str) -> Iterator[Path]:
+        """解包工作目录：默认在系统临时目录，直写模式下在输出目录内，结束后删除"""
+        if not self.direct:
+            with tempfile.TemporaryDirectory(prefix="WT_AudioTool_") as temp_root:
+                yield Path(temp_root)
+            return
+        staging_root = self.target_dir / STAGING_DIR_NAME
+        staging_root.mkdir(parents=True, exist_ok=True)
+        work_dir = Path(tempfile.mkdtemp(prefix=f"{bank_name}_", dir=staging_root))
+        try:
+            yield work_dir
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            try:
+                staging_root.rmdir()
+            except OSError:
+                pass
+
+    def _unpack_banks_and_fsb(self, out_dir: Path, match_index) -> Iterator[Path]:
+        """解包 bank，按 FSB 完成顺序逐个产出解出的 wav"""
+        self._log(">>> 开始解包 BANK 文件")
+        reader = self._open_native_reader()
+        if reader is None:
+            if not os.path.exists(FSB_EXTRACTOR_PATH):
+                self._log("[错误] 缺少工具: fsb_aud_extr.exe", logging.ERROR)
+                return
+            fsb_files = self._extract_fsb_quickbms(out_dir)
+            if fsb_files is None:
+                return
+            if not fsb_files:
+                self._log("[提示] 未发现 .fsb 文件", logging.WARNING)
+                return
+            jobs = [(fsb_path, fsb_path.stat().st_size, None, None) for fsb_path in fsb_files]
+            yield from self._run_fsb_jobs(jobs, out_dir, None, None)
+            return
+
+        # 原生路径：每个任务只从映射中切出一个 FSB5，解包后立即删除，临时目录不再保留整个 bank 的副本
+        bank_name = Path(self.bank_file).stem
+        with reader:
+            decoder = SampleDecoder(reader) if self.native_decode else None
+            jobs = [(out_dir / f"{bank_name}_{i:03d}.fsb", header.size, header, samples)
+                    for i, (header, samples) in enumerate(reader.fsbs())]
+            # 整个样本表一次性与参考索引求交，筛选与复制阶段复用结果
+            start = time.perf_counter()
+            self._resolved = match_index.resolve(f"{sample.name}.wav" for _, _, _, samples in jobs for sample in samples)
+            self._select_seconds = time.perf_counter() - start
+            self._select_files = sum(len(samples) for _, _, _, samples in jobs)
+            if self.selective or self.sample_filter is not None:
+                jobs = self._select_samples(jobs, match_index, decoder)
+            yield from self._run_fsb_jobs(jobs, out_dir, reader, decoder)
+
+    def _lookup(self, match_index, file_name: str, report: Optional[MatchReport] = None) -> List[Path]:
+        """优先取样本表的批量解析结果；样本表中没有的文件（如外部工具解出的）单独查找"""
+        resolved = self._resolved.get(file_name)
+        if resolved is None:
+            return match_index.lookup(file_name, report)
+        key, dirs = resolved
+        if report is not None:
+            report.add(file_name, key, dirs)
+        return dirs
+
+    def _select_samples(self, jobs, match_index, decoder):
+        """按参考索引与样本过滤条件筛选样本：可原生解码的 FSB 只保留需要的样本，没有任何需要样本的 FSB 整体跳过"""
+        start = time.perf_counter()
+        selected = []
+        skipped_fsbs = 0
+        for fsb_path, size, header, samples in jobs:
+            wanted, unwanted, resumed = [], [], []
+            filtered = 0
+            for sample in samples:
+                if self.sample_filter is not None and sample.name not in self.sample_filter:
+                    filtered += 1
+                    continue
+                file_name = f"{sample.name}.wav"
+                dirs = self._resolved[file_name][1]
+                if not dirs and self.selective:
+                    unwanted.append(sample)
+                elif dirs and self._resumed and all((rel_dir / self._output_name(file_name)).as_posix()
+                                                    in self._resumed for rel_dir in dirs):
+                    resumed.append(sample)
+                else:
+                    wanted.append(sample)
+            if (wanted or resumed) and (decoder is None or not decoder.supports_all(samples)):
+                # 只能整体交给 fsb_aud_extr，未匹配与被过滤的样本由复制阶段处理
+                selected.append((fsb_path, size, header, samples))
+                continue
+            self._resumed_samples += len(resumed)
+            self._filtered += filtered
+            if wanted:
+                if unwanted or resumed or filtered:
+                    size = sum(sample.length for sample in wanted)
+                selected.append((fsb_path, size, header, wanted))
+            else:
+                skipped_fsbs += 1
+            for sample in unwanted:
+                self._lookup(match_index, f"{sample.name}.wav", self._report)
+            self._skipped += len(unwanted)
+        # 匹配阶段只在复制阶段记录一次，这里的耗时并入其中
+        self._select_seconds += time.perf_counter() - start
+        if self._resumed_samples:
+            self._log(f"[信息] 从断点继续：跳过 {self._resumed_samples} 个上次已写出的样本")
+        if self._filtered:
+            self._log(f"[信息] 样本过滤：跳过 {self._filtered} 个不在处理范围内的样本")
+        if self._skipped:
+            self._log(f"[信息] 选择性解码：跳过 {self._skipped} 个未匹配样本（其中 {skipped_fsbs} 个 FSB 整体跳过）")
+        return selected
+
+    def _run_fsb_jobs(self, jobs, out_dir: Path, reader, decoder) -> Iterator[Path]:
+        """并行解包各 FSB，按字节数加权汇总到 0~40% 的进度区间；每完成一个 FSB 即产出其 wav"""
+        if not jobs:
+            return
+        with self._progress_lock:
+            self._extract_total = sum(size for _, size, _, _ in jobs)
+            self._done_bytes = 0
+            self._inflight = {}
+        native = sum(1 for _, _, _, samples in jobs if decoder is not None and decoder.supports_all(samples))
+        if native:
+            self._log(f"[信息] {native}/{len(jobs)} 个 FSB 使用原生解码")
+
+        def decode(fsb_path, size, samples):
+            with self.metrics.span("decode", detail=fsb_path.name) as span:
+                fsb_out = out_dir / f"fsb_{fsb_path.stem}"
+                fsb_out.mkdir(parents=True, exist_ok=True)
+                span.bytes = 0
+                stored = []
+                for i, sample in enumerate(samples):
+                    self._check_cancelled()
+                    self._job_progress(fsb_path, size, i / len(samples))
+                    file_name = f"{sample.name}.wav"
+                    key = None
+                    if self.store is not None:
+                        # 编码数据相同的样本已在样本库中：直接取用，不再解码
+                        key = source_key(sample, reader.mapping)
+                        hit = self.store.lookup_source(key, file_name)
+                        if hit is not None:
+                            stored.append(hit)
+                            continue
+                    span.bytes += decoder.write_wav(sample, fsb_out / file_name)
+                    if key is not None:
+                        self._source_keys[fsb_out / file_name] = key
+                audio_files = list(self.iter_wav_files(fsb_out)) + stored
+                span.files = len(audio_files)
+            return audio_files
+
+        def job(fsb_path, size, header, samples):
+            self._check_cancelled()
+            if decoder is not None and decoder.supports_all(samples):
+                try:
+                    return decode(fsb_path, size, samples)
+                finally:
+                    # 每个 FSB 只由一个任务解码：完成后释放 Vorbis 块的副本，内存中最多保留各线程正在解码的块
+                    for fsb_index in {sample.fsb_index for sample in samples}:
+                        decoder.release(fsb_index)
+
+            with self.metrics.span("fsb_extract", detail=fsb_path.name) as span:
+                if not os.path.exists(FSB_EXTRACTOR_PATH):
+                    raise FileNotFoundError(f"缺少工具: fsb_aud_extr.exe（{fsb_path.name} 的编码不支持原生解码）")
+                if header is not None:
+                    reader.copy_to(header.offset, header.size, fsb_path)
+                fsb_out = self._extract_fsb(fsb_path, out_dir, len(samples) if samples else 0,
+                                            lambda fraction: self._job_progress(fsb_path, size, fraction))
+                audio_files = list(self.iter_wav_files(fsb_out))
+                span.bytes = size
+                span.files = len(audio_files)
+            return audio_files
+
+        workers = min(self.fsb_workers, len(jobs))
+        if workers > 1:
+            self._log(f"[信息] 并行解包 {len(jobs)} 个 FSB（{workers} 线程）")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(job, *entry): entry for entry in jobs}
+            try:
+                for future in as_completed(futures):
+                    fsb_path, size = futures[future][:2]
+                    self._job_progress(fsb_path, size)
+                    try:
+                        # 单个 FSB 的文件列表规模有限，整体内存不随样本总数增长
+                        audio_files = future.result()
+                    except PipelineCancelled:
+                        raise
+                    except Exception as e:
+                        self._log(f"[错误] FSB 解包失败: {e}", logging.ERROR)
+                        continue
+                    self._produced += len(audio_files)
+                    yield from audio_files
+            finally:
+                # 取消或复制阶段出错时，尚未开始的 FSB 不再解包
+                for future in futures:
+                    future.cancel()
+
+    def _extract_fsb(self, fsb_path: Path, out_dir: Path, expected_files=0, on_fraction=None):
+        fsb_out = out_dir / f"fsb_{fsb_path.stem}"
+        fsb_out.mkdir(exist_ok=True)
+        self._log(f">>> 解包 FSB: {fsb_path.name}")
+        ret = self._run_with_log([FSB_EXTRACTOR_PATH, str(fsb_path)], cwd=str(fsb_out), prefix=f"[fsb:{fsb_path.stem}]",
+                                 expected_files=expected_files, on_fraction=on_fraction)
+        if ret is not None and ret != 0:
+            self._log(f"[错误] fsb_aud_extr 返回码: {ret} ({fsb_path.name})", logging.ERROR)
+        fsb_path.unlink(missing_ok=True)
+        return fsb_out
+
+    def _open_native_reader(self):
+        """原生解析 bank；无法识别时返回 None 以便回退到 QuickBMS"""
+        reader = BankReader(self.bank_file)
+        try:
+            with self.metrics.span("parse") as span:
+                reader.open()
+                headers = reader.fsb_headers()
+                sample_count = sum(1 for _ in reader.iter_samples())
+                span.bytes = sum(header.size for header in headers)
+                span.files = sample_count
+        except (OSError, BankFormatError, struct.error) as e:
+            reader.close()
+            self._log(f"[提示] 原生解析失败，改用 QuickBMS: {e}", logging.WARNING)
+            return None
+        if not headers:
+            reader.close()
+            self._log("[提示] 原生解析未找到 FSB5 数据，改用 QuickBMS", logging.WARNING)
+            return None
+
+        self._log(f"[信息] 原生解析: {len(headers)} 个 FSB5 块，共 {sample_count} 个样本")
+        return reader
+
+    def _extract_fsb_quickbms(self, out_dir: Path):
+        missing = []
+        for tool, path in [("quickbms.exe", QUICKBMS_PATH), ("Script.bms", SCRIPT_PATH)]:
+            if not os.path.exists(path):
+                missing.append(tool)
+        if missing:
+            self._log(f"[错误] 缺少工具: {', '.join(missing)}", logging.ERROR)
+            return None
+
+        self._quickbms_used = True
+        with self.metrics.span("quickbms") as span:
+            # 拆出的 FSB 总大小接近 bank 大小，按已写出字节数折算进度
+            ret = self._run_with_log([QUICKBMS_PATH, SCRIPT_PATH, self.bank_file, str(out_dir)], prefix="[quickbms]",
+                                     expected_bytes=os.path.getsize(self.bank_file),
+                                     on_fraction=lambda fraction: self._advance(int(QUICKBMS_PROGRESS * fraction)),
+                                     watch_dir=str(out_dir))
+            if ret is not None and ret != 0:
+                self._log(f"[错误] QuickBMS 返回码: {ret}", logging.ERROR)
+            fsb_files = list(out_dir.glob("*.fsb"))
+            span.bytes = sum(fsb_path.stat().st_size for fsb_path in fsb_files)
+            span.files = len(fsb_files)
+        return fsb_files
+
+    def _remove_stale_outputs(self, stale):
+        """删除上次由本 bank 写出、本次已不再产生的文件"""
+        removed = 0
+        for rel in stale:
+            try:
+                (self.target_dir / rel).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            self._log(f"[信息] 已删除 {removed} 个过期输出文件")
+
+    def _copy_audio_by_structure(self, audio_files: Iterable[Path], match_index) -> Tuple[List[str], int]:
+        """边产出边复制：核心名 → 查参考结构 → 复制（或转码），复制后删除临时 wav；返回 (输出列表, wav 总数)"""
+        report = self._report
+        quarantine_dir = self.target_dir / QUARANTINE_DIR_NAME / Path(self.bank_file).stem
+        quarantined = 0
+        outputs = []
+        total_audio = 0
+        match_seconds = 0.0
+        copy_seconds = 0.0
+        stats_before = self.copy_engine.stats.bytes_written
+        queue = TranscodeQueue(self.transcoder) if self.transcoder is not None else None
+
+        def transcoded(context, error):
+            # 编码结果写入首个目标，其余目标由复制引擎生成
+            source, owned, file_name, pending = context
+            if error is not None:
+                self._log(f"[错误] 转码失败 {file_name}: {error}", logging.ERROR)
+            else:
+                first = pending[0][1]
+                self.copy_engine.copy(first, [dest_path for _, dest_path in pending[1:]])
+                for rel, _ in pending:
+                    outputs.append(rel)
+                    self._log(f"[转码] {file_name} → {rel}", logging.DEBUG)
+                if self.journal is not None:
+                    self.journal.record_outputs(self.bank_file, [rel for rel, _ in pending])
+            if owned:
+                source.unlink(missing_ok=True)
+
+        refs = []
+        try:
+            for audio_path in audio_files:
+                self._check_cancelled()
+                file_name = audio_path.name
+                if self.sample_filter is not None and Path(file_name).stem not in self.sample_filter:
+                    # 整体解包的 FSB 中不在处理范围内的样本
+                    self._filtered += 1
+                    if not isinstance(audio_path, StoredSample):
+                        audio_path.unlink(missing_ok=True)
+                    continue
+                total_audio += 1
+                # 样本库命中的样本没有临时文件，直接从对象生成输出
+                stored = isinstance(audio_path, StoredSample)
+                queued = False
+                start = time.perf_counter()
+                matches = self._lookup(match_index, file_name, report)
+                match_seconds += time.perf_counter() - start
+
+                if matches:
+                    # 断点日志中已写出的目标不再复制
+                    out_name = self._output_name(file_name)
+                    rels = [(rel_dir / out_name).as_posix() for rel_dir in matches]
+                    pending = [(rel, self.target_dir / rel) for rel in rels if rel not in self._resumed]
+                    dests = [dest_path for _, dest_path in pending]
+                    start = time.perf_counter()
+                    source = audio_path.path if stored else audio_path
+                    if dests and self.store is not None:
+                        if stored:
+                            source, digest = self.store.reuse(audio_path, self.store_stats)
+                        else:
+                            source, digest = self.store.put(audio_path, self._source_keys.pop(audio_path, None),
+                                                            self.store_stats)
+                        if queue is None:
+                            # 转码输出不是对象的副本，不记为引用（汇总时也不报告去重比）
+                            refs.extend((rel, digest) for rel, _ in pending)
+                    if not dests:
+                        written = set()
+                    elif queue is not None:
+                        # 样本库中的对象不能删除，临时 wav 在编码完成后删除
+                        queued = self.store is None and not stored
+                        queue.add(source, dests[0], (source, queued, file_name, pending))
+                        pending = []
+                    elif self.store is not None:
+                        written = set(self.copy_engine.copy(source, dests))
+                    elif self.direct:
+                        written = set(self.copy_engine.move(audio_path, dests))
+                    else:
+                        written = set(self.copy_engine.copy(audio_path, dests))
+                    copy_seconds += time.perf_counter() - start
+                    for rel, dest_path in pending:
+                        outputs.append(rel)
+                        if dest_path in written:
+                            self._log(f"[复制] {file_name} → {rel}", logging.DEBUG)
+                    if self.journal is not None and pending:
+                        self.journal.record_outputs(self.bank_file, [rel for rel, _ in pending])
+                elif self.quarantine:
+                    if stored:
+                        self.copy_engine.copy(audio_path.path, [quarantine_dir / file_name])
+                    else:
+                        move_file(audio_path, quarantine_dir / file_name)
+                    quarantined += 1
+                if not stored and not queued:
+                    audio_path.unlink(missing_ok=True)
+                if queue is not None:
+                    for context, error in queue.poll():
+                        transcoded(context, error)
+
+                # 解包占 40%，复制占 60%，复制部分按已解出的比例折算
+                fraction = self._extract_fraction
+                self._advance(int(EXTRACT_PROGRESS * fraction
+                                  + (100 - EXTRACT_PROGRESS) * fraction * total_audio / max(self._produced, 1)))
+            if queue is not None:
+                for context, error in queue.drain():
+                    self._check_cancelled()
+                    transcoded(context, error)
+        finally:
+            if queue is not None:
+                # 取消时已完成的块仍写出其余目标并记入断点日志，其余未开始的块丢弃
+                for context, error in queue.poll():
+                    transcoded(context, error)
+                queue.cancel()
+            if self.store is not None:
+                # 取消或出错时也保存已存入对象的索引
+                self.store.record_refs(self.target_dir, refs)
+
+        # 原生解析时样本表中的每个样本已在批量解析中计数，复制阶段查到的 wav 不再重复计数
+        self.metrics.add("match", self._select_seconds + match_seconds, files=self._select_files or total_audio)
+        self.metrics.add("copy", copy_seconds, bytes=self.copy_engine.stats.bytes_written - stats_before,
+                         files=len(outputs))
+        self._log(f"[信息] 共处理 {total_audio} 个 WAV 文件，匹配 {report.matched} 个")
+        for line in report.summary_lines():
+            self._log(line, logging.WARNING)
+        if quarantined:
+            self._log(f"[信息] {quarantined} 个未匹配样本已移至 {quarantine_dir}")
+        if report.unmatched:
+            self._log("[缺失匹配] 完整列表: " + ", ".join(sorted(report.unmatched)), logging.DEBUG)
+        self._log(f"[信息] {self.copy_engine.stats.summary()}")
+        if self.store is not None:
+            self._log(f"[信息] {self.store_stats.summary()}")
+        if queue is not None:
+            self.transcode_stats = queue.stats
+            self.metrics.add("transcode", queue.stats.seconds, bytes=queue.stats.bytes_out, files=queue.stats.files)
+            self._log(f"[信息] {queue.stats.summary(self.transcoder.fmt)}",
+                      logging.WARNING if queue.stats.failed else logging.INFO)
+        return outputs, total_audio
@@ -0,0 +1,196 @@
+"""
+参考结构目录索引缓存
+记录参考目录下每个文件的核心文件名及其相对目录，持久化到 SQLite
+按目录 mtime 失效：只重新列出发生变化的目录，同一批次的所有 Worker 共享内存中的索引
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app_paths import get_cache_dir
+from matcher import MatchIndex, get_normalizer, parse_rules
+
+DB_NAME = "ref_index.sqlite3"
+ROOT_REL = "."
+# 内存中的索引在该时间内不再重复校验目录 mtime
+REVALIDATE_SECONDS = 60
+
+_memory: Dict[str, "ReferenceIndex"] = {}
+_memory_lock = threading.Lock()
+_root_locks: Dict[str, threading.Lock] = {}
+_db_lock = threading.Lock()
+
+
+def get_core_filename(file_name: str) -> str:
+    """默认规则下的核心文件名（去掉 2~3 个字母的语言前缀）"""
+    return get_normalizer()(file_name)
+
+
+def _root_key(root) -> str:
+    return os.path.normcase(os.path.abspath(str(root)))
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE IF NOT EXISTS ref_dirs ("
+                 "root TEXT, rel_dir TEXT, mtime_ns INTEGER, PRIMARY KEY (root, rel_dir))")
+    conn.execute("CREATE TABLE IF NOT EXISTS ref_files (root TEXT, rel_dir TEXT, name TEXT, core TEXT)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ref_files_dir ON ref_files (root, rel_dir)")
+    return conn
+
+
+class ReferenceIndex:
+    """单个参考目录的索引"""
+
+    def __init__(self, root, db_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.key = _root_key(root)
+        self.db_path = db_path or get_cache_dir() / DB_NAME
+        self.dirs: Dict[str, int] = {}
+        self.files: Dict[str, List[Tuple[str, str]]] = {}
+        self.validated_at: Optional[float] = None
+        self._match_indexes: Dict[Tuple[str, ...], MatchIndex] = {}
+        self._fingerprint: Optional[str] = None
+        # 刷新与构建键表互斥（同一索引被多个 Worker 共享）
+        self._lock = threading.Lock()
+
+    @property
+    def file_count(self) -> int:
+        return sum(len(entries) for entries in self.files.values())
+
+    @property
+    def ref_map(self) -> Dict[str, List[Path]]:
+        """核心文件名 → 相对目录列表（默认规则）"""
+        return self.match_index().table
+
+    def match_index(self, rules=None) -> MatchIndex:
+        """按规则集构建的键表，索引未变化时复用"""
+        rules = parse_rules(rules)
+        with self._lock:
+            index = self._match_indexes.get(rules)
+            if index is None:
+                entries = ((rel_dir, name) for rel_dir in sorted(self.files) for name, _ in self.files[rel_dir])
+                index = self._match_indexes[rules] = MatchIndex(entries, rules)
+        return index
+
+    def fingerprint(self) -> str:
+        """参考结构中所有文件（相对目录与文件名）的哈希，索引变化后重新计算；增量清单据此判断参考结构是否变化"""
+        with self._lock:
+            if self._fingerprint is None:
+                digest = hashlib.blake2b(digest_size=16)
+                for rel_dir in sorted(self.files):
+                    for name in sorted(name for name, _ in self.files[rel_dir]):
+                        digest.update(f"{rel_dir}/{name}\n".encode("utf-8", "surrogatepass"))
+                self._fingerprint = digest.hexdigest()
+            return self._fingerprint
+
+    # ---------- 持久化 ----------
+    def load(self):
+        with _db_lock:
+            conn = _connect(self.db_path)
+            try:
+                self.dirs = dict(conn.execute(
+                    "SELECT rel_dir, mtime_ns FROM ref_dirs WHERE root = ?", (self.key,)))
+                self.files = {rel_dir: [] for rel_dir in self.dirs}
+                for rel_dir, name, core in conn.execute(
+                        "SELECT rel_dir, name, core FROM ref_files WHERE root = ?", (self.key,)):
+                    self.files.setdefault(rel_dir, []).append((name, core))
+            finally:
+                conn.close()
+        self._match_indexes = {}
+        self._fingerprint = None
+
+    def _save(self, changed: List[str], removed: List[str]):
+        with _db_lock:
+            conn = _connect(self.db_path)
+            try:
+                with conn:
+                    for rel_dir in changed + removed:
+                        conn.execute("DELETE FROM ref_dirs WHERE root = ? AND rel_dir = ?", (self.key, rel_dir))
+                        conn.execute("DELETE FROM ref_files WHERE root = ? AND rel_dir = ?", (self.key, rel_dir))
+                    conn.executemany(
+                        "INSERT INTO ref_dirs VALUES (?, ?, ?)",
+                        [(self.key, rel_dir, self.dirs[rel_dir]) for rel_dir in changed])
+                    conn.executemany(
+                        "INSERT INTO ref_files VALUES (?, ?, ?, ?)",
+                        [(self.key, rel_dir, name, core)
+                         for rel_dir in changed for name, core in self.files[rel_dir]])
+            finally:
+                conn.close()
+
+    # ---------- 增量刷新 ----------
+    def _scan_dir(self, rel_dir: str, changed: List[str]):
+        path = self.root if rel_dir == ROOT_REL else self.root / rel_dir
+        # 先取 mtime 再列目录，列目录期间的改动会在下次校验时发现
+        self.dirs[rel_dir] = os.stat(path).st_mtime_ns
+        entries = []
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    sub_rel = entry.name if rel_dir == ROOT_REL else f"{rel_dir}/{entry.name}"
+                    subdirs.append(sub_rel)
+                elif entry.is_file() and "." in entry.name:
+                    entries.append((entry.name, get_core_filename(entry.name)))
+        self.files[rel_dir] = entries
+        changed.append(rel_dir)
+        for sub_rel in subdirs:
+            # 已知子目录由自身 mtime 校验，新出现的子目录需要完整扫描
+            if sub_rel not in self.dirs:
+                self._scan_dir(sub_rel, changed)
+
+    def refresh(self) -> int:
+        """校验目录 mtime 并重扫变化的目录，返回重扫的目录数"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        changed: List[str] = []
+        removed: List[str] = []
+        if not self.dirs:
+            self._scan_dir(ROOT_REL, changed)
+        else:
+            stale = []
+            for rel_dir, mtime_ns in list(self.dirs.items()):
+                path = self.root if rel_dir == ROOT_REL else self.root / rel_dir
+                try:
+                    current = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    removed.append(rel_dir)
+                    continue
+                if current != mtime_ns:
+                    stale.append(rel_dir)
+            for rel_dir in removed:
+                self.dirs.pop(rel_dir, None)
+                self.files.pop(rel_dir, None)
+            for rel_dir in stale:
+                if rel_dir in self.dirs and rel_dir not in changed:
+                    self._scan_dir(rel_dir, changed)
+
+        if changed or removed:
+            self._match_indexes = {}
+            self._fingerprint = None
+            self._save(changed, removed)
+        self.validated_at = time.monotonic()
+        return len(changed) + len(removed)
+
+
+def get_reference_index(root) -> ReferenceIndex:
+    """获取（必要时构建/刷新）参考目录索引；并发调用同一目录时只有一个线程执行扫描"""
+    key = _root_key(root)
+    with _memory_lock:
+        root_lock = _root_locks.setdefault(key, threading.Lock())
+    with root_lock:
+        index = _memory.get(key)
+        if index is None:
+            index = ReferenceIndex(root)
+            index.load()
+        if index.validated_at is None or time.monotonic() - index.validated_at > REVALIDATE_SECONDS:
+            index.refresh()
+        with _memory_lock:
+            _memory[key] = index
+    return index
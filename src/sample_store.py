@@ -0,0 +1,195 @@
+"""
+内容寻址样本库
+解出的 wav 按内容哈希（blake2b-128）只保存一份：objects/<哈希前两位>/<哈希>.wav
+输出目录中的文件由样本库复制或链接生成（硬链接 / reflink 模式下不占额外空间），跨 bank、跨语言相同的样本只存一次
+原生解码的样本另按编码数据建立来源索引，再次解包时命中即直接取用，无需解码
+硬链接到样本库的输出文件与样本库共享数据，不要原地修改
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app_paths import get_cache_dir
+from copy_engine import move_file
+from manifest import hash_file
+
+STORE_DIR_NAME = "sample_store"
+DB_NAME = "store.sqlite3"
+OBJECT_SUFFIX = ".wav"
+
+_db_lock = threading.Lock()
+
+
+class StoredSample(NamedTuple):
+    """样本库中已有的样本：name 为输出文件名，path 为对象路径"""
+    name: str
+    path: Path
+    digest: str
+
+
+def source_key(sample, mapping) -> str:
+    """编码数据与格式参数的哈希；来源相同则解码结果相同"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{sample.codec}:{sample.channels}:{sample.frequency}:{sample.samples}:".encode("ascii"))
+    with memoryview(mapping) as view:
+        digest.update(view[sample.offset:sample.offset + sample.length])
+    return digest.hexdigest()
+
+
+@dataclass
+class StoreStats:
+    samples: int = 0          # 存入（含已存在）的样本数
+    new_objects: int = 0      # 新增对象数
+    decode_skipped: int = 0   # 按来源命中、无需解码的样本数
+    bytes_in: int = 0         # 存入样本的总字节数
+    bytes_stored: int = 0     # 新增对象的字节数
+
+    def merge(self, other: "StoreStats"):
+        self.samples += other.samples
+        self.new_objects += other.new_objects
+        self.decode_skipped += other.decode_skipped
+        self.bytes_in += other.bytes_in
+        self.bytes_stored += other.bytes_stored
+
+    def summary(self) -> str:
+        saved = 1 - self.bytes_stored / self.bytes_in if self.bytes_in else 0.0
+        return (f"样本库：存入 {self.samples} 个样本，新增 {self.new_objects} 个对象，{self.decode_skipped} 个免解码；"
+                f"写入 {self.bytes_stored / 1024 ** 2:.1f} MB / {self.bytes_in / 1024 ** 2:.1f} MB（去重 {saved:.0%}）")
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE IF NOT EXISTS objects (digest TEXT PRIMARY KEY, size INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS sources (key TEXT PRIMARY KEY, digest TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS refs (path TEXT PRIMARY KEY, digest TEXT, size INTEGER)")
+    return conn
+
+
+class SampleStore:
+    """多个 BankPipeline 共享一个实例；对象写入与索引更新均线程安全"""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else get_cache_dir() / STORE_DIR_NAME
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / DB_NAME
+        self.stats = StoreStats()
+        self._lock = threading.Lock()
+        # 来源键 → 对象哈希，首次查询时整体载入
+        self._sources: Optional[Dict[str, str]] = None
+        self._pending_objects: List[Tuple[str, int]] = []
+        self._pending_sources: List[Tuple[str, str]] = []
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}{OBJECT_SUFFIX}"
+
+    def _load_sources(self) -> Dict[str, str]:
+        if self._sources is None:
+            with _db_lock:
+                conn = _connect(self.db_path)
+                try:
+                    self._sources = dict(conn.execute("SELECT key, digest FROM sources"))
+                finally:
+                    conn.close()
+        return self._sources
+
+    def lookup_source(self, key: str, name: str) -> Optional[StoredSample]:
+        """来源键已有对应对象时返回 StoredSample，否则返回 None"""
+        with self._lock:
+            digest = self._load_sources().get(key)
+        if digest is None:
+            return None
+        path = self.object_path(digest)
+        return StoredSample(name, path, digest) if path.is_file() else None
+
+    def reuse(self, stored: StoredSample, stats: Optional[StoreStats] = None) -> Tuple[Path, str]:
+        """取用按来源命中的对象并计入统计，返回 (对象路径, 哈希)"""
+        local = StoreStats(samples=1, decode_skipped=1, bytes_in=stored.path.stat().st_size)
+        with self._lock:
+            self.stats.merge(local)
+        if stats is not None:
+            stats.merge(local)
+        return stored.path, stored.digest
+
+    def put(self, path: Path, source: Optional[str] = None, stats: Optional[StoreStats] = None) -> Tuple[Path, str]:
+        """把解出的 wav 移入样本库（内容已存在时直接删除），返回 (对象路径, 哈希)"""
+        size = path.stat().st_size
+        digest = hash_file(path)
+        obj = self.object_path(digest)
+        new = not obj.is_file()
+        if new:
+            # 先移动到临时名再原子替换，并发写入同一对象时结果一致
+            tmp = obj.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            move_file(path, tmp)
+            os.replace(tmp, obj)
+        else:
+            path.unlink(missing_ok=True)
+
+        local = StoreStats(samples=1, bytes_in=size)
+        if new:
+            local.new_objects = 1
+            local.bytes_stored = size
+        with self._lock:
+            if new:
+                self._pending_objects.append((digest, size))
+            if source is not None:
+                self._load_sources()[source] = digest
+                self._pending_sources.append((source, digest))
+            self.stats.merge(local)
+        if stats is not None:
+            stats.merge(local)
+        return obj, digest
+
+    def record_refs(self, target_dir, refs: Iterable[Tuple[str, str]]):
+        """记录输出目录中由样本库生成的文件（相对路径, 哈希），并写入尚未保存的对象与来源索引"""
+        target_dir = Path(target_dir)
+        rows = []
+        for rel, digest in refs:
+            path = os.path.normcase(os.path.abspath(target_dir / rel))
+            try:
+                size = self.object_path(digest).stat().st_size
+            except OSError:
+                continue
+            rows.append((path, digest, size))
+        with self._lock:
+            objects, self._pending_objects = self._pending_objects, []
+            sources, self._pending_sources = self._pending_sources, []
+        if not (rows or objects or sources):
+            return
+        with _db_lock:
+            conn = _connect(self.db_path)
+            try:
+                with conn:
+                    conn.executemany("INSERT OR IGNORE INTO objects VALUES (?, ?)", objects)
+                    conn.executemany("INSERT OR REPLACE INTO sources VALUES (?, ?)", sources)
+                    conn.executemany("INSERT OR REPLACE INTO refs VALUES (?, ?, ?)", rows)
+            finally:
+                conn.close()
+
+    def totals(self) -> dict:
+        """整个样本库的对象数、物理字节数、引用数与逻辑字节数"""
+        with _db_lock:
+            conn = _connect(self.db_path)
+            try:
+                objects, physical = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+                refs, logical = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM refs").fetchone()
+            finally:
+                conn.close()
+        return {"objects": objects, "physical_bytes": physical, "refs": refs, "logical_bytes": logical,
+                "dedup_ratio": logical / physical if physical else 0.0}
+
+    def summary_lines(self, with_refs: bool = True) -> List[str]:
+        """with_refs=False 用于转码输出：输出文件不是对象的副本，不记录引用，也不报告去重比"""
+        if not with_refs:
+            return [self.stats.summary()]
+        totals = self.totals()
+        return [
+            self.stats.summary(),
+            f"样本库共 {totals['objects']} 个对象 {totals['physical_bytes'] / 1024 ** 2:.1f} MB，"
+            f"被 {totals['refs']} 个输出文件引用 {totals['logical_bytes'] / 1024 ** 2:.1f} MB，"
+            f"去重比 {totals['dedup_ratio']:.2f}:1（{self.root}）",
+        ]
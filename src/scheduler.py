@@ -0,0 +1,114 @@
+"""
+多 bank 并发调度
+限制同时运行的任务数与临时磁盘占用，并汇总各任务进度
+不依赖 Qt，GUI 与批处理入口共用
+"""
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 解包后 WAV 相对 bank 文件的膨胀系数（Vorbis/FADPCM → PCM）
+TEMP_EXPANSION = 8
+# 未指定上限时，最多使用临时目录所在磁盘剩余空间的比例
+TEMP_FREE_RATIO = 0.8
+
+
+def default_concurrency() -> int:
+    return max(1, min(os.cpu_count() or 1, 16))
+
+
+def estimate_temp_bytes(bank_file: str) -> int:
+    """估算处理一个 bank 时的临时空间占用"""
+    try:
+        return os.path.getsize(bank_file) * TEMP_EXPANSION
+    except OSError:
+        return 0
+
+
+def format_duration(seconds: float) -> str:
+    """秒数 → m:ss 或 h:mm:ss"""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def default_temp_budget() -> int:
+    try:
+        return int(shutil.disk_usage(tempfile.gettempdir()).free * TEMP_FREE_RATIO)
+    except OSError:
+        return 0
+
+
+class BankScheduler:
+    """有界并发调度器：任务为 (bank_file, source_dir, target_dir) 元组，以 bank_file 为键"""
+
+    def __init__(self, tasks: Iterable[Tuple[str, str, str]], max_workers: int = 0,
+                 temp_budget: Optional[int] = None):
+        self.pending = deque(tasks)
+        self.total = len(self.pending)
+        self.max_workers = max_workers if max_workers > 0 else default_concurrency()
+        # 0 表示不限制
+        self.temp_budget = default_temp_budget() if temp_budget is None else temp_budget
+        self.running: Dict[str, int] = {}
+        self.progress: Dict[str, int] = {}
+        self.completed = 0
+        self.started = time.monotonic()
+
+    @property
+    def temp_in_use(self) -> int:
+        return sum(self.running.values())
+
+    @property
+    def finished(self) -> bool:
+        return not self.pending and not self.running
+
+    def next_ready(self) -> List[Tuple[str, str, str]]:
+        """取出当前可以启动的任务；至少保证有一个任务在运行，避免超大 bank 永远无法调度"""
+        ready = []
+        while self.pending and len(self.running) < self.max_workers:
+            bank_file = self.pending[0][0]
+            need = estimate_temp_bytes(bank_file)
+            if (self.running and self.temp_budget
+                    and self.temp_in_use + need > self.temp_budget):
+                break
+            task = self.pending.popleft()
+            self.running[bank_file] = need
+            self.progress[bank_file] = 0
+            ready.append(task)
+        return ready
+
+    def update(self, bank_file: str, value: int) -> int:
+        """记录单个任务进度，返回总体进度百分比"""
+        if bank_file in self.running:
+            self.progress[bank_file] = max(0, min(value, 100))
+        return self.overall()
+
+    def cancel(self) -> int:
+        """丢弃尚未启动的任务，返回丢弃数量；运行中的任务由调用方通知其停止"""
+        dropped = len(self.pending)
+        self.pending.clear()
+        return dropped
+
+    def task_done(self, bank_file: str):
+        if self.running.pop(bank_file, None) is not None:
+            self.completed += 1
+        self.progress[bank_file] = 100
+
+    def eta(self) -> Optional[float]:
+        """按已用时间与总体进度线性估算剩余秒数；进度过少时返回 None"""
+        if self.total == 0:
+            return None
+        done = sum(self.progress.values()) / (self.total * 100)
+        if done < 0.01:
+            return None
+        return (time.monotonic() - self.started) * (1 - done) / done
+
+    def overall(self) -> int:
+        if self.total == 0:
+            return 0
+        return min(sum(self.progress.values()) // self.total, 100)
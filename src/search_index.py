@@ -0,0 +1,147 @@
+"""
+bank 内样本名搜索索引
+从 bank 的 FSB5 头与名称表读取样本名（不解包，不读样本数据），连同核心文件名持久化到 SQLite
+bank 大小与 mtime 未变化时不重新解析；支持前缀、子串与模糊查询
+"""
+import difflib
+import os
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app_paths import get_cache_dir
+from bank_reader import BankFormatError, BankReader
+from ref_index import get_core_filename
+
+DB_NAME = "search_index.sqlite3"
+# 模糊查询的最低相似度
+FUZZY_CUTOFF = 0.75
+
+_db_lock = threading.Lock()
+
+
+def _bank_key(bank_file) -> str:
+    return os.path.normcase(os.path.abspath(str(bank_file)))
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE IF NOT EXISTS banks (key TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime_ns INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS samples (key TEXT, name TEXT, name_lower TEXT, core TEXT)")
+    conn.execute("CREATE INDEX IF NOT EXISTS samples_key ON samples (key)")
+    conn.execute("CREATE INDEX IF NOT EXISTS samples_name ON samples (name_lower)")
+    conn.execute("CREATE INDEX IF NOT EXISTS samples_core ON samples (core)")
+    return conn
+
+
+def _core(sample_name: str) -> str:
+    # 样本名不带扩展名，补上 .wav 以免名称中的点被当作扩展名
+    return get_core_filename(f"{sample_name}.wav")
+
+
+def _prefix_upper(prefix: str) -> str:
+    """前缀查询的上界：name >= prefix AND name < upper 可以利用索引"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SearchIndex:
+    """所有已扫描 bank 的样本名索引"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = db_path or get_cache_dir() / DB_NAME
+        self._cores: Optional[List[str]] = None
+
+    def update(self, bank_files: Iterable[str], progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """解析大小或 mtime 变化的 bank，返回重新解析的数量"""
+        bank_files = list(bank_files)
+        with _db_lock:
+            conn = _connect(self.db_path)
+            try:
+                known = {key: (size, mtime_ns) for key, size, mtime_ns in
+                         conn.execute("SELECT key, size, mtime_ns FROM banks")}
+            finally:
+                conn.close()
+
+        stale = []
+        for bank_file in bank_files:
+            try:
+                st = os.stat(bank_file)
+            except OSError:
+                continue
+            if known.get(_bank_key(bank_file)) != (st.st_size, st.st_mtime_ns):
+                stale.append((bank_file, st))
+
+        for done, (bank_file, st) in enumerate(stale, 1):
+            try:
+                with BankReader(bank_file) as reader:
+                    names = reader.sample_names()
+            except (OSError, BankFormatError, struct.error):
+                names = []
+            key = _bank_key(bank_file)
+            with _db_lock:
+                conn = _connect(self.db_path)
+                try:
+                    with conn:
+                        conn.execute("DELETE FROM samples WHERE key = ?", (key,))
+                        conn.execute("INSERT OR REPLACE INTO banks VALUES (?, ?, ?, ?)",
+                                     (key, str(bank_file), st.st_size, st.st_mtime_ns))
+                        conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)",
+                                         [(key, name, name.lower(), _core(name)) for name in names])
+                finally:
+                    conn.close()
+            if progress is not None:
+                progress(done, len(stale))
+        if stale:
+            self._cores = None
+        return len(stale)
+
+    def _query(self, where: str, args, limit: int) -> Dict[str, List[str]]:
+        with _db_lock:
+            conn = _connect(self.db_path)
+            try:
+                rows = conn.execute(
+                    "SELECT banks.path, samples.name FROM samples JOIN banks ON banks.key = samples.key "
+                    f"WHERE {where} ORDER BY banks.path, samples.name LIMIT ?", (*args, limit)).fetchall()
+            finally:
+                conn.close()
+        results: Dict[str, List[str]] = OrderedDict()
+        for path, name in rows:
+            results.setdefault(path, []).append(name)
+        return results
+
+    def _all_cores(self) -> List[str]:
+        if self._cores is None:
+            with _db_lock:
+                conn = _connect(self.db_path)
+                try:
+                    self._cores = [core for (core,) in conn.execute("SELECT DISTINCT core FROM samples")]
+                finally:
+                    conn.close()
+        return self._cores
+
+    def search(self, query: str, mode: str = "auto", limit: int = 2000) -> Dict[str, List[str]]:
+        """返回 bank 路径 → 命中的样本名
+        mode: prefix（样本名或核心名前缀）/ substring / fuzzy / auto（依次尝试前缀、子串、模糊）"""
+        query = query.strip().lower()
+        if not query:
+            return {}
+        if mode in ("prefix", "auto"):
+            upper = _prefix_upper(query)
+            results = self._query(
+                "(samples.name_lower >= ? AND samples.name_lower < ?) OR (samples.core >= ? AND samples.core < ?)",
+                (query, upper, query, upper), limit)
+            if results or mode == "prefix":
+                return results
+        if mode in ("substring", "auto"):
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            results = self._query("samples.name_lower LIKE ? ESCAPE '\\'", (pattern,), limit)
+            if results or mode == "substring":
+                return results
+        cores = difflib.get_close_matches(_core(query), self._all_cores(), n=50, cutoff=FUZZY_CUTOFF)
+        if not cores:
+            return {}
+        marks = ",".join("?" * len(cores))
+        return self._query(f"samples.core IN ({marks})", cores, limit)
@@ -0,0 +1,204 @@
+"""
+外部工具（QuickBMS / fsb_aud_extr）输出解析
+- 后台线程按块读取子进程输出（同时按 \\r 与 \\n 分行），主循环带超时从队列取出，不会因工具不输出而阻塞
+- 每行解析为结构化事件：写出文件（序号 / 总数 / 字节数）、错误、其他信息
+- 按事件累计进度；长时间既无输出、输出目录也无变化时先警告，超过上限后终止进程
+"""
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+EVENT_FILE = "file"
+EVENT_ERROR = "error"
+EVENT_INFO = "info"
+
+# 无输出多少秒后提示疑似卡住、多少秒后终止（0 表示不终止）
+STALL_WARNING_SECONDS = 30
+STALL_TIMEOUT_SECONDS = 600
+# 主循环取队列的超时，也是检查取消与卡住的间隔
+POLL_SECONDS = 0.2
+# 检查输出目录是否仍在增长的间隔（目录有变化也视为有进展）
+WATCH_INTERVAL_SECONDS = 5.0
+READ_CHUNK_SIZE = 64 * 1024
+
+# QuickBMS 逐文件输出：偏移（十六进制）  大小  文件名
+_QUICKBMS_FILE = re.compile(r"^\s*([0-9a-fA-F]{8,16})\s+(\d+)\s+(\S.*?)\s*$")
+# 序号 / 总数，如 "12/340"、"12 of 340"、"[12/340]"
+_COUNTER = re.compile(r"\b(\d+)\s*(?:/|of)\s*(\d+)\b")
+_OUTPUT_FILE = re.compile(r"([^\s\\/:\"']+\.(?:wav|ogg|fsb|mp3|flac))\b", re.IGNORECASE)
+_ERROR = re.compile(r"\b(?:error|failed|failure|cannot|can't|unable|exception|invalid)\b", re.IGNORECASE)
+
+
+@dataclass
+class ToolEvent:
+    kind: str
+    line: str
+    name: str = ""
+    size: int = 0
+    index: int = 0
+    total: int = 0
+
+
+def parse_line(line: str) -> ToolEvent:
+    """把一行工具输出解析为事件"""
+    if _ERROR.search(line):
+        return ToolEvent(EVENT_ERROR, line)
+    match = _QUICKBMS_FILE.match(line)
+    if match:
+        return ToolEvent(EVENT_FILE, line, name=match.group(3), size=int(match.group(2)))
+    match = _OUTPUT_FILE.search(line)
+    if match:
+        event = ToolEvent(EVENT_FILE, line, name=match.group(1))
+        counter = _COUNTER.search(line)
+        if counter:
+            event.index, event.total = int(counter.group(1)), int(counter.group(2))
+        return event
+    return ToolEvent(EVENT_INFO, line)
+
+
+@dataclass
+class ToolProgress:
+    """一次工具运行的累计进度；expected_* 为事先已知的文件数 / 字节数（未知为 0）"""
+    expected_files: int = 0
+    expected_bytes: int = 0
+    files: int = 0
+    bytes: int = 0
+    index: int = 0
+    total: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def feed(self, event: ToolEvent):
+        if event.kind == EVENT_FILE:
+            self.files += 1
+            self.bytes += event.size
+            if event.total:
+                self.index, self.total = event.index, event.total
+        elif event.kind == EVENT_ERROR:
+            self.errors.append(event.line)
+
+    @property
+    def fraction(self) -> float:
+        """0~1；优先使用工具自己报告的序号，其次按已知文件数，再次按字节数"""
+        if self.total:
+            value = self.index / self.total
+        elif self.expected_files:
+            value = self.files / self.expected_files
+        elif self.expected_bytes:
+            value = self.bytes / self.expected_bytes
+        else:
+            return 0.0
+        return min(value, 1.0)
+
+
+def _dir_size(path) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_file():
+                    total += entry.stat().st_size
+    except OSError:
+        pass
+    return total
+
+
+def _read_chunks(stream, lines: queue.Queue):
+    """后台读取线程：按块读取，以 \\r 或 \\n 分行（进度行常只用 \\r 刷新）；结束时放入 None"""
+    pending = b""
+    try:
+        while True:
+            chunk = stream.read1(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            parts = re.split(rb"[\r\n]+", pending + chunk)
+            pending = parts.pop()
+            for raw in parts:
+                if raw:
+                    lines.put(raw)
+    finally:
+        if pending:
+            lines.put(pending)
+        lines.put(None)
+
+
+class ToolRunner:
+    """运行外部工具并按事件回调；返回码为 None 表示因取消或卡住被终止"""
+
+    def __init__(self, cmd, cwd=None, progress: Optional[ToolProgress] = None,
+                 on_event: Optional[Callable[[ToolEvent], None]] = None,
+                 on_progress: Optional[Callable[[float], None]] = None,
+                 on_stall: Optional[Callable[[float], None]] = None,
+                 cancelled: Optional[Callable[[], bool]] = None,
+                 watch_dir=None, stall_timeout: float = STALL_TIMEOUT_SECONDS):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.progress = progress or ToolProgress()
+        self.on_event = on_event
+        self.on_progress = on_progress
+        self.on_stall = on_stall
+        self.cancelled = cancelled
+        self.watch_dir = watch_dir if watch_dir is not None else cwd
+        self.stall_timeout = stall_timeout
+        self.stalled = False
+
+    def run(self) -> Optional[int]:
+        process = subprocess.Popen(self.cmd, cwd=self.cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        lines: queue.Queue = queue.Queue()
+        reader = threading.Thread(target=_read_chunks, args=(process.stdout, lines), daemon=True)
+        reader.start()
+
+        last_activity = time.monotonic()
+        last_watch = last_activity
+        watch_size = _dir_size(self.watch_dir) if self.watch_dir else 0
+        warned = False
+        last_fraction = -1.0
+        killed = False
+        while True:
+            try:
+                raw = lines.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                raw = b""
+            if raw is None:
+                break
+            now = time.monotonic()
+            if raw:
+                last_activity = now
+                warned = False
+                event = parse_line(raw.decode("utf-8", errors="replace").strip())
+                self.progress.feed(event)
+                if self.on_event is not None:
+                    self.on_event(event)
+                fraction = self.progress.fraction
+                if self.on_progress is not None and fraction != last_fraction:
+                    last_fraction = fraction
+                    self.on_progress(fraction)
+
+            if self.cancelled is not None and self.cancelled():
+                process.kill()
+                killed = True
+                break
+            if self.watch_dir and now - last_watch >= WATCH_INTERVAL_SECONDS:
+                last_watch = now
+                size = _dir_size(self.watch_dir)
+                if size != watch_size:
+                    watch_size = size
+                    last_activity = now
+            idle = now - last_activity
+            if idle >= STALL_WARNING_SECONDS and not warned:
+                warned = True
+                if self.on_stall is not None:
+                    self.on_stall(idle)
+            if self.stall_timeout and idle >= self.stall_timeout:
+                process.kill()
+                self.stalled = killed = True
+                break
+
+        process.wait()
+        reader.join(timeout=1.0)
+        process.stdout.close()
+        return None if killed else process.returncode
@@ -0,0 +1,240 @@
+"""
+输出转码（WAV → FLAC / OGG Vorbis / Opus）
+- 需要可选的 soundfile（libsndfile，Opus 需 1.2 以上）；未安装时只能输出 WAV
+- 进程池编码：匹配的样本凑满一块（CHUNK_FILES 个）后作为一个任务提交，不会每个文件启动一个进程
+- 每个样本按 NumPy 数组整块读入并编码一次；对应多个参考目录时其余目标由复制引擎复制或链接
+- 输出文件名只替换扩展名，目录结构与参考目录一致
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 缺少 NumPy 时 Opus 不重采样
+    np = None
+
+# 每个进程池任务包含的文件数：摊薄进程间通信开销，又不至于让取消等待过久
+CHUNK_FILES = 32
+# Opus 只支持这些采样率，其余采样率线性插值重采样到 48 kHz
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+OPUS_TARGET_RATE = 48000
+# 源为 24 位及以上精度时按 int32 读入，FLAC 保留 24 位
+HIGH_RES_SUBTYPES = ("PCM_24", "PCM_32", "FLOAT", "DOUBLE")
+TMP_SUFFIX = ".wtenc"
+
+
+class FormatSpec(NamedTuple):
+    suffix: str
+    container: str            # soundfile 的 format
+    subtype: Optional[str]    # None 表示按源精度选择
+
+
+OUTPUT_FORMATS: Dict[str, FormatSpec] = {
+    "flac": FormatSpec(".flac", "FLAC", None),
+    "ogg": FormatSpec(".ogg", "OGG", "VORBIS"),
+    "opus": FormatSpec(".opus", "OGG", "OPUS"),
+}
+
+FORMAT_LABELS = {
+    "wav": "WAV（不转码）",
+    "flac": "FLAC（无损）",
+    "ogg": "OGG Vorbis",
+    "opus": "Opus",
+}
+
+
+def available_formats() -> Tuple[str, ...]:
+    """当前环境可用的输出格式，WAV 始终可用"""
+    formats = ["wav"]
+    try:
+        import soundfile
+    except (ImportError, OSError):
+        return tuple(formats)
+    for fmt, spec in OUTPUT_FORMATS.items():
+        subtypes = soundfile.available_subtypes(spec.container)
+        if spec.subtype is None or spec.subtype in subtypes:
+            formats.append(fmt)
+    return tuple(formats)
+
+
+def check_format(fmt: str):
+    """输出格式未知或当前环境不可用时抛出 ValueError"""
+    if fmt != "wav" and fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"未知的输出格式: {fmt}")
+    if fmt not in available_formats():
+        raise ValueError(f"输出 {FORMAT_LABELS[fmt]} 需要安装 soundfile（Opus 需 libsndfile 1.2 以上）")
+
+
+def _resample(data, rate: int, target: int):
+    """按声道线性插值重采样，保持原数据类型"""
+    count = data.shape[0]
+    out_count = max(1, round(count * target / rate))
+    positions = np.arange(out_count) * (rate / target)
+    source = np.arange(count)
+    out = np.empty((out_count, data.shape[1]), dtype=data.dtype)
+    for ch in range(data.shape[1]):
+        out[:, ch] = np.rint(np.interp(positions, source, data[:, ch]))
+    return out
+
+
+def encode_file(src, dst, fmt: str) -> Tuple[int, int]:
+    """把 wav 编码为 fmt 写入 dst（先写临时名再替换），返回 (输入字节数, 输出字节数)"""
+    import soundfile
+
+    spec = OUTPUT_FORMATS[fmt]
+    src, dst = Path(src), Path(dst)
+    high_res = soundfile.info(str(src)).subtype in HIGH_RES_SUBTYPES
+    data, rate = soundfile.read(str(src), dtype="int32" if high_res else "int16", always_2d=True)
+    subtype = spec.subtype or ("PCM_24" if high_res else "PCM_16")
+    if subtype == "OPUS" and rate not in OPUS_RATES:
+        if np is None:
+            raise ValueError(f"Opus 不支持 {rate} Hz，重采样需要 NumPy")
+        data, rate = _resample(data, rate, OPUS_TARGET_RATE), OPUS_TARGET_RATE
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + TMP_SUFFIX)
+    try:
+        soundfile.write(str(tmp), data, rate, format=spec.container, subtype=subtype)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return src.stat().st_size, dst.stat().st_size
+
+
+def _encode_chunk(jobs: List[Tuple[str, str]], fmt: str) -> List[Tuple[int, int, float, Optional[str]]]:
+    """进程池任务：逐个编码，单个文件失败不影响同块其余文件；返回每个文件的 (输入字节, 输出字节, 耗时, 错误)"""
+    results = []
+    for src, dst in jobs:
+        start = time.perf_counter()
+        try:
+            bytes_in, bytes_out = encode_file(src, dst, fmt)
+            results.append((bytes_in, bytes_out, time.perf_counter() - start, None))
+        except Exception as e:
+            results.append((0, 0, time.perf_counter() - start, str(e) or type(e).__name__))
+    return results
+
+
+@dataclass
+class TranscodeStats:
+    files: int = 0
+    failed: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0      # 各进程编码耗时之和
+
+    def merge(self, other: "TranscodeStats"):
+        self.files += other.files
+        self.failed += other.failed
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.seconds += other.seconds
+
+    def summary(self, fmt: str) -> str:
+        ratio = self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+        text = (f"转码：{self.files} 个文件 → {FORMAT_LABELS.get(fmt, fmt)}，"
+                f"{self.bytes_in / 1024 ** 2:.1f} MB → {self.bytes_out / 1024 ** 2:.1f} MB（压缩比 {ratio:.2f}:1）")
+        if self.failed:
+            text += f"，失败 {self.failed} 个"
+        return text
+
+
+class Transcoder:
+    """多个 BankPipeline 共享一个进程池；进程池在首次提交时创建"""
+
+    def __init__(self, fmt: str, workers: int = 0):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的输出格式: {fmt}")
+        check_format(fmt)
+        self.fmt = fmt
+        self.suffix = OUTPUT_FORMATS[fmt].suffix
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.stats = TranscodeStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def output_name(self, file_name: str) -> str:
+        """xxx.wav → xxx.<扩展名>"""
+        return Path(file_name).stem + self.suffix
+
+    def submit(self, jobs: List[Tuple[Path, Path]]) -> Future:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            pool = self._pool
+        return pool.submit(_encode_chunk, [(str(src), str(dst)) for src, dst in jobs], self.fmt)
+
+    def record(self, stats: TranscodeStats):
+        with self._lock:
+            self.stats.merge(stats)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+class TranscodeQueue:
+    """单个 bank 的转码队列（只在一个线程中使用）：凑满一块提交，按块取回结果"""
+
+    def __init__(self, transcoder: Transcoder, chunk_files: int = CHUNK_FILES):
+        self.transcoder = transcoder
+        self.chunk_files = chunk_files
+        self.stats = TranscodeStats()
+        self._jobs: List[Tuple[Path, Path]] = []
+        self._contexts: List[Any] = []
+        self._futures: Dict[Future, List[Any]] = {}
+
+    def add(self, src: Path, dst: Path, context: Any = None):
+        """排队编码 src → dst；context 在完成时原样返回"""
+        self._jobs.append((src, dst))
+        self._contexts.append(context)
+        if len(self._jobs) >= self.chunk_files:
+            self._submit()
+
+    def _submit(self):
+        if self._jobs:
+            self._futures[self.transcoder.submit(self._jobs)] = self._contexts
+            self._jobs, self._contexts = [], []
+
+    def _collect(self, future: Future) -> Iterator[Tuple[Any, Optional[str]]]:
+        contexts = self._futures.pop(future)
+        try:
+            results = future.result()
+        except Exception as e:
+            # 进程池本身出错（如工作进程崩溃）：整块失败
+            results = [(0, 0, 0.0, str(e) or type(e).__name__)] * len(contexts)
+        local = TranscodeStats()
+        for context, (bytes_in, bytes_out, seconds, error) in zip(contexts, results):
+            local.seconds += seconds
+            if error is None:
+                local.files += 1
+                local.bytes_in += bytes_in
+                local.bytes_out += bytes_out
+            else:
+                local.failed += 1
+            yield context, error
+        self.stats.merge(local)
+        self.transcoder.record(local)
+
+    def poll(self) -> Iterator[Tuple[Any, Optional[str]]]:
+        """不等待，取回已完成块的 (context, 错误)"""
+        for future in [future for future in self._futures if future.done()]:
+            yield from self._collect(future)
+
+    def drain(self) -> Iterator[Tuple[Any, Optional[str]]]:
+        """提交剩余文件并等待全部完成"""
+        self._submit()
+        while self._futures:
+            yield from self._collect(next(iter(self._futures)))
+
+    def cancel(self):
+        """取消尚未开始的块；已在编码的块在后台完成，其结果不再记录"""
+        self._jobs, self._contexts = [], []
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
@@ -0,0 +1,62 @@
+"""
+bank 原生解析回归测试
+运行：在仓库根目录执行 python -m pytest -q
+"""
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from bank_reader import BankReader, find_fsb5_offsets, read_sample_names  # noqa: E402
+from benchmark import build_bank, build_fsb5  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+
+class CountingFile(io.FileIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _write_bank(tmp_path) -> Path:
+    blocks = []
+    for j in range(4):
+        samples = [(f"voice_{j}_{i}", bytes(range(256)) * 4096, 1) for i in range(2)]
+        # 样本数据中的巧合签名
+        samples.append((f"fake_{j}", b"xxFSB5" + b"\1" * 100, 1))
+        blocks.append(build_fsb5(samples))
+    bank = tmp_path / "a.assets.bank"
+    bank.write_bytes(build_bank(blocks))
+    return bank
+
+
+def test_locating_fsb5_blocks_reads_only_headers(tmp_path):
+    """定位 FSB5 块时按块大小跳转，不读取样本数据（样本数据中的巧合签名也不会被当成新块）"""
+    bank = _write_bank(tmp_path)
+
+    with CountingFile(bank, "rb") as f:
+        offsets = find_fsb5_offsets(f)
+        bytes_read = f.bytes_read
+
+    assert len(offsets) == 4
+    assert bank.read_bytes()[offsets[-1]:offsets[-1] + 4] == b"FSB5"
+    assert bytes_read < 16 * 1024
+
+
+def test_search_index_reads_only_headers_and_name_tables(tmp_path):
+    """建立搜索索引只需要 FSB5 头与名称表"""
+    bank = _write_bank(tmp_path)
+    with BankReader(bank) as reader:
+        expected = [sample.name for sample in reader.iter_samples()]
+
+    with CountingFile(bank, "rb") as f:
+        assert read_sample_names(f) == expected
+        assert f.bytes_read < 16 * 1024
+
+    index = SearchIndex(tmp_path / "search.sqlite3")
+    assert index.update([str(bank)]) == 1
+    assert index.search("voice_2_1", "prefix") == {str(bank): ["voice_2_1"]}
@@ -0,0 +1,83 @@
+"""
+复制引擎回归测试
+运行：在仓库根目录执行 python -m pytest -q
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from copy_engine import CopyEngine  # noqa: E402
+from manifest import hash_file  # noqa: E402
+from sample_store import SampleStore  # noqa: E402
+
+
+def test_copy_does_not_write_through_hardlinked_store_object(tmp_path):
+    """硬链接模式生成的输出再以复制模式覆盖时，样本库对象不能被改写"""
+    store = SampleStore(tmp_path / "store")
+    dests = [tmp_path / "out" / "a" / "voice.wav", tmp_path / "out" / "b" / "voice.wav"]
+
+    old = tmp_path / "old.wav"
+    old.write_bytes(b"RIFF old sample data")
+    obj, digest = store.put(old)
+    assert CopyEngine("hardlink").copy(obj, dests) == dests
+    assert all(dest.stat().st_ino == obj.stat().st_ino for dest in dests)
+
+    # 样本内容变化后以复制模式重新输出
+    new = tmp_path / "new.wav"
+    new.write_bytes(b"RIFF changed sample!")
+    assert CopyEngine("copy").copy(new, dests) == dests
+
+    assert hash_file(obj) == digest
+    assert obj.read_bytes() == b"RIFF old sample data"
+    for dest in dests:
+        assert dest.read_bytes() == b"RIFF changed sample!"
+        assert dest.stat().st_ino != obj.stat().st_ino
+    assert not list((tmp_path / "out").rglob("*.wtcopy"))
+
+
+def test_parallel_copies_to_same_destination(tmp_path):
+    """多个 bank 并行写入同一输出目标时，临时文件互不干扰"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    sources = []
+    for i in range(8):
+        src = tmp_path / f"src{i}.wav"
+        src.write_bytes(b"RIFF" + bytes([i]) * 256 * 1024)
+        sources.append(src)
+    dest = tmp_path / "out" / "voice.wav"
+    engine = CopyEngine("copy")
+
+    def worker(src):
+        for _ in range(20):
+            engine.copy(src, [dest])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, sources))
+
+    assert dest.read_bytes() in {src.read_bytes() for src in sources}
+    assert not list((tmp_path / "out").glob("*.wtcopy"))
+
+
+def test_parallel_links_to_same_destination(tmp_path):
+    """多个线程并行链接同一目标时，临时链接互不干扰"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    sources = []
+    for i in range(8):
+        src = tmp_path / f"src{i}.wav"
+        src.write_bytes(b"RIFF" + bytes([i]) * 1024)
+        sources.append(src)
+    dest = tmp_path / "out" / "voice.wav"
+    engine = CopyEngine("hardlink")
+
+    def worker(i):
+        # 每次换一个源，目标内容总是不同，不会因内容相同而跳过
+        for n in range(500):
+            engine.copy(sources[(i + n) % len(sources)], [dest])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(8)))
+
+    assert dest.read_bytes() in {src.read_bytes() for src in sources}
+    assert not list((tmp_path / "out").glob("*.wtlink"))
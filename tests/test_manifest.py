@@ -0,0 +1,37 @@
+"""
+增量清单回归测试
+运行：在仓库根目录执行 python -m pytest -q
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from manifest import Manifest  # noqa: E402
+from ref_index import ReferenceIndex  # noqa: E402
+
+
+def test_check_compares_reference_fingerprint_and_settings(tmp_path):
+    """参考结构新增文件或处理设置变化后，未变化的 bank 也不能跳过"""
+    bank = tmp_path / "a.assets.bank"
+    bank.write_bytes(b"bank data")
+    ref = tmp_path / "ref"
+    (ref / "voice").mkdir(parents=True)
+    (ref / "voice" / "hello.wav").write_bytes(b"x")
+    target = tmp_path / "out"
+    (target / "voice").mkdir(parents=True)
+    (target / "voice" / "hello.wav").write_bytes(b"x")
+
+    index = ReferenceIndex(ref, db_path=tmp_path / "ref.sqlite3")
+    index.refresh()
+    settings = {"reference": index.fingerprint(), "match_rules": ["lang_prefix"], "quarantine": False}
+
+    manifest = Manifest(target)
+    manifest.record(bank, ref, ["voice/hello.wav"], "wav", settings)
+    assert manifest.check(bank, ref, "wav", settings) is not None
+    assert manifest.check(bank, ref, "wav", {**settings, "quarantine": True}) is None
+
+    (ref / "voice" / "world.wav").write_bytes(b"x")
+    index.refresh()
+    assert index.fingerprint() != settings["reference"]
+    assert manifest.check(bank, ref, "wav", {**settings, "reference": index.fingerprint()}) is None
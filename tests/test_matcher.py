@@ -0,0 +1,20 @@
+"""
+核心文件名匹配回归测试
+运行：在仓库根目录执行 python -m pytest -q
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from matcher import MatchIndex  # noqa: E402
+
+
+def test_resolve_agrees_with_lookup():
+    """批量解析与逐个查找结果一致，未匹配的样本目录为空"""
+    index = MatchIndex([("a", "ru_voice_1.wav"), ("b", "en_voice_1.wav"), ("a", "ru_voice_2.wav")])
+    names = ["zh_voice_1.wav", "zh_voice_2.wav", "zh_voice_3.wav"]
+    resolved = index.resolve(names)
+    assert resolved["zh_voice_1.wav"] == ("voice_1", [Path("a"), Path("b")])
+    assert resolved["zh_voice_3.wav"] == ("voice_3", [])
+    assert all(resolved[name][1] == index.lookup(name) for name in names)